@@ -0,0 +1,58 @@
+"""Benchmark of the FIR filters of ps_signal.signals.filters, applied with
+FFT overlap-save convolution, against scipy.signal.filtfilt with the same
+taps and against the 5th order Butterworth filter applied with
+scipy.signal.sosfiltfilt.
+
+filtfilt filters twice in direct form, so its cost grows with the number
+of taps times the number of samples, while the cost of overlap-save grows
+with the logarithm of the number of taps.
+
+Usage:
+    python benchmarks/fir_filter.py [samples] [taps ...]
+"""
+import sys
+import time
+import numpy as np
+from scipy.signal import filtfilt, sosfiltfilt
+from ps_signal.signals import filters
+
+
+FREQUENCY_HZ = 100000.0
+CUTOFF_HZ = 2000.0
+
+
+def best_of(function, repeats=3):
+    """Returns the shortest time in seconds of a few runs of a function."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2 ** 21
+    taps_counts = [int(arg) for arg in sys.argv[2:]] or [65, 513, 4097,
+                                                         16385]
+    values = np.random.default_rng(0).normal(size=samples)
+    output = np.empty(samples)
+
+    sos = filters._design_butter("low", (CUTOFF_HZ,), FREQUENCY_HZ)
+    butter_s = best_of(lambda: sosfiltfilt(sos, values))
+    print(f"{samples} samples, Butterworth sosfiltfilt: {butter_s:.3f} s")
+    print(f"{'taps':>8} {'overlap-save':>14} {'filtfilt':>10} {'speedup':>8}")
+
+    for numtaps in taps_counts:
+        taps = filters._design_fir("lowpass", (CUTOFF_HZ,), FREQUENCY_HZ,
+                                   numtaps=numtaps)
+        fir_s = best_of(lambda: filters._overlap_save(taps, values, output))
+        # filtfilt is slow for long filters, so it is only run once.
+        filtfilt_s = best_of(lambda: filtfilt(taps, 1.0, values),
+                             repeats=1)
+        print(f"{len(taps):>8} {fir_s:>12.3f} s {filtfilt_s:>8.3f} s "
+              f"{filtfilt_s / fir_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
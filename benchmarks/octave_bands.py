@@ -0,0 +1,57 @@
+"""Benchmark of the fractional-octave filter bank of
+ps_signal.signals.octave, which decimates by 2 for every octave, against
+filtering every band at the full sampling frequency with the band-pass
+filter of ps_signal.signals.filters, i.e. scipy.signal.sosfiltfilt.
+
+Usage:
+    python benchmarks/octave_bands.py [samples] [fraction]
+"""
+import sys
+import time
+import numpy as np
+from scipy.signal import sosfiltfilt
+from ps_signal.signals import filters, octave
+
+
+FREQUENCY_HZ = 51200.0
+
+
+def best_of(function, repeats=3):
+    """Returns the shortest time in seconds of a few runs of a function."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2 ** 22
+    fraction = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    values = np.random.default_rng(0).normal(size=samples)
+
+    bands = octave.octave_values(values, FREQUENCY_HZ, fraction)
+    bank_s = best_of(lambda: octave.octave_values(values, FREQUENCY_HZ,
+                                                  fraction))
+
+    half_band = 2.0 ** (1 / (2 * fraction))
+
+    def full_rate():
+        for center in bands.centers_hz:
+            sos = filters._design_butter(
+                "bandpass", (center / half_band, center * half_band),
+                FREQUENCY_HZ
+            )
+            sosfiltfilt(sos, values)
+
+    # Filtering every band at the full rate is slow, so it is run once.
+    full_s = best_of(full_rate, repeats=1)
+    print(f"{samples} samples, {len(bands.centers_hz)} bands of 1/{fraction} "
+          "octave")
+    print(f"filter bank: {bank_s:.3f} s, full rate: {full_s:.3f} s, "
+          f"speedup {full_s / bank_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark of the sliding-window trend of ps_signal.signals.trend, which
+computes all windows in one pass, against slicing every window with
+ps_signal.signals.data.slice_data and computing its statistics one window
+at a time.
+
+Usage:
+    python benchmarks/trend.py [samples] [window_ms] [hop_ms]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from ps_signal.signals import Data, data
+
+
+FREQUENCY_HZ = 100000.0
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2 ** 21
+    window_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    hop_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+
+    frame = pd.DataFrame({
+        "time": np.arange(samples) / FREQUENCY_HZ * 1000,
+        "acc": np.random.default_rng(0).normal(size=samples)
+    })
+    frame.attrs["period"] = 1 / FREQUENCY_HZ
+    input_data = Data(loader=lambda _: frame)
+    input_data.load("", remove_offset=False)
+
+    start = time.perf_counter()
+    result = input_data.build_trend(window_ms, hop_ms)
+    trend_s = time.perf_counter() - start
+
+    # Slicing is slow, so only the first windows are timed and the time
+    # is scaled to all windows.
+    windows = min(len(result), 500)
+    start = time.perf_counter()
+    for index in range(windows):
+        begin = index * hop_ms
+        values = data.slice_data(input_data, begin,
+                                 begin + window_ms).data.acc.to_numpy()
+        rms = np.sqrt(np.mean(values ** 2))
+        np.max(np.abs(values)) / rms
+        np.ptp(values)
+        centered = values - values.mean()
+        np.mean(centered ** 4) / np.mean(centered ** 2) ** 2
+    slice_s = (time.perf_counter() - start) * len(result) / windows
+
+    print(f"{samples} samples, {len(result)} windows of {window_ms} ms")
+    print(f"trend: {trend_s:.3f} s, slices: {slice_s:.3f} s, "
+          f"speedup {slice_s / trend_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,28 @@
 """Module that is the entry point from the interaces to invoke the CLI.
 """
+import os
+import signal
+import sqlite3
+import sys
 from . import cli_conf
 from ... import signals
+from ...signals import aggregate
+from ...signals import catalog
+from ...signals import correlation
 from ...signals import data
+from ...signals import events
 from ...signals import filters
+from ...signals import jobs
+from ...signals import loaders
+from ...signals import octave
+from ...signals import pipeline
+from ...signals import planner
+from ...signals import plot
+from ...signals import progress
+from ...signals import pyramid
+from ...signals import report
+from ...signals import segments
+from ...signals import trend
 
 
 def run_cli():
@@ -11,18 +30,177 @@ def run_cli():
     function that will invoke and execute the CLI. It uses :mod:`.cli_conf`
     for configuration of the CLI.
     """
-    # Singleton instances of the different kinds of filters.
-    lowpass_filter = filters.lowpass()
-    highpass_filter = filters.highpass()
-    bandpass_filter = filters.bandpass()
-    bandstop_filter = filters.bandstop()
-
     args = cli_conf.parse_args()
 
-    # Instantiate a Data object and load data from a file.
-    # The data object is assigned a file loader function by default.
-    input_data = data.Data()
-    input_data.load(args.file)
+    # The first Ctrl-C stops the stages at their next chunk, so that no
+    # partial output is left. A second Ctrl-C stops at once.
+    token = progress.CancellationToken()
+    callback = progress.ProgressPrinter() if args.progress else None
+    previous = signal.signal(signal.SIGINT, _interrupt_handler(token))
+    try:
+        with progress.tracking(callback, token):
+            _run(args, token, callback)
+    except progress.Cancelled as error:
+        raise SystemExit(f"Cancelled: {error}")
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+def _run(args, token, callback):
+    """Helper function that runs what the arguments ask for.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+        token (CancellationToken): The token cancelled by Ctrl-C.
+        callback (function): The progress callback, or None.
+    """
+    # The catalog is updated with the given files, and can select the
+    # files to analyze instead.
+    if args.catalog:
+        if not _use_catalog(args):
+            return
+
+    # The files are job queues, whose jobs describe the processing.
+    if args.cancel:
+        for path in args.file:
+            cancelled = jobs.JobQueue(path).cancel()
+            print(f"{path}: cancelled {cancelled} jobs.")
+        return
+
+    if args.worker:
+        for path in args.file:
+            completed = jobs.run_worker(jobs.JobQueue(path),
+                                        progress_callback=callback,
+                                        token=token)
+            print(f"{path}: completed {completed} jobs.")
+        return
+
+    # A pipeline file replaces the processing given by the arguments.
+    if args.pipeline and args.queue:
+        _queue_pipeline(args)
+        return
+
+    if args.pipeline:
+        _run_pipeline(args)
+        return
+
+    # Spectra of all files are combined into one result.
+    if args.aggregate:
+        _aggregate(args)
+        return
+
+    # All files, or the segments within one file, are one capture.
+    if args.segments:
+        _run_segments(args)
+        return
+
+    # Every file is compared with the first file.
+    if args.correlate is not None or args.coherence:
+        _compare(args)
+        return
+
+    # With several files, each file is named after the file itself.
+    for index, path in enumerate(args.file, 1):
+        if len(args.file) == 1:
+            signal_id = "Signal_1"
+            label = None
+        else:
+            signal_id = os.path.splitext(os.path.basename(path))[0]
+            label = f"[{index}/{len(args.file)}] {path}"
+        with progress.tracking(label=label):
+            _run_file(path, signal_id, args)
+        if label:
+            progress.update("files", index, len(args.file), "files")
+
+
+def _interrupt_handler(token):
+    """Helper function that makes a handler of Ctrl-C, which cancels the
+    token the first time and raises KeyboardInterrupt the second time.
+
+    Args:
+        token (CancellationToken): The token to cancel.
+
+    Returns:
+        function: The signal handler.
+    """
+    def handle(signum, frame):
+        if token.cancelled:
+            raise KeyboardInterrupt
+        print("Cancelling, press Ctrl-C again to stop at once.",
+              file=sys.stderr)
+        token.cancel("Interrupted")
+    return handle
+
+
+def _run_file(path, signal_id, args):
+    """Helper function that loads and analyzes one file. With a memory
+    budget, the strategy is planned before the file is loaded and the
+    actual peak memory is measured.
+
+    Args:
+        path (str): The path to the file.
+        signal_id (str): The id of the signal, used for the output files.
+        args (argparse.Namespace): The parsed arguments.
+    """
+    if args.budget is None:
+        _analyze_file(path, signal_id, args)
+        return
+
+    # A budget of 0 means half of the available memory.
+    plan = planner.plan_execution(
+        path,
+        _planned_stages(args),
+        budget_mb=args.budget or None,
+        loader=args.loader
+    )
+    print(f"{path}: {plan.report()}")
+    with planner.track_peak() as peak:
+        _analyze_file(path, signal_id, args, strategy=plan.strategy)
+    print(f"{path}: {plan.report(peak.bytes)}")
+
+
+def _analyze_file(path, signal_id, args, strategy="memory"):
+    """Helper function that loads and analyzes one file.
+
+    Args:
+        path (str): The path to the file.
+        signal_id (str): The id of the signal, used for the output files.
+        args (argparse.Namespace): The parsed arguments.
+        strategy (str, optional): The strategy of the filters, see
+            :mod:`ps_signal.signals.planner`. Defaults to "memory".
+    """
+    # A preview of the file as recorded is plotted from the pyramid saved
+    # next to the file, without loading the data.
+    if args.preview and _plot_saved_preview(path, signal_id, args):
+        return
+
+    input_data = _load(path, args, strategy)
+    if input_data is None:
+        return
+
+    # A preview is plotted from the pyramid of the data, which is saved
+    # next to the file and reused on the next run.
+    if args.preview:
+        _plot_preview(input_data, path, signal_id, args)
+        return
+
+    # If the user wants to analyze the events, every window around an
+    # event is analyzed as a separate signal.
+    if args.events:
+        _load_or_detect_events(input_data, path, args)
+        event_slices = data.slice_events(
+            input_data,
+            before_ms=args.window[0],
+            after_ms=args.window[1]
+        )
+        print(f"Found {len(event_slices)} events in {path}.")
+        for number, event_slice in enumerate(event_slices, start=1):
+            event_signal = signals.Signal(
+                id=f"{signal_id}-Event_{number}",
+                input_data=event_slice
+            )
+            _process_signal(event_signal, args)
+        return
 
     # If the user wants just a part of the data, slice it. Else use all.
     if args.i:
@@ -32,24 +210,423 @@ def run_cli():
             end_ms=args.i[1]
         )
         input_signal = signals.Signal(
-            id="Signal_1",
+            id=signal_id,
             input_data=input_data_slice
         )
     else:
-        input_signal = signals.Signal(id="Signal_1", input_data=input_data)
+        input_signal = signals.Signal(id=signal_id, input_data=input_data)
+
+    _process_signal(input_signal, args)
+
+
+def _run_pipeline(args):
+    """Helper function that runs a pipeline file on all files and reports
+    the files that failed.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    configured = pipeline.load_pipeline(args.pipeline)
+    results = configured.run_many(args.file)
+    for path, result in results.items():
+        if isinstance(result, Exception):
+            print(f"{path}: failed: {result}")
+        else:
+            print(f"{path}: done")
+
+
+def _use_catalog(args):
+    """Helper function that adds the given files to the catalog and, if a
+    condition is given, replaces the files by the selected files.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        bool: True if the selected files should be analyzed.
+    """
+    captures = catalog.Catalog(args.catalog)
+    if args.file:
+        counts = captures.scan(
+            args.file,
+            loader=args.loader,
+            features=args.features
+        )
+        removed = captures.prune()
+        print(f"Catalog {args.catalog}: {counts['scanned']} scanned, "
+              f"{counts['unchanged']} unchanged, {counts['failed']} failed, "
+              f"{removed} removed.")
+
+    if not args.select:
+        return False
+
+    try:
+        args.file = captures.select(args.select)
+    except sqlite3.Error as error:
+        raise SystemExit(f"Invalid condition '{args.select}': {error}")
+    print(f"Selected {len(args.file)} files from {args.catalog}.")
+    return bool(args.file)
+
+
+def _queue_pipeline(args):
+    """Helper function that adds a job per file to a job queue, to be run
+    by workers.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    config = pipeline.read_config(args.pipeline)
+    queue = jobs.JobQueue(args.queue)
+    ids = queue.submit(args.file, config)
+    print(f"Added {len(ids)} jobs to {args.queue}: {queue.progress()}")
+
+
+def _load(path, args, strategy="memory"):
+    """Helper function that loads a file with the loader choosen by the
+    user and decimates it if wanted.
+
+    Args:
+        path (str): The path to the file.
+        args (argparse.Namespace): The parsed arguments.
+        strategy (str, optional): The strategy of the filters, see
+            :mod:`ps_signal.signals.planner`. Defaults to "memory".
+
+    Returns:
+        Data: The loaded data, None if it was rejected by the quality
+        check.
+    """
+    # Instantiate a Data object and load data from a file, using
+    # the file loader choosen by the user.
+    input_data = data.Data(loader=loaders.get_loader(args.loader))
+    input_data.load(path)
+    input_data.strategy = strategy
+
+    # The quality is checked on the samples as recorded, before they
+    # are changed by the decimation.
+    if args.quality:
+        input_data = _check_quality(input_data, path, args.quality)
+        if input_data is None:
+            return None
+
+    # Lower the sampling frequency before anything else, so that all
+    # following stages process fewer samples.
+    try:
+        input_data.decimate(factor=args.decimate, target_fs=args.target_fs)
+    except ValueError as error:
+        raise SystemExit(error)
+    return input_data
+
+
+def _check_quality(input_data, path, action):
+    """Helper function that scans the data for problems and reports them,
+    rejects the data or trims it to its longest clean interval.
+
+    Args:
+        input_data (Data): The loaded data.
+        path (str): The path to the file.
+        action (str): One of "report", "reject" or "trim".
+
+    Returns:
+        Data: The data to analyze, None if it was rejected.
+    """
+    report = input_data.check_quality()
+    print(f"{path}: quality {report.summary()}")
+    if report.ok or action == "report":
+        return input_data
+
+    if action == "reject":
+        print(f"Skipping {path}.")
+        return None
+
+    start, end = report.clean_interval()
+    if end - start < 2:
+        print(f"Skipping {path}: no clean interval.")
+        return None
+    print(f"Using samples {start}-{end} of {input_data.size}.")
+    return data.slice_clean(input_data, report)
+
+
+def _planned_stages(args):
+    """Helper function that describes the processing choosen by the user
+    as pipeline stages, used to plan the memory use.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        list: The stages, see :mod:`ps_signal.signals.pipeline`.
+    """
+    stages = []
+    if args.quality:
+        stages.append({"type": "quality"})
+    if args.decimate:
+        stages.append({"type": "decimate", "factor": args.decimate})
+    if args.i:
+        stages.append({"type": "slice"})
+    for kind, cutoff in (("lowpass", args.lp), ("highpass", args.hp),
+                         ("bandpass", args.bp), ("bandstop", args.bs)):
+        if cutoff and args.fir is None:
+            stages.append({"type": kind})
+        elif cutoff:
+            stages.append({"type": "fir_" + kind, "numtaps": args.fir})
+    if args.comb:
+        stages.append({"type": "comb", "track": args.track})
+    if args.octave:
+        stages.append({"type": "octave"})
+    if args.trend:
+        stages.append({"type": "trend"})
+
+    if args.zoom:
+        stages.append({"type": "fft", "mode": "zoom"})
+    elif args.envelope:
+        stages.append({"type": "fft", "mode": "envelope"})
+    elif args.goertzel:
+        stages.append({"type": "fft", "mode": "goertzel"})
+    elif args.fft:
+        stages.append({"type": "fft"})
+    return stages
+
+
+def _compare(args):
+    """Helper function that cross-correlates every file with the first
+    file and/or computes their coherence, as one batched call over all
+    pairs, and plots the result of every pair.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    if len(args.file) < 2:
+        raise SystemExit("Comparing requires at least two files.")
+
+    compared = []
+    for path in args.file:
+        input_data = _load(path, args)
+        if input_data is None:
+            continue
+        if args.i:
+            input_data = data.slice_data(
+                input_data,
+                start_ms=args.i[0],
+                end_ms=args.i[1]
+            )
+        signal_id = os.path.splitext(os.path.basename(path))[0]
+        input_signal = signals.Signal(id=signal_id, input_data=input_data)
+        _apply_filters(input_signal, args)
+        compared.append(input_signal)
+
+    if len(compared) < 2:
+        raise SystemExit("Comparing requires at least two files.")
+
+    reference = compared[0]
+    pairs = [(reference, other) for other in compared[1:]]
+    names = [f"{reference.id}-{other.id}" for other in compared[1:]]
+
+    if args.correlate is not None:
+        # A maximum lag of 0 means the default lag range.
+        results = correlation.cross_correlate_batch(
+            pairs,
+            max_lag_ms=args.correlate or None
+        )
+        for name, result in zip(names, results):
+            print(f"{name}: delay {result.delay_ms:.6g} ms, "
+                  f"correlation {result.peak:.3f}")
+            plot.plot_data(
+                style="correlation",
+                correlation=result,
+                output_filename=name,
+                title=name
+            )
+
+    if args.coherence:
+        results = correlation.coherence_batch(
+            pairs,
+            segment_size=args.coherence
+        )
+        for name, result in zip(names, results):
+            plot.plot_data(
+                style="coherence",
+                coherence=result,
+                output_filename=name,
+                title=name
+            )
+
+
+def _aggregate(args):
+    """Helper function that accumulates the spectra of all files and
+    plots the mean, max-hold, min-hold and percentile spectra.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    result = aggregate.aggregate_spectra(
+        args.file,
+        loader=loaders.get_loader(args.loader),
+        f_max=args.fmax,
+        bins=args.bins,
+        prepare=lambda signal: _apply_filters(signal, args)
+    )
+    print(f"Aggregated the spectra of {result.count} files.")
+    plot.plot_data(
+        style="aggregate",
+        spectrum=result,
+        output_filename="Aggregate",
+        title=f"Aggregate of {result.count} files"
+    )
+
+
+def _run_segments(args):
+    """Helper function that loads a segmented capture, filters all segments
+    at once, prints statistics of every segment and plots the segments
+    with their synchronous average.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+    """
+    source = args.file[0] if len(args.file) == 1 else args.file
+    result = segments.load_segments(source, loader=args.loader)
+
+    if args.lp:
+        result = result.filter("lowpass", args.lp)
+    if args.hp:
+        result = result.filter("highpass", args.hp)
+    if args.bp:
+        result = result.filter("bandpass", args.bp[0], args.bp[1])
+    if args.bs:
+        result = result.filter("bandstop", args.bs[0], args.bs[1])
+
+    print(f"{result.segments} segments of {result.samples} samples at "
+          f"{result.frequency_hz:.6g} Hz.")
+    print(result.statistics().to_string())
+
+    name = args.t or "Segments"
+    plot.plot_data(
+        style="segments",
+        segments=result,
+        output_filename=name,
+        title=name
+    )
+
+
+def _process_signal(input_signal, args):
+    """Helper function that applies the filters choosen by the user to a
+    signal and plots either the signal or its FFT, or adds it to a report.
+
+    Args:
+        input_signal (Signal): The signal to process.
+        args (argparse.Namespace): The parsed arguments.
+    """
+    _apply_filters(input_signal, args)
+
+    # The octave bands are plotted instead of the signal or its FFT.
+    if args.octave:
+        bands = octave.perform_octave_on_signal(input_signal,
+                                                fraction=args.octave)
+        plot.plot_data(
+            style="octave",
+            bands=bands,
+            output_filename=input_signal.output_filename,
+            title=input_signal.id
+        )
+        return
+
+    # The trend is saved and plotted instead of the signal or its FFT.
+    if args.trend:
+        if len(args.trend) > 2:
+            raise SystemExit("-trend takes a window and an optional hop.")
+        result = input_signal.calc_trend(*args.trend)
+        try:
+            trend.save_trend(result,
+                             f"{input_signal.output_filename}-trend.npz")
+        except OSError as error:
+            print(f"Could not save the trend: {error}")
+        plot.plot_data(
+            style="trend",
+            trend=result,
+            output_filename=input_signal.output_filename,
+            title=input_signal.id
+        )
+        return
+
+    if args.zoom:
+        input_signal.calc_fft(
+            mode="zoom",
+            f_start=args.zoom[0],
+            f_stop=args.zoom[1],
+            bins=args.bins
+        )
+    elif args.envelope:
+        input_signal.calc_fft(
+            mode="envelope",
+            f_start=args.envelope[0],
+            f_stop=args.envelope[1]
+        )
+    elif args.goertzel:
+        input_signal.calc_fft(mode="goertzel", frequencies=args.goertzel)
+    elif args.fft:
+        input_signal.calc_fft()
+
+    # A report holds both the signal and its FFT, drawn in the browser.
+    if args.report:
+        report.add_to_report(input_signal, args.report, title=args.t)
+    elif args.zoom or args.envelope or args.goertzel or args.fft:
+        input_signal.plot_fft()
+    else:
+        input_signal.plot_signal()
+
+
+def _apply_filters(input_signal, args):
+    """Helper function that applies the filters choosen by the user to a
+    signal, in place. A filter that does not fit the signal, e.g. an FIR
+    filter with more taps than there are samples, stops the run with the
+    error.
+
+    Args:
+        input_signal (Signal): The signal to filter.
+        args (argparse.Namespace): The parsed arguments.
+    """
+    try:
+        _apply_chosen_filters(input_signal, args)
+    except ValueError as error:
+        raise SystemExit(error)
+
+
+def _apply_chosen_filters(input_signal, args):
+    """Helper function that applies the filters choosen by the user to a
+    signal, in place, see :func:`_apply_filters`.
+
+    Args:
+        input_signal (Signal): The signal to filter.
+        args (argparse.Namespace): The parsed arguments.
+    """
+    # Singleton instances of the different kinds of filters. With -fir,
+    # the FIR filters are used, with the number of taps, if given.
+    if args.fir is None:
+        options = {}
+        lowpass_filter = filters.lowpass()
+        highpass_filter = filters.highpass()
+        bandpass_filter = filters.bandpass()
+        bandstop_filter = filters.bandstop()
+    else:
+        options = {"numtaps": args.fir or None}
+        lowpass_filter = filters.fir_lowpass()
+        highpass_filter = filters.fir_highpass()
+        bandpass_filter = filters.fir_bandpass()
+        bandstop_filter = filters.fir_bandstop()
 
     if args.lp:
         lowpass_filter(
             input_signal,
             cutoff=args.lp,
-            inplace=True
+            inplace=True,
+            **options
         )
 
     if args.hp:
         highpass_filter(
             input_signal,
             cutoff=args.hp,
-            inplace=True
+            inplace=True,
+            **options
         )
 
     if args.bp:
@@ -57,7 +634,8 @@ def run_cli():
             input_signal,
             cutoff=args.bp[0],
             cutoff_upper=args.bp[1],
-            inplace=True
+            inplace=True,
+            **options
         )
 
     if args.bs:
@@ -65,11 +643,132 @@ def run_cli():
             input_signal,
             cutoff=args.bs[0],
             cutoff_upper=args.bs[1],
+            inplace=True,
+            **options
+        )
+
+    if args.comb:
+        filters.comb()(
+            input_signal,
+            cutoff=args.comb[0],
+            harmonics=int(args.comb[1]),
+            track=args.track,
             inplace=True
         )
 
-    if args.fft:
-        input_signal.calc_fft()
-        input_signal.plot_fft()
+
+def _load_or_detect_events(input_data, path, args):
+    """Helper function that reuses the event index saved next to the file
+    if it was made with the same settings from the file as it is now.
+    Otherwise the events are detected and the index is saved for the next
+    run.
+
+    Args:
+        input_data (Data): The loaded data.
+        path (str): The path to the file.
+        args (argparse.Namespace): The parsed arguments.
+    """
+    saved = events.load_events(path)
+    if (saved is not None
+            and saved.method == args.events
+            and saved.frequency_hz == input_data.frequency_hz
+            and saved.params.get("holdoff_ms") == args.window[1]
+            and (args.threshold is None
+                 or saved.params.get("threshold") == args.threshold)):
+        input_data.events = saved
+        return
+
+    # Events closer than the window after an event are merged into it.
+    input_data.detect_events(
+        method=args.events,
+        threshold=args.threshold,
+        holdoff_ms=args.window[1]
+    )
+    try:
+        events.save_events(input_data.events, path)
+    except OSError as error:
+        print(f"Could not save the event index: {error}")
+
+
+def _plot_preview(input_data, path, signal_id, args):
+    """Helper function that plots a preview of the data, or the interval
+    choosen by the user, from the pyramid of the data. The pyramid of the
+    file as recorded is saved next to the file.
+
+    Args:
+        input_data (Data): The loaded data.
+        path (str): The path to the file.
+        signal_id (str): The id used for the output file.
+        args (argparse.Namespace): The parsed arguments.
+    """
+    saved = pyramid.load_pyramid(path) if _as_recorded(args) else None
+    if (saved is not None
+            and saved.size == input_data.size
+            and saved.frequency_hz == input_data.frequency_hz):
+        input_data.pyramid = saved
     else:
-        input_signal.plot_signal()
+        input_data.build_pyramid()
+        if _as_recorded(args):
+            try:
+                pyramid.save_pyramid(input_data.pyramid, path)
+            except OSError as error:
+                print(f"Could not save the pyramid: {error}")
+    _plot_pyramid(input_data.pyramid, signal_id, args)
+
+
+def _plot_saved_preview(path, signal_id, args):
+    """Helper function that plots a preview from the pyramid saved next to
+    the file, without loading the data. Intervals with fewer samples than
+    points need the samples themselves, and are not plotted.
+
+    Args:
+        path (str): The path to the file.
+        signal_id (str): The id used for the output file.
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        bool: True if the preview was plotted.
+    """
+    saved = pyramid.load_pyramid(path) if _as_recorded(args) else None
+    if saved is None:
+        return False
+    if args.i and ((args.i[1] - args.i[0]) * saved.frequency_hz / 1000
+                   <= args.preview):
+        return False
+    _plot_pyramid(saved, signal_id, args)
+    return True
+
+
+def _as_recorded(args):
+    """Helper function that tells if the data is analyzed as recorded,
+    i.e. not decimated or trimmed, so that the pyramid saved next to the
+    file describes it.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        bool: True if the data is analyzed as recorded.
+    """
+    return not (args.decimate or args.target_fs or args.quality)
+
+
+def _plot_pyramid(data_pyramid, signal_id, args):
+    """Helper function that plots the interval choosen by the user from a
+    pyramid.
+
+    Args:
+        data_pyramid (Pyramid): The pyramid of the data.
+        signal_id (str): The id used for the output file.
+        args (argparse.Namespace): The parsed arguments.
+    """
+    start_ms, end_ms = args.i if args.i else (None, None)
+    plot.plot_data(
+        style="preview",
+        pyramid=data_pyramid,
+        output_filename=signal_id,
+        start_ms=start_ms,
+        end_ms=end_ms,
+        width=args.preview,
+        title=signal_id
+    )
@@ -3,6 +3,7 @@
 import argparse
 import ps_signal as init
 from . import strings as s
+from ...signals import loaders
 
 
 def initialize_args_parser() -> argparse.ArgumentParser:
@@ -17,14 +18,103 @@ def initialize_args_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description=s.welcome,
                                      prog="ps_signal")
 
-    parser.add_argument("file", metavar="file", help=s.file)
+    parser.add_argument("file", metavar="file", nargs="*", help=s.file)
+
+    parser.add_argument("-catalog", metavar="database", required=False,
+                        help=s.catalog)
+
+    parser.add_argument("-select", metavar="condition", required=False,
+                        help=s.select)
+
+    parser.add_argument("-features", action="store_true", required=False,
+                        help=s.features)
+
+    parser.add_argument("-pipeline", metavar="config", required=False,
+                        help=s.pipeline)
+
+    parser.add_argument("-queue", metavar="database", required=False,
+                        help=s.queue)
+
+    parser.add_argument("-worker", action="store_true", required=False,
+                        help=s.worker)
+
+    parser.add_argument("-cancel", action="store_true", required=False,
+                        help=s.cancel)
+
+    parser.add_argument("-progress", action="store_true", required=False,
+                        help=s.progress)
+
+    parser.add_argument("-aggregate", action="store_true", required=False,
+                        help=s.aggregate)
+
+    parser.add_argument("-fmax", metavar="hz", required=False, type=float,
+                        help=s.fmax)
+
+    parser.add_argument("-correlate", metavar="max_lag", required=False,
+                        type=float, help=s.correlate)
+
+    parser.add_argument("-coherence", metavar="segment", required=False,
+                        type=int, help=s.coherence)
+
+    parser.add_argument("-segments", action="store_true", required=False,
+                        help=s.segments)
+
+    loader_names = ["auto", "cached"] + loaders.available_loaders()
+    parser.add_argument("-loader", metavar="name", required=False,
+                        default="auto", choices=loader_names,
+                        help=s.loader)
+
+    parser.add_argument("-budget", metavar="mb", required=False,
+                        type=float, help=s.budget)
+
+    parser.add_argument("-quality", metavar="action", required=False,
+                        choices=["report", "reject", "trim"],
+                        help=s.quality)
+
+    parser.add_argument("-decimate", metavar="factor", required=False,
+                        type=int, help=s.decimate)
+
+    parser.add_argument("-target-fs", metavar="hz", required=False,
+                        type=float, help=s.target_fs)
 
     parser.add_argument("-i", metavar=("lower", "upper"), nargs=2,
                         required=False, type=int, help=s.interval)
 
+    parser.add_argument("-events", metavar="method", required=False,
+                        choices=["threshold", "sta_lta", "peaks"],
+                        help=s.events)
+
+    parser.add_argument("-threshold", metavar="value", required=False,
+                        type=float, help=s.threshold)
+
+    parser.add_argument("-window", metavar=("before", "after"), nargs=2,
+                        required=False, type=float, default=[10.0, 10.0],
+                        help=s.window)
+
+    parser.add_argument("-preview", metavar="width", required=False,
+                        type=int, help=s.preview)
+
     parser.add_argument("-fft", action="store_true", required=False,
                         help=s.fft)
 
+    parser.add_argument("-zoom", metavar=("lower", "upper"), nargs=2,
+                        required=False, type=float, help=s.zoom)
+
+    parser.add_argument("-envelope", metavar=("lower", "upper"), nargs=2,
+                        required=False, type=float, help=s.envelope)
+
+    parser.add_argument("-bins", metavar="count", required=False, type=int,
+                        default=1024, help=s.bins)
+
+    parser.add_argument("-octave", metavar="fraction", required=False,
+                        type=int, help=s.octave)
+
+    parser.add_argument("-trend", metavar="ms", nargs="+", required=False,
+                        type=float, help=s.trend)
+
+    parser.add_argument("-goertzel", metavar="frequency", nargs="+",
+                        required=False, type=float, help=s.goertzel)
+
     parser.add_argument("-lp", metavar="cutoff", required=False, type=float,
                         help=s.lowpass)
 
@@ -37,6 +127,18 @@ def initialize_args_parser() -> argparse.ArgumentParser:
     parser.add_argument("-bp", metavar=("lower", "upper"), nargs=2,
                         required=False, type=float, help=s.bandpass)
 
+    parser.add_argument("-comb", metavar=("fundamental", "harmonics"),
+                        nargs=2, required=False, type=float, help=s.comb)
+
+    parser.add_argument("-track", action="store_true", required=False,
+                        help=s.track)
+
+    parser.add_argument("-fir", metavar="taps", required=False, type=int,
+                        help=s.fir)
+
+    parser.add_argument("-report", metavar="dir", required=False,
+                        help=s.report)
+
     parser.add_argument("-o", metavar="dir", required=False, type=int,
                         help=s.output)
 
@@ -56,4 +158,11 @@ def parse_args() -> argparse.Namespace:
         argparse.Namespace: A list with all by the the user choosen arguments.
     """
     parser = initialize_args_parser()
-    return parser.parse_args()
+    args = parser.parse_args()
+
+    # Without files, the files are selected from a catalog.
+    if args.select and not args.catalog:
+        parser.error("-select requires -catalog")
+    if not args.file and not args.select:
+        parser.error("the following arguments are required: file")
+    return args
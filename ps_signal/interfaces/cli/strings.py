@@ -5,9 +5,101 @@ initialized in :mod:`.cli_conf`
 welcome = "Python script for performing FFT and plotting \
            .csv data aquired from a Picoscope."
 
-file = "Path to the file containting the data in .csv format."
+file = "Path to the file containting the data in .csv format. Several \
+        files can be given, which are analyzed one by one or, with \
+        -aggregate, together. Can be left out with -catalog and -select."
+catalog = "Catalog database of captures. The given files are added to \
+           the catalog, or updated if they have changed, and files that no \
+           longer exist are removed. Without -select, nothing else is done."
+select = "Select the files to analyze from the catalog by a condition on \
+          its columns, e.g. 'frequency_hz = 100000 AND duration_s > 5'. The \
+          selected files are analyzed as if they were given as arguments."
+features = "With -catalog, also store the RMS and the dominant frequency \
+            (peak_hz) of every file."
+pipeline = "Run the pipeline described in a .json, .yaml or .toml file on \
+            all files, instead of the other arguments. The result of every \
+            stage is cached, so rerunning with changes to the last stages \
+            only reruns those stages."
+queue = "With -pipeline, add a job per file to the given job queue \
+         database instead of running the pipeline. The jobs are run by \
+         workers started with -worker."
+worker = "Treat the files as job queue databases and run their jobs until \
+          no jobs are left. Several workers can run at the same time, on \
+          one host or on hosts that share the storage."
+cancel = "Treat the files as job queue databases and cancel their pending \
+          and running jobs. Running jobs are stopped by their workers."
+progress = "Print the progress of every stage with its throughput and the \
+            estimated time left. Ctrl-C cancels the run without leaving \
+            partial output files."
+aggregate = "Accumulate the spectra of all files into mean, max-hold, \
+             min-hold and percentile spectra, plotted in one figure. The \
+             files are processed in parallel."
+fmax = "Highest frequency in Hz of the common frequency grid used by \
+        -aggregate. Defaults to the Nyquist frequency of the first file."
+correlate = "Cross-correlate every file with the first file, with lags up \
+             to max_lag ms, and print the delay of each file. Requires at \
+             least two files with the same sampling frequency."
+coherence = "Compute the coherence and cross-spectral density of every \
+             file with the first file, using Welch's method with segments \
+             of the given number of samples. Requires at least two files \
+             with the same sampling frequency."
+segments = "Treat the files as a segmented capture from rapid block mode: \
+            one segment per file, per member of a zip archive, or per \
+            restart of the time in a .csv. The filters are applied to all \
+            segments at once, statistics of each segment are printed and \
+            the segments are plotted with their synchronous average."
+loader = "Loader used to read the file. 'auto' picks the fastest loader \
+          that matches the file, 'cached' does the same and also writes \
+          a binary sidecar next to a text capture to speed up later runs. \
+          Defaults to 'auto'."
+budget = "Memory budget in MB. Before a file is loaded, its peak memory is \
+          estimated and the processing is done in memory, chunk by chunk \
+          or with memory-mapped temporary files to fit the budget. The \
+          predicted and actual peak are printed. 0 means half of the \
+          available memory."
+quality = "Scan the data for clipping, NaN or inf samples, flat segments \
+           and time gaps right after loading. 'report' prints the found \
+           problems, 'reject' skips files with problems and 'trim' \
+           analyzes the longest interval without problems."
+decimate = "Decimate the data by an integer factor right after loading. \
+            An anti-aliasing filter is applied and the sampling frequency \
+            is updated, so that all following stages process fewer samples."
+target_fs = "Resample the data to the given sampling frequency in Hz right \
+             after loading. Ignored if -decimate is given."
 interval = "The interval in the data you want to analyze."
+events = "Detect events in the data and analyze a window around each \
+          event as a separate signal. The method is one of 'threshold', \
+          'sta_lta' or 'peaks'. The event index is saved next to the file \
+          and reused on the next run."
+threshold = "Threshold for the event detection. For 'sta_lta' it is the \
+             STA/LTA ratio that triggers an event. By default 3.0 for \
+             'sta_lta' and 5 standard deviations of the data otherwise."
+window = "Window around each event to analyze, given in ms before and \
+          after the event. Defaults to 10 10."
+preview = "Plot a quick preview of the data, or of the interval given \
+           by -i, with the given number of points. The preview is made \
+           from a min/max pyramid that is saved next to the file, so \
+           later previews of the unchanged file, without -decimate, \
+           -target-fs or -quality, are made without loading the data. \
+           Intervals with fewer samples than points load the data."
 fft = "Apply fft on the signal."
+zoom = "Compute the spectrum only between the lower and upper frequency, \
+        given in Hz, using a zoom FFT. Much faster than a full FFT for a \
+        narrow band of a long signal."
+bins = "Number of frequencies computed by -zoom, or of the frequency \
+        grid used by -aggregate. Defaults to 1024."
+envelope = "Compute the spectrum of the envelope of the band between \
+            lower and upper, given in Hz, e.g. around a resonance excited \
+            by bearing or gear faults."
+octave = "Plot the levels of the fractional-octave bands, e.g. 1 for \
+          octaves and 3 for third octaves, overall and over time, instead \
+          of the signal or its FFT."
+trend = "Plot and save the RMS, peak-to-peak, crest factor and kurtosis \
+         of sliding windows of the given length in ms, optionally followed \
+         by the hop between the windows in ms, instead of the signal or its \
+         FFT. The trend is saved as a .npz file."
+goertzel = "Compute the amplitude only at the given frequencies, given \
+            in Hz, using the Goertzel algorithm."
 lowpass = "Apply low pass filter to the signal. Effectively removing \
                 frequencies that is higher than the cutoff. Cutoff \
                 given in Hz."
@@ -20,6 +112,21 @@ bandstop = "Apply band stop filter to the signal. Effectively removing \
 bandpass = "Apply band pass filter to the signal. Effectively removing \
                  all frequencies that is not between the specified \
                  frequencies. Cutoff given in Hz."
+comb = "Apply a comb filter that removes the fundamental frequency, given \
+        in Hz, and its harmonics, e.g. mains interference. The number of \
+        notches counts the fundamental as the first. All notches are \
+        applied in one pass."
+track = "Together with -comb, find the actual fundamental within 2 %% of \
+         the given one from the spectrum before filtering."
+fir = "Use linear-phase FIR filters with the given number of taps for -lp, \
+       -hp, -bp and -bs instead of Butterworth filters. The filters are \
+       applied with FFT overlap-save convolution, so long filters with \
+       steep transition bands stay fast. 0 picks the number of taps from \
+       a transition band of 10 %% of the lowest cutoff frequency."
+report = "Write the signals and their FFT to an HTML report in the given \
+          folder instead of PNG files. The report is a single page, \
+          index.html, that draws the decimated signals in the browser, \
+          and is much faster to write than the PNG files."
 output = "Folder for output. Note: Not a file but a folder as this \
                script will output several files."
 title = "Title that will be applied to the plot."
@@ -1,4 +1,4 @@
-"""Package that implements a CLI. Import structure will make the entry point
-of this package to :func:`.gui.run_gui`. Currently not implemented.
+"""Package that implements a GUI. Import structure will make the entry point
+of this package to :func:`.gui.run_gui`.
 """
 from .gui import *
@@ -1,15 +1,144 @@
 """Module that is the entry point from the interaces to invoke the GUI.
+
+The GUI itself is implemented in :mod:`.viewer` and is only imported when
+the GUI is started, as it needs tkinter. The jobs that the GUI runs in the
+background are implemented here, without any dependency on tkinter.
 """
+import copy
+from .worker import BackgroundWorker
+from ... import signals
+from ...signals import data
+from ...signals import filters
+from ...signals import loaders
+from ...signals import pyramid
+
+
+__all__ = ["run_gui", "load_job", "process_job"]
+
+
+# Number of samples to aim for in the first, coarse, result of a job.
+_PREVIEW_SAMPLES = 200_000
+
+# The preview keeps the sampling frequency at least this many times the
+# highest cutoff, so that all filters can be applied to the preview.
+_PREVIEW_CUTOFF_MARGIN = 2.5
 
 
 def run_gui():
     """Function that is the entry point into the GUI package. This is the
     function that will invoke and execute the GUI.
     """
-    print("GUI not implemented yet!")
+    try:
+        from . import viewer
+    except ImportError as error:
+        print(f"The GUI needs tkinter: {error}")
+        return
 
+    try:
+        window = viewer.Viewer(BackgroundWorker())
+    except viewer.tk.TclError as error:
+        print(f"Could not start the GUI: {error}")
+        return
+    window.run()
 
-def _gui_helper():
-    """Example of internal helper function. Not implemented.
+
+def load_job(path: str, loader_name: str = "auto", *, cancelled):
+    """Job that loads a file and builds its pyramid. Yields the Data object
+    once it can be previewed.
+
+    Args:
+        path (str): The path to the file.
+        loader_name (str, optional): The name of the loader, see
+            :func:`ps_signal.signals.loaders.get_loader`. Defaults to "auto".
+        cancelled (function): Returns True if the job has been superseded.
+
+    Yields:
+        Data: The loaded data with a pyramid.
     """
-    pass
+    input_data = data.Data(loader=loaders.get_loader(loader_name))
+    try:
+        input_data.load(path)
+    except SystemExit as error:
+        # The loaders exit on errors, which must not stop the GUI.
+        raise RuntimeError(str(error))
+
+    if cancelled():
+        return
+    input_data.build_pyramid()
+    yield input_data
+
+
+def process_job(input_data, settings: dict, *, cancelled):
+    """Job that filters the data and calculates the FFT. A coarse result
+    from decimated data is yielded first, followed by the result from the
+    full data.
+
+    Args:
+        input_data (Data): The loaded data.
+        settings (dict): The filters to apply. Possible keys are "lowpass"
+            and "highpass" with a cutoff, and "bandpass" and "bandstop" with
+            a tuple of the lower and upper cutoff. A value of None means
+            that the filter is not applied.
+        cancelled (function): Returns True if the job has been superseded.
+
+    Yields:
+        dict: The result with the keys "final", "pyramid", "fft" and
+        "filters".
+    """
+    for factor in _preview_factors(input_data, settings):
+        if cancelled():
+            return
+
+        # A shallow copy is decimated, which leaves the input untouched.
+        view = copy.copy(input_data)
+        if factor > 1:
+            view.decimate(factor=factor)
+
+        signal = signals.Signal(id="Signal_1", input_data=view)
+        _apply_filters(signal, settings)
+        if cancelled():
+            return
+
+        signal.calc_fft()
+        yield {
+            "final": factor == 1,
+            "pyramid": pyramid.build_pyramid(
+                signal.data.acc.to_numpy(),
+                signal.frequency_hz,
+                start_ms=signal.data.time.iloc[0]
+            ),
+            "fft": signal._fft,
+            "filters": signal.filter_string
+        }
+
+
+def _preview_factors(input_data, settings: dict) -> list:
+    """Helper function that returns the decimation factors of the results
+    of :func:`process_job`, coarsest first and always ending with 1."""
+    cutoffs = [1.0]
+    for value in settings.values():
+        if value is not None:
+            cutoffs.extend(value if isinstance(value, tuple) else [value])
+
+    by_size = input_data.size // _PREVIEW_SAMPLES
+    by_cutoff = int(input_data.frequency_hz
+                    / (_PREVIEW_CUTOFF_MARGIN * 2 * max(cutoffs)))
+    factor = min(by_size, by_cutoff)
+    return [factor, 1] if factor > 1 else [1]
+
+
+def _apply_filters(signal, settings: dict) -> None:
+    """Helper function that applies the filters in the settings in place,
+    in the same order as the CLI."""
+    if settings.get("lowpass"):
+        filters.lowpass()(signal, cutoff=settings["lowpass"], inplace=True)
+    if settings.get("highpass"):
+        filters.highpass()(signal, cutoff=settings["highpass"], inplace=True)
+    if settings.get("bandpass"):
+        lower, upper = settings["bandpass"]
+        filters.bandpass()(signal, cutoff=lower, cutoff_upper=upper,
+                           inplace=True)
+    if settings.get("bandstop"):
+        lower, upper = settings["bandstop"]
+        filters.bandstop()(signal, cutoff=lower, cutoff_upper=upper,
+                           inplace=True)
@@ -0,0 +1,181 @@
+"""Module that contains the main window of the GUI, built with tkinter and
+matplotlib. All heavy work is submitted to a :class:`.worker.BackgroundWorker`
+and the results are polled from the tkinter event loop, so the window stays
+responsive while data is loaded and processed.
+"""
+import tkinter as tk
+from tkinter import filedialog, ttk
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from . import gui
+
+
+# Time between two polls of the background worker, in ms.
+_POLL_INTERVAL_MS = 50
+
+# Fallback width in points of the time series, used before the window is
+# drawn for the first time.
+_DEFAULT_WIDTH = 1000
+
+
+class Viewer:
+    """Class for the main window of the GUI. The window has a toolbar for
+    opening a file and setting filter cutoffs, a time series plot and a
+    spectrum plot. Changing a cutoff starts a new processing job, which
+    supersedes the previous one.
+
+    Args:
+        worker (BackgroundWorker): The worker that runs the jobs.
+        root (tk.Tk, optional): The root window. Defaults to None, which
+            creates a new one.
+    """
+    def __init__(self, worker, root=None) -> None:
+        self._worker = worker
+        self._root = root or tk.Tk()
+        self._root.title("ps_signal")
+        self._root.protocol("WM_DELETE_WINDOW", self.close)
+
+        self._data = None
+        self._status = tk.StringVar(value="Open a file to start.")
+        self._cutoffs = {
+            name: tk.StringVar()
+            for name in ("lowpass", "highpass", "bandpass_lower",
+                         "bandpass_upper", "bandstop_lower",
+                         "bandstop_upper")
+        }
+
+        self._build_toolbar()
+        self._build_plots()
+        ttk.Label(self._root, textvariable=self._status).pack(
+            side=tk.BOTTOM, fill=tk.X
+        )
+        self._root.after(_POLL_INTERVAL_MS, self._poll)
+
+    def run(self) -> None:
+        """Method that runs the event loop until the window is closed."""
+        self._root.mainloop()
+
+    def close(self) -> None:
+        """Method that stops the background worker and closes the window."""
+        self._worker.shutdown()
+        self._root.destroy()
+
+    def open_file(self, path: str = None) -> None:
+        """Method that starts loading a file in the background.
+
+        Args:
+            path (str, optional): The path to the file. Defaults to None,
+                which asks the user for a file.
+        """
+        path = path or filedialog.askopenfilename()
+        if not path:
+            return
+        self._status.set(f"Loading {path}...")
+        self._worker.cancel("process")
+        self._worker.submit("load", gui.load_job, path)
+
+    def apply_settings(self, *args) -> None:
+        """Method that starts processing the loaded data with the current
+        filter settings, superseding any earlier processing."""
+        if self._data is None:
+            return
+        try:
+            settings = self._settings()
+        except ValueError:
+            self._status.set("Cutoffs must be numbers.")
+            return
+        self._status.set("Processing...")
+        self._worker.submit("process", gui.process_job, self._data, settings)
+
+    def _settings(self) -> dict:
+        """Helper method that reads the filter settings from the entries."""
+        def value(name):
+            text = self._cutoffs[name].get().strip()
+            return float(text) if text else None
+
+        def band(name):
+            lower, upper = value(f"{name}_lower"), value(f"{name}_upper")
+            return (lower, upper) if lower and upper else None
+
+        return {
+            "lowpass": value("lowpass"),
+            "highpass": value("highpass"),
+            "bandpass": band("bandpass"),
+            "bandstop": band("bandstop")
+        }
+
+    def _build_toolbar(self) -> None:
+        """Helper method that creates the toolbar."""
+        toolbar = ttk.Frame(self._root)
+        toolbar.pack(side=tk.TOP, fill=tk.X)
+        ttk.Button(toolbar, text="Open...",
+                   command=self.open_file).pack(side=tk.LEFT)
+
+        labels = (("Lowpass", "lowpass"), ("Highpass", "highpass"),
+                  ("Bandpass", "bandpass_lower"), ("-", "bandpass_upper"),
+                  ("Bandstop", "bandstop_lower"), ("-", "bandstop_upper"))
+        for text, name in labels:
+            ttk.Label(toolbar, text=text).pack(side=tk.LEFT, padx=(8, 2))
+            entry = ttk.Entry(toolbar, width=8,
+                              textvariable=self._cutoffs[name])
+            entry.pack(side=tk.LEFT)
+            entry.bind("<Return>", self.apply_settings)
+
+        ttk.Button(toolbar, text="Apply",
+                   command=self.apply_settings).pack(side=tk.LEFT, padx=8)
+
+    def _build_plots(self) -> None:
+        """Helper method that creates the figure with the time series and
+        spectrum axes."""
+        self._figure = Figure(figsize=(10, 7))
+        self._time_axes = self._figure.add_subplot(2, 1, 1)
+        self._fft_axes = self._figure.add_subplot(2, 1, 2)
+        self._canvas = FigureCanvasTkAgg(self._figure, master=self._root)
+        self._canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH,
+                                          expand=True)
+
+    def _poll(self) -> None:
+        """Helper method that handles the results of the background jobs
+        and schedules the next poll."""
+        for kind, result in self._worker.poll():
+            if isinstance(result, Exception):
+                self._status.set(f"Error: {result}")
+            elif kind == "load":
+                self._on_loaded(result)
+            elif kind == "process":
+                self._on_processed(result)
+        self._root.after(_POLL_INTERVAL_MS, self._poll)
+
+    def _on_loaded(self, input_data) -> None:
+        """Helper method that shows a preview of newly loaded data and
+        starts processing it."""
+        self._data = input_data
+        self._plot_time_series(input_data.pyramid, "")
+        self._fft_axes.clear()
+        self._canvas.draw_idle()
+        self.apply_settings()
+
+    def _on_processed(self, result: dict) -> None:
+        """Helper method that shows a result of a processing job."""
+        self._plot_time_series(result["pyramid"], result["filters"])
+        self._fft_axes.clear()
+        self._fft_axes.set(xlabel="Frequency", ylabel="Amplitude",
+                           title="FFT")
+        self._fft_axes.plot(result["fft"].x, result["fft"].y, linewidth=0.5)
+        self._canvas.draw_idle()
+
+        state = "Done." if result["final"] else "Preview, refining..."
+        self._status.set(f"{state} Applied filters: {result['filters']}")
+
+    def _plot_time_series(self, pyramid, filter_string: str) -> None:
+        """Helper method that plots a pyramid at the width of the canvas."""
+        width = self._canvas.get_tk_widget().winfo_width()
+        time, mins, maxs, means = pyramid.render(
+            width=width if width > 1 else _DEFAULT_WIDTH
+        )
+        self._time_axes.clear()
+        self._time_axes.set(xlabel="Time (ms)", ylabel="Amplitude",
+                            title=f"Time series\nApplied filters: "
+                                  f"{filter_string}")
+        self._time_axes.fill_between(time, mins, maxs, alpha=0.5)
+        self._time_axes.plot(time, means, linewidth=0.5)
@@ -0,0 +1,101 @@
+"""Module that contains the background worker of the GUI. Loading, filtering
+and FFT are run as jobs in background threads, so the GUI never waits for
+them. A job is a generator that yields its results progressively, e.g. a
+coarse preview first and the full result last.
+
+Submitting a new job of a kind supersedes the previous job of the same
+kind. A superseded job is cancelled at its next yield or next check of
+the cancellation callback, and any results it still produces are dropped.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+__all__ = ["BackgroundWorker"]
+
+
+class BackgroundWorker:
+    """Class that runs jobs in background threads and collects their
+    results for the GUI thread.
+
+    Args:
+        max_workers (int, optional): Number of background threads.
+            Defaults to 2, i.e. loading does not block processing.
+    """
+    def __init__(self, max_workers: int = 2) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._generations = dict()
+        self._lock = threading.Lock()
+        self._results = queue.Queue()
+
+    def submit(self, kind: str, job, *args) -> None:
+        """Method that starts a job in the background and cancels any
+        earlier job of the same kind.
+
+        Args:
+            kind (str): The kind of job, e.g. "load" or "process".
+            job (function): A generator function. It is called with args
+                and the keyword argument "cancelled", a function returning
+                True when the job has been superseded.
+            *args: Arguments passed on to the job.
+        """
+        with self._lock:
+            generation = self._generations.get(kind, 0) + 1
+            self._generations[kind] = generation
+        self._executor.submit(self._run, kind, generation, job, args)
+
+    def cancel(self, kind: str) -> None:
+        """Method that cancels the current job of a kind.
+
+        Args:
+            kind (str): The kind of job.
+        """
+        with self._lock:
+            self._generations[kind] = self._generations.get(kind, 0) + 1
+
+    def poll(self) -> list:
+        """Method that returns all results produced since the last call,
+        without waiting. Intended to be called periodically from the
+        GUI thread.
+
+        Returns:
+            list: Tuples of the kind of job and the result. If a job failed,
+            the result is the raised exception.
+        """
+        results = []
+        while True:
+            try:
+                results.append(self._results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def shutdown(self) -> None:
+        """Method that cancels all jobs and stops the background threads."""
+        with self._lock:
+            for kind in self._generations:
+                self._generations[kind] += 1
+        self._executor.shutdown(wait=False)
+
+    def _is_current(self, kind: str, generation: int) -> bool:
+        """Helper method that checks if a job is still the latest of
+        its kind."""
+        with self._lock:
+            return self._generations.get(kind) == generation
+
+    def _run(self, kind: str, generation: int, job, args) -> None:
+        """Helper method that runs a job in a background thread and queues
+        its results as long as the job is not superseded."""
+        def cancelled():
+            return not self._is_current(kind, generation)
+
+        if cancelled():
+            return
+        try:
+            for result in job(*args, cancelled=cancelled):
+                if cancelled():
+                    return
+                self._results.put((kind, result))
+        except Exception as error:
+            if not cancelled():
+                self._results.put((kind, error))
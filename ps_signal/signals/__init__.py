@@ -5,3 +5,21 @@ from .subsignal import *
 from .filters import *
 from .plot import *
 from .data import *
+from .loaders import *
+from .events import *
+from .resample import *
+from .pyramid import *
+from .aggregate import *
+from .correlation import *
+from .pipeline import *
+from .jobs import *
+from .catalog import *
+from .envelope import *
+from .quality import *
+from .planner import *
+from .report import *
+from .segments import *
+from .expressions import *
+from .progress import *
+from .octave import *
+from .trend import *
@@ -0,0 +1,312 @@
+"""Module that contains spectral averaging across many captures. The spectra
+of the captures are put on a common frequency grid and accumulated one at a
+time into the mean, max-hold, min-hold and percentile spectra. Memory use
+depends on the number of bins in the grid, not on the number of captures.
+
+Percentiles are estimated with the P² algorithm (Jain & Chlamtac, 1985),
+which keeps five markers per bin and percentile instead of all values.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from . import progress
+from .fft import FFT
+from .data import Data, picoscope_data_loader
+from .signal import Signal
+
+
+__all__ = ["AggregateFFT", "SpectrumAccumulator", "aggregate_spectra"]
+
+
+class AggregateFFT(FFT):
+    """Class for the result of spectral averaging. Works as an :class:`FFT`
+    with the mean spectrum as y-axis, with the other spectra as extra
+    properties.
+
+    Args:
+        x (np.ndarray): The frequency grid in kHz.
+        mean (np.ndarray): The mean spectrum.
+        max_hold (np.ndarray): The maximum of every bin.
+        min_hold (np.ndarray): The minimum of every bin.
+        percentiles (dict): Percentile spectra keyed by the percentile.
+        count (int): The number of accumulated spectra.
+    """
+    def __init__(self, x, mean, max_hold, min_hold, percentiles, count):
+        super().__init__(x, mean)
+        self._max_hold = max_hold
+        self._min_hold = min_hold
+        self._percentiles = percentiles
+        self._count = count
+
+    @property
+    def max_hold(self):
+        """The maximum of every bin over all spectra."""
+        return self._max_hold
+
+    @property
+    def min_hold(self):
+        """The minimum of every bin over all spectra."""
+        return self._min_hold
+
+    @property
+    def percentiles(self) -> dict:
+        """The percentile spectra, keyed by the percentile (0-100)."""
+        return self._percentiles
+
+    @property
+    def count(self) -> int:
+        """The number of accumulated spectra."""
+        return self._count
+
+
+class SpectrumAccumulator:
+    """Class that accumulates spectra on a common frequency grid.
+
+    Args:
+        grid (np.ndarray): The frequency grid in kHz, i.e. the same unit as
+            :attr:`.fft.FFT.x`.
+        percentiles (tuple, optional): Percentiles (0-100) to estimate.
+            Defaults to (50, 90).
+    """
+    def __init__(self, grid, percentiles=(50, 90)) -> None:
+        self._grid = np.asarray(grid, dtype=np.float64)
+        self._count = 0
+        self._mean = np.zeros(len(self._grid))
+        self._max = np.full(len(self._grid), -np.inf)
+        self._min = np.full(len(self._grid), np.inf)
+        self._quantiles = {p: _P2Quantile(p / 100, len(self._grid))
+                           for p in percentiles}
+
+    @property
+    def count(self) -> int:
+        """The number of accumulated spectra."""
+        return self._count
+
+    def add(self, spectrum: FFT) -> None:
+        """Method that adds a spectrum, after putting it on the grid
+        with :func:`to_grid`.
+
+        Args:
+            spectrum (FFT): The spectrum to add.
+        """
+        self.add_values(to_grid(spectrum.x, spectrum.y, self._grid))
+
+    def add_values(self, values: np.ndarray) -> None:
+        """Method that adds a spectrum that already is on the grid.
+
+        Args:
+            values (np.ndarray): The amplitude of every bin of the grid.
+        """
+        self._count += 1
+        self._mean += (values - self._mean) / self._count
+        np.maximum(self._max, values, out=self._max)
+        np.minimum(self._min, values, out=self._min)
+        for quantile in self._quantiles.values():
+            quantile.add(values)
+
+    def result(self) -> AggregateFFT:
+        """Method that returns the accumulated spectra.
+
+        Returns:
+            AggregateFFT: The mean, max-hold, min-hold and percentiles.
+        """
+        return AggregateFFT(
+            self._grid,
+            self._mean.copy(),
+            self._max.copy(),
+            self._min.copy(),
+            {p: q.value() for p, q in self._quantiles.items()},
+            self._count
+        )
+
+
+def to_grid(x: np.ndarray, y: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """Function that puts a spectrum on a frequency grid. If the spectrum is
+    finer than the grid, every grid bin gets the maximum of the spectrum
+    bins closest to it, so that narrow peaks are kept. Otherwise the
+    spectrum is linearly interpolated.
+
+    Args:
+        x (np.ndarray): The frequencies of the spectrum, increasing.
+        y (np.ndarray): The amplitudes of the spectrum.
+        grid (np.ndarray): The frequencies of the grid, evenly spaced.
+
+    Returns:
+        np.ndarray: The amplitude at every frequency of the grid.
+    """
+    step = grid[1] - grid[0] if len(grid) > 1 else np.inf
+    source_step = x[1] - x[0] if len(x) > 1 else np.inf
+    if source_step >= step:
+        return np.interp(grid, x, y, left=0.0, right=0.0)
+
+    # Index of the closest grid bin for every spectrum bin. As x is
+    # increasing, the indices are too and every grid bin is one run.
+    index = np.rint((x - grid[0]) / step).astype(np.int64)
+    inside = (index >= 0) & (index < len(grid))
+    index, y = index[inside], y[inside]
+
+    values = np.zeros(len(grid))
+    if len(index):
+        starts = np.flatnonzero(np.diff(index, prepend=-1))
+        values[index[starts]] = np.maximum.reduceat(y, starts)
+    return values
+
+
+def aggregate_spectra(files: list, loader=picoscope_data_loader,
+                      f_max: float = None, bins: int = 4096,
+                      percentiles: tuple = (50, 90), prepare=None,
+                      max_workers: int = None) -> AggregateFFT:
+    """Function that streams over many captures and accumulates their
+    spectra, see :class:`SpectrumAccumulator`. The captures are loaded and
+    transformed in parallel, while at most a few spectra are kept in memory
+    at the same time.
+
+    The amplitude of every spectrum is divided by the number of samples,
+    so that captures of different lengths can be averaged.
+
+    Args:
+        files (list): Paths to the captures.
+        loader (function, optional): The file loader. Defaults to
+            picoscope_data_loader.
+        f_max (float, optional): The highest frequency of the grid in Hz.
+            Defaults to None, which uses the Nyquist frequency of the first
+            capture in the list that can be processed. It is processed
+            before the others are started, so the grid does not depend on
+            which capture finishes first.
+        bins (int, optional): The number of bins of the grid.
+            Defaults to 4096.
+        percentiles (tuple, optional): Percentiles (0-100) to estimate.
+            Defaults to (50, 90).
+        prepare (function, optional): Called with every Signal before the
+            FFT, e.g. to apply filters. Defaults to None.
+        max_workers (int, optional): Number of captures processed in
+            parallel. Defaults to None, i.e. the number of CPUs.
+
+    Returns:
+        AggregateFFT: The accumulated spectra.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    pending = list(files)
+    accumulator = None
+    if f_max:
+        accumulator = SpectrumAccumulator(np.linspace(0, f_max / 1000, bins),
+                                          percentiles)
+
+    def spectrum_of(path):
+        input_data = Data(loader=loader)
+        try:
+            input_data.load(path)
+        except SystemExit as error:
+            raise RuntimeError(f"{path}: {error}")
+        signal = Signal(id=os.path.basename(path), input_data=input_data)
+        if prepare is not None:
+            prepare(signal)
+        signal.calc_fft()
+        return FFT(signal._fft.x, signal._fft.y / signal.size)
+
+    # The grid is taken from the first capture, in the order given.
+    while accumulator is None and pending:
+        try:
+            spectrum = spectrum_of(pending.pop(0))
+        except Exception as error:
+            print(f"Skipping capture: {error}")
+            continue
+        accumulator = SpectrumAccumulator(
+            np.linspace(0, spectrum.x[-1], bins),
+            percentiles
+        )
+        accumulator.add(spectrum)
+        progress.update("files", len(files) - len(pending), len(files),
+                        "files")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = set()
+        while pending or running:
+            # Keep a bounded number of captures in flight.
+            while pending and len(running) < 2 * max_workers:
+                running.add(executor.submit(progress.bind(spectrum_of),
+                                            pending.pop(0)))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    spectrum = future.result()
+                except Exception as error:
+                    print(f"Skipping capture: {error}")
+                    continue
+                accumulator.add(spectrum)
+            progress.update("files", len(files) - len(pending) - len(running),
+                            len(files), "files")
+
+    if accumulator is None:
+        raise ValueError("No captures could be processed.")
+    return accumulator.result()
+
+
+class _P2Quantile:
+    """Helper class that estimates a quantile of every bin with the P²
+    algorithm, vectorized over the bins.
+
+    Args:
+        p (float): The quantile (0-1).
+        bins (int): The number of bins.
+    """
+    def __init__(self, p: float, bins: int) -> None:
+        self._p = p
+        self._count = 0
+        self._heights = np.zeros((5, bins))
+        self._positions = np.tile(np.arange(1.0, 6.0)[:, None], (1, bins))
+        self._desired = np.array([1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5])
+        self._increments = np.array([0, p / 2, p, (1 + p) / 2, 1])
+
+    def add(self, values: np.ndarray) -> None:
+        """Method that adds one observation per bin."""
+        if self._count < 5:
+            self._heights[self._count] = values
+            self._count += 1
+            if self._count == 5:
+                self._heights.sort(axis=0)
+            return
+        self._count += 1
+
+        q, n = self._heights, self._positions
+        np.minimum(q[0], values, out=q[0])
+        np.maximum(q[4], values, out=q[4])
+
+        # Cell of every observation and the markers to the right of it.
+        cell = (values >= q[1]).astype(int) + (values >= q[2]) \
+            + (values >= q[3])
+        n += np.arange(5)[:, None] > cell[None, :]
+        self._desired = self._desired + self._increments
+
+        for i in (1, 2, 3):
+            d = self._desired[i] - n[i]
+            move = (((d >= 1) & (n[i + 1] - n[i] > 1))
+                    | ((d <= -1) & (n[i - 1] - n[i] < -1)))
+            if not move.any():
+                continue
+            step = np.sign(d) * move
+
+            parabolic = q[i] + step / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + step) * (q[i + 1] - q[i])
+                / (n[i + 1] - n[i])
+                + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1])
+                / (n[i] - n[i - 1])
+            )
+            neighbour = np.where(step > 0, q[i + 1], q[i - 1])
+            neighbour_n = np.where(step > 0, n[i + 1], n[i - 1])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                linear = (q[i] + step * (neighbour - q[i])
+                          / (neighbour_n - n[i]))
+
+            valid = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+            updated = np.where(valid, parabolic, linear)
+            q[i] = np.where(move, updated, q[i])
+            n[i] += step
+
+    def value(self) -> np.ndarray:
+        """Method that returns the current estimate of every bin."""
+        if self._count < 5:
+            return np.percentile(self._heights[:self._count], self._p * 100,
+                                 axis=0)
+        return self._heights[2].copy()
@@ -0,0 +1,271 @@
+"""Module that contains a catalog of captures. Every capture is loaded once
+and its metadata is stored in an indexed SQLite database, so that questions
+such as "which captures were sampled at 100 kHz and are longer than 5 s"
+are answered without loading any capture.
+
+The catalog is updated incrementally. A capture is only loaded again if its
+size or modification time has changed since it was scanned.
+
+The stored columns, which can be used in :meth:`Catalog.select`, are:
+
+* path - The absolute path to the capture.
+* loader - The name of the loader that read the capture.
+* units - The units of the time and amplitude, e.g. "ms,mV".
+* frequency_hz - The sampling frequency.
+* size - The number of samples.
+* trigger_offset_ms - The time of the first sample, e.g. -200 with a
+  pre-trigger.
+* duration_s - The length of the capture in seconds.
+* rms - The RMS of the amplitude, only with features.
+* peak_hz - The frequency with the largest amplitude in the spectrum,
+  excluding DC, only with features.
+* peak_amplitude - The amplitude at peak_hz, only with features.
+"""
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from urllib.request import pathname2url
+import numpy as np
+from scipy.fft import rfft, rfftfreq
+from . import loaders
+from .data import Data
+
+
+__all__ = ["Catalog"]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    file_size INTEGER NOT NULL,
+    loader TEXT,
+    units TEXT,
+    frequency_hz REAL,
+    size INTEGER,
+    trigger_offset_ms REAL,
+    duration_s REAL,
+    rms REAL,
+    peak_hz REAL,
+    peak_amplitude REAL,
+    scanned REAL
+);
+CREATE INDEX IF NOT EXISTS captures_frequency ON captures (frequency_hz);
+CREATE INDEX IF NOT EXISTS captures_duration ON captures (duration_s);
+CREATE INDEX IF NOT EXISTS captures_peak ON captures (peak_hz);
+"""
+
+_COLUMNS = ("path", "mtime_ns", "file_size", "loader", "units",
+            "frequency_hz", "size", "trigger_offset_ms", "duration_s", "rms",
+            "peak_hz", "peak_amplitude", "scanned")
+
+
+class Catalog:
+    """Class for a catalog of captures stored in a SQLite database. The
+    database is created if it does not exist.
+
+    Args:
+        path (str): The path to the database.
+    """
+    def __init__(self, path: str) -> None:
+        self._path = path
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def __repr__(self):
+        """For printing out information about the Catalog object."""
+        return f"catalog_{self._path}"
+
+    @property
+    def path(self) -> str:
+        """The path to the database."""
+        return self._path
+
+    def scan(self, files: list, loader: str = "auto", features: bool = False,
+             max_workers: int = None) -> dict:
+        """Method that adds captures to the catalog, or updates them if they
+        have changed since they were scanned. Unchanged captures are not
+        loaded. The captures are loaded in parallel.
+
+        Args:
+            files (list): Paths to the captures.
+            loader (str, optional): Name of the loader, see
+                :func:`.loaders.get_loader`. Defaults to "auto".
+            features (bool, optional): Also compute the RMS and the dominant
+                frequency of every capture. Defaults to False.
+            max_workers (int, optional): Number of captures loaded in
+                parallel. Defaults to None, i.e. the number of CPUs.
+
+        Returns:
+            dict: The number of "scanned", "unchanged" and "failed" captures.
+        """
+        with self._connect() as connection:
+            known = {
+                path: (mtime_ns, file_size)
+                for path, mtime_ns, file_size in connection.execute(
+                    "SELECT path, mtime_ns, file_size FROM captures"
+                )
+            }
+
+        changed = []
+        counts = {"scanned": 0, "unchanged": 0, "failed": 0}
+        for path in files:
+            path = os.path.abspath(path)
+            try:
+                status = os.stat(path)
+            except OSError as error:
+                print(f"Skipping {path}: {error}")
+                counts["failed"] += 1
+                continue
+            if known.get(path) == (status.st_mtime_ns, status.st_size):
+                counts["unchanged"] += 1
+            else:
+                changed.append((path, status))
+
+        def describe(item):
+            path, status = item
+            try:
+                return _describe(path, status, loader, features)
+            except SystemExit as error:
+                return RuntimeError(f"{path}: {error}")
+            except Exception as error:
+                return error
+
+        max_workers = max_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Rows are written as they come, so an interrupted scan keeps
+            # the captures scanned so far.
+            for (path, _), row in zip(changed,
+                                      executor.map(describe, changed)):
+                if isinstance(row, Exception):
+                    print(f"Skipping {path}: {row}")
+                    counts["failed"] += 1
+                    continue
+                with self._connect() as connection:
+                    connection.execute(
+                        f"INSERT OR REPLACE INTO captures "
+                        f"({', '.join(_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                        tuple(row[column] for column in _COLUMNS)
+                    )
+                counts["scanned"] += 1
+        return counts
+
+    def prune(self) -> int:
+        """Method that removes captures that no longer exist on disk.
+
+        Returns:
+            int: The number of removed captures.
+        """
+        with self._connect() as connection:
+            missing = [
+                (path,) for (path,) in connection.execute(
+                    "SELECT path FROM captures"
+                )
+                if not os.path.exists(path)
+            ]
+            connection.executemany(
+                "DELETE FROM captures WHERE path = ?", missing
+            )
+        return len(missing)
+
+    def select(self, condition: str = None, parameters: tuple = ()) -> list:
+        """Method that returns the paths of the captures matching a
+        condition. The condition is the WHERE clause of an SQL query on the
+        columns listed in the module description, run on a read-only
+        connection.
+
+        Examples:
+
+            .. code-block:: python
+
+                catalog.select("frequency_hz = 100000 AND duration_s > 5")
+                catalog.select("abs(peak_hz - ?) < 50", (1200,))
+
+        Args:
+            condition (str, optional): The condition. Defaults to None,
+                i.e. all captures.
+            parameters (tuple, optional): Values for the placeholders in the
+                condition. Defaults to ().
+
+        Returns:
+            list: The paths of the matching captures, sorted.
+        """
+        query = "SELECT path FROM captures"
+        if condition:
+            query += f" WHERE {condition}"
+        query += " ORDER BY path"
+
+        uri = "file:" + pathname2url(os.path.abspath(self._path)) + "?mode=ro"
+        with closing(sqlite3.connect(uri, uri=True)) as connection:
+            return [path for (path,) in connection.execute(query, parameters)]
+
+    def describe(self, path: str) -> dict:
+        """Method that returns the stored metadata of a capture.
+
+        Args:
+            path (str): The path to the capture.
+
+        Returns:
+            dict: The metadata keyed by the column, None if the capture is
+            not in the catalog.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM captures WHERE path = ?",
+                (os.path.abspath(path),)
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def __len__(self) -> int:
+        """The number of captures in the catalog."""
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM captures"
+            ).fetchone()[0]
+
+    def _connect(self):
+        """Helper method that opens a connection in autocommit mode, closed
+        when leaving the with-block."""
+        return closing(sqlite3.connect(self._path, timeout=60,
+                                       isolation_level=None))
+
+
+def _describe(path: str, status: os.stat_result, loader: str,
+              features: bool) -> dict:
+    """Helper function that loads a capture and computes its metadata."""
+    input_data = Data(loader=loaders.get_loader(loader))
+    input_data.load(path)
+
+    row = {
+        "path": path,
+        "mtime_ns": status.st_mtime_ns,
+        "file_size": status.st_size,
+        "loader": input_data.data.attrs.get("loader", loader),
+        "units": ",".join(input_data.data.attrs.get("units", ())) or None,
+        "frequency_hz": float(input_data.frequency_hz),
+        "size": int(input_data.size),
+        "trigger_offset_ms": _float_or_none(input_data.trigger_offset),
+        "duration_s": input_data.size * input_data.period,
+        "rms": None,
+        "peak_hz": None,
+        "peak_amplitude": None,
+        "scanned": time.time(),
+    }
+
+    if features and input_data.size > 1:
+        values = input_data.data.acc.to_numpy(dtype=np.float64)
+        row["rms"] = float(np.sqrt(np.mean(values ** 2)))
+        spectrum = np.abs(rfft(values))
+        frequencies = rfftfreq(len(values), input_data.period)
+        peak = int(np.argmax(spectrum[1:])) + 1
+        row["peak_hz"] = float(frequencies[peak])
+        row["peak_amplitude"] = float(spectrum[peak])
+    return row
+
+
+def _float_or_none(value) -> float:
+    """Helper function that converts a value to a float, keeping None."""
+    return None if value is None else float(value)
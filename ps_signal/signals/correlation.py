@@ -0,0 +1,304 @@
+"""Module that contains cross-correlation, cross-spectral density and
+coherence between two Signals, e.g. two channels of a capture or a
+reference run and the current run.
+
+Long records are processed in blocks, so memory use depends on the block
+size and the number of lags or frequency bins, not on the record length.
+The blocks are read from the samples of the Signals as they are needed,
+and the means and norms are accumulated block by block, so no full-length
+copy of a record is made.
+
+Many pairs of equally long records can be processed in one batched call,
+where every block of all pairs is transformed with one FFT call.
+"""
+import numpy as np
+from scipy.fft import rfft, irfft, rfftfreq, next_fast_len
+from scipy.signal import get_window
+
+
+__all__ = [
+    "Correlation",
+    "Coherence",
+    "cross_correlate",
+    "cross_correlate_batch",
+    "coherence",
+    "coherence_batch",
+]
+
+
+# Number of samples per block used by the cross-correlation.
+_BLOCK_SIZE = 2 ** 16
+
+
+class Correlation:
+    """Class for the result of a cross-correlation.
+
+    Args:
+        lags_ms (np.ndarray): The lags in ms.
+        values (np.ndarray): The correlation at each lag, normalized to
+            the range -1 to 1.
+    """
+    def __init__(self, lags_ms, values):
+        self._lags_ms = lags_ms
+        self._values = values
+
+    @property
+    def x(self) -> np.ndarray:
+        """X-axis of the correlation. Contains the lags in ms."""
+        return self._lags_ms
+
+    @property
+    def y(self) -> np.ndarray:
+        """Y-axis of the correlation. Contains the normalized correlation."""
+        return self._values
+
+    @property
+    def delay_ms(self) -> float:
+        """The lag with the largest absolute correlation, i.e. the delay of
+        the second signal relative to the first, in ms."""
+        return self._lags_ms[np.argmax(np.abs(self._values))]
+
+    @property
+    def peak(self) -> float:
+        """The correlation at the delay, i.e. the largest absolute
+        correlation with its sign."""
+        return self._values[np.argmax(np.abs(self._values))]
+
+
+class Coherence:
+    """Class for the result of a coherence analysis.
+
+    Args:
+        x (np.ndarray): The frequencies in kHz.
+        coherence (np.ndarray): The magnitude-squared coherence.
+        csd (np.ndarray): The complex cross-spectral density.
+    """
+    def __init__(self, x, coherence, csd):
+        self._x = x
+        self._coherence = coherence
+        self._csd = csd
+
+    @property
+    def x(self) -> np.ndarray:
+        """X-axis of the coherence. Contains the frequencies in kHz."""
+        return self._x
+
+    @property
+    def y(self) -> np.ndarray:
+        """Y-axis of the coherence. Contains the magnitude-squared
+        coherence, between 0 and 1."""
+        return self._coherence
+
+    @property
+    def csd(self) -> np.ndarray:
+        """The complex cross-spectral density of the two signals."""
+        return self._csd
+
+
+def cross_correlate(signal_a, signal_b, max_lag_ms: float = None,
+                    block_size: int = _BLOCK_SIZE) -> Correlation:
+    """Function to cross-correlate two Signals with the same sampling
+    frequency. See :func:`cross_correlate_batch`.
+
+    Args:
+        signal_a (Signal): The first Signal.
+        signal_b (Signal): The second Signal.
+        max_lag_ms (float, optional): The largest lag in ms. Defaults to
+            None, which is 10 % of the shortest signal.
+        block_size (int, optional): Number of samples per block.
+            Defaults to 65536.
+
+    Returns:
+        Correlation: The cross-correlation.
+    """
+    return cross_correlate_batch([(signal_a, signal_b)], max_lag_ms,
+                                 block_size)[0]
+
+
+def cross_correlate_batch(pairs: list, max_lag_ms: float = None,
+                          block_size: int = _BLOCK_SIZE) -> list:
+    """Function to cross-correlate many pairs of Signals in one batched
+    call. The correlation is computed with FFTs by overlap-add: the first
+    signal is split into blocks, and each block is correlated with the part
+    of the second signal that is within the largest lag of it. All pairs are
+    truncated to the shortest signal and must have the same sampling
+    frequency.
+
+    Args:
+        pairs (list): Tuples of two Signals.
+        max_lag_ms (float, optional): The largest lag in ms. Defaults to
+            None, which is 10 % of the shortest signal.
+        block_size (int, optional): Number of samples per block.
+            Defaults to 65536.
+
+    Returns:
+        list: One :class:`Correlation` per pair.
+    """
+    frequency_hz = _common_frequency(pairs)
+    a, b, length = _sources(pairs)
+    if max_lag_ms is None:
+        max_lag = length // 10
+    else:
+        max_lag = min(round(max_lag_ms / 1000 * frequency_hz), length - 1)
+
+    block_size = min(block_size, length)
+    mean_a = _mean(a, length, block_size)
+    mean_b = _mean(b, length, block_size)
+
+    fft_size = next_fast_len(block_size + 2 * max_lag)
+    lags = 2 * max_lag + 1
+    result = np.zeros((len(pairs), lags))
+    energy_a = np.zeros(len(pairs))
+    energy_b = np.zeros(len(pairs))
+
+    for start in range(0, length, block_size):
+        stop = min(start + block_size, length)
+        block_a = _read(a, start, stop) - mean_a
+
+        # The part of b that can be reached from this block of a, which is
+        # zero outside of the signal.
+        low = start - max_lag
+        high = stop + max_lag
+        block_b = np.zeros((len(pairs), high - low))
+        block_b[:, max(-low, 0): high - low - max(high - length, 0)] = \
+            _read(b, max(low, 0), min(high, length)) - mean_b
+
+        energy_a += np.sum(block_a ** 2, axis=1)
+        energy_b += np.sum(block_b[:, max_lag: max_lag + stop - start] ** 2,
+                           axis=1)
+        spectrum = np.conj(rfft(block_a, fft_size, axis=1)) \
+            * rfft(block_b, fft_size, axis=1)
+        result += irfft(spectrum, fft_size, axis=1)[:, :lags]
+
+    norm = np.sqrt(energy_a * energy_b)
+    result /= np.where(norm > 0, norm, 1.0)[:, None]
+
+    lags_ms = np.arange(-max_lag, max_lag + 1) / frequency_hz * 1000
+    return [Correlation(lags_ms, row) for row in result]
+
+
+def coherence(signal_a, signal_b, segment_size: int = 4096,
+              overlap: float = 0.5, window: str = "hann") -> Coherence:
+    """Function to compute the cross-spectral density and the
+    magnitude-squared coherence of two Signals with Welch's method.
+    See :func:`coherence_batch`.
+
+    Args:
+        signal_a (Signal): The first Signal.
+        signal_b (Signal): The second Signal.
+        segment_size (int, optional): Number of samples per segment.
+            Defaults to 4096.
+        overlap (float, optional): Overlap between segments as a fraction
+            of the segment size. Defaults to 0.5.
+        window (str, optional): The window applied to every segment.
+            Defaults to "hann".
+
+    Returns:
+        Coherence: The coherence and cross-spectral density.
+    """
+    return coherence_batch([(signal_a, signal_b)], segment_size, overlap,
+                           window)[0]
+
+
+def coherence_batch(pairs: list, segment_size: int = 4096,
+                    overlap: float = 0.5, window: str = "hann",
+                    segments_per_batch: int = 64) -> list:
+    """Function to compute the cross-spectral density and the
+    magnitude-squared coherence of many pairs of Signals in one batched
+    call, using Welch's method. The auto- and cross-spectra are accumulated
+    over a few segments at a time, so memory use does not depend on the
+    record length. All pairs are truncated to the shortest signal and must
+    have the same sampling frequency.
+
+    Args:
+        pairs (list): Tuples of two Signals.
+        segment_size (int, optional): Number of samples per segment.
+            Defaults to 4096.
+        overlap (float, optional): Overlap between segments as a fraction
+            of the segment size. Defaults to 0.5.
+        window (str, optional): The window applied to every segment.
+            Defaults to "hann".
+        segments_per_batch (int, optional): Number of segments transformed
+            at a time. Defaults to 64.
+
+    Returns:
+        list: One :class:`Coherence` per pair.
+    """
+    frequency_hz = _common_frequency(pairs)
+    a, b, length = _sources(pairs)
+    segment_size = min(segment_size, length)
+    step = max(int(segment_size * (1 - overlap)), 1)
+    taper = get_window(window, segment_size)
+    starts = np.arange(0, length - segment_size + 1, step)
+
+    bins = segment_size // 2 + 1
+    paa = np.zeros((len(pairs), bins))
+    pbb = np.zeros((len(pairs), bins))
+    pab = np.zeros((len(pairs), bins), dtype=np.complex128)
+
+    offsets = np.arange(segment_size)
+    for first in range(0, len(starts), segments_per_batch):
+        batch = starts[first: first + segments_per_batch]
+        index = batch[:, None] - batch[0] + offsets
+        stop = batch[-1] + segment_size
+        segments_a = _read(a, batch[0], stop)[:, index]
+        segments_b = _read(b, batch[0], stop)[:, index]
+        segments_a = segments_a - segments_a.mean(axis=2, keepdims=True)
+        segments_b = segments_b - segments_b.mean(axis=2, keepdims=True)
+
+        spectrum_a = rfft(segments_a * taper, axis=2)
+        spectrum_b = rfft(segments_b * taper, axis=2)
+        paa += np.sum(np.abs(spectrum_a) ** 2, axis=1)
+        pbb += np.sum(np.abs(spectrum_b) ** 2, axis=1)
+        pab += np.sum(np.conj(spectrum_a) * spectrum_b, axis=1)
+
+    # Scaled as a one-sided density, as scipy.signal.csd.
+    scale = 1 / (frequency_hz * np.sum(taper ** 2) * len(starts))
+    pab *= scale
+    pab[:, 1: bins - 1 + segment_size % 2] *= 2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cxy = np.abs(pab) ** 2 / (paa * pbb * scale ** 2)
+        cxy[:, 1: bins - 1 + segment_size % 2] /= 4
+    cxy = np.nan_to_num(cxy)
+
+    x = rfftfreq(segment_size, 1 / frequency_hz) / 1000
+    return [Coherence(x, cxy[i], pab[i]) for i in range(len(pairs))]
+
+
+def _common_frequency(pairs: list) -> float:
+    """Helper function that checks that all Signals in the pairs have the
+    same sampling frequency and returns it."""
+    frequencies = {signal.frequency_hz for pair in pairs for signal in pair}
+    if len(frequencies) != 1:
+        raise ValueError("All signals must have the same sampling "
+                         f"frequency, got {sorted(frequencies)}")
+    return frequencies.pop()
+
+
+def _sources(pairs: list) -> tuple:
+    """Helper function that returns the samples of the first and second
+    Signals of the pairs, without copying them, and the length of the
+    shortest signal, which all pairs are truncated to."""
+    length = min(len(signal.data) for pair in pairs for signal in pair)
+    a = [first.data.acc.to_numpy() for first, _ in pairs]
+    b = [second.data.acc.to_numpy() for _, second in pairs]
+    return a, b, length
+
+
+def _read(sources: list, start: int, stop: int) -> np.ndarray:
+    """Helper function that reads the samples between start and stop of
+    every signal into one array with a row per signal."""
+    return np.stack([np.asarray(values[start: stop], dtype=np.float64)
+                     for values in sources])
+
+
+def _mean(sources: list, length: int, block_size: int) -> np.ndarray:
+    """Helper function that computes the mean of the first length samples
+    of every signal block by block, as a column."""
+    total = np.zeros(len(sources))
+    for start in range(0, length, block_size):
+        total += _read(sources, start, min(start + block_size, length)).sum(
+            axis=1
+        )
+    return (total / length)[:, None]
@@ -1,10 +1,48 @@
 """Module that contains the Data class and methods that is
 used to read data from disk and store them as Pandas.DataFrame.
 """
+import numpy as np
 import pandas as pd
 import sys
 import xlrd
 import copy
+import io
+import os
+import bz2
+import gzip
+import lzma
+import zipfile
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from . import events as ev
+from . import resample
+from . import pyramid as pyr
+from . import quality as qc
+from . import trend as tr
+from . import progress
+
+
+# Size of the read buffer used for both the raw file and the decompressed
+# stream. A large buffer keeps the number of reads low on network storage.
+_READ_BUFFER_SIZE = 4 * 1024 ** 2
+
+_CODEC_EXTENSIONS = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".zip": "zip",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+    ".bz2": "bz2",
+    ".xz": "xz",
+}
+
+_CODEC_MAGIC_NUMBERS = {
+    b"\x1f\x8b": "gzip",
+    b"PK\x03\x04": "zip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+}
 
 
 def picoscope_data_loader(filename: str) -> pd.DataFrame:
@@ -12,6 +50,12 @@ def picoscope_data_loader(filename: str) -> pd.DataFrame:
     loader is made for loading files exported from picoscope as
     a .csv.
 
+    Compressed and archived exports (.gz, .bz2, .xz, .zst and .zip) are
+    decompressed while being parsed, i.e. without writing a temporary file.
+    The codec is chosen from the file extension or, if the extension is
+    unknown, from the magic bytes at the start of the file. Archives with
+    several members are parsed in parallel and concatenated in name order.
+
     Args:
         filename (str): The path to the file that should be imported.
 
@@ -32,28 +76,210 @@ def picoscope_data_loader(filename: str) -> pd.DataFrame:
             -200,00004956;0,52491830
             ...
     """
-    # Formatting of file is separated by ";" and decimals using ","
-    # First two rows are headers.
     try:
-        data = pd.read_csv(filename, sep=";", decimal=",", skiprows=[0, 2])
+        codec = detect_codec(filename)
+        if codec == "zip":
+            data = _read_zip_archive(filename)
+        elif codec:
+            with _open_decompressed(filename, codec) as stream:
+                data = _parse_picoscope_csv(stream)
+        elif progress.active():
+            # Parsing from a stream reports the progress in bytes.
+            with open(filename, "rb", buffering=_READ_BUFFER_SIZE) as raw:
+                data = _parse_picoscope_csv(
+                    progress.reader(raw, os.path.getsize(filename))
+                )
+        else:
+            data = _parse_picoscope_csv(filename)
     except (FileNotFoundError, xlrd.biffh.XLRDError, Exception) as error:
         sys.exit(error)
     else:
-        data.columns = ["time", "acc"]
         return data
 
 
+def detect_codec(filename: str) -> str:
+    """Function that finds out which compression codec, if any, that was
+    used for a file. The file extension is checked first and if it is not
+    known, the first bytes of the file are compared to the magic numbers
+    of the supported codecs.
+
+    Args:
+        filename (str): The path to the file that should be checked.
+
+    Returns:
+        str: The name of the codec, i.e. "gzip", "zip", "zstd", "bz2" or
+        "xz". None if the file is not compressed.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in _CODEC_EXTENSIONS:
+        return _CODEC_EXTENSIONS[extension]
+
+    with open(filename, "rb") as file:
+        header = file.read(8)
+    for magic, codec in _CODEC_MAGIC_NUMBERS.items():
+        if header.startswith(magic):
+            return codec
+    return None
+
+
+def _parse_picoscope_csv(source) -> pd.DataFrame:
+    """Helper function that parses a PicoScope .csv from a path or an
+    already opened binary stream.
+
+    Args:
+        source (str or file-like): The path or stream to parse.
+
+    Returns:
+        pd.DataFrame: A pandas.DataFrame with the columns "time" and "acc".
+    """
+    # Formatting of file is separated by ";" and decimals using ","
+    # First two rows are headers.
+    data = pd.read_csv(source, sep=";", decimal=",", skiprows=[0, 2])
+
+    # The second row holds the units, e.g. "(ms)" and "(mV)".
+    data.attrs["units"] = [str(unit).strip("()") for unit in data.columns]
+    data.columns = ["time", "acc"]
+    return data
+
+
+@contextmanager
+def _open_decompressed(filename: str, codec: str) -> io.BufferedReader:
+    """Context manager that opens a compressed file as a buffered stream
+    of decompressed bytes. Both the underlying file and the decompressed
+    stream use a large read buffer.
+
+    Args:
+        filename (str): The path to the compressed file.
+        codec (str): The codec as returned by :func:`detect_codec`.
+
+    Yields:
+        io.BufferedReader: A binary stream with the decompressed data.
+    """
+    with open(filename, "rb", buffering=_READ_BUFFER_SIZE) as file:
+        # The progress is counted in bytes of the compressed file.
+        raw = progress.reader(file, os.path.getsize(filename))
+        if codec == "gzip":
+            stream = gzip.GzipFile(fileobj=raw)
+        elif codec == "bz2":
+            stream = bz2.BZ2File(raw)
+        elif codec == "xz":
+            stream = lzma.LZMAFile(raw)
+        elif codec == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("Reading .zst files requires the optional "
+                                  "package 'zstandard'.")
+            # The zstandard reader has no readinto, which is needed
+            # by io.BufferedReader.
+            stream = _ZstdRawReader(
+                zstandard.ZstdDecompressor().stream_reader(
+                    raw,
+                    read_size=_READ_BUFFER_SIZE,
+                    closefd=False
+                )
+            )
+        else:
+            raise ValueError(f"Unsupported codec: {codec}")
+
+        with io.BufferedReader(stream, _READ_BUFFER_SIZE) as buffered:
+            yield buffered
+
+
+class _ZstdRawReader(io.RawIOBase):
+    """Adapter that exposes a zstandard stream reader as a raw stream,
+    so that it can be wrapped in an io.BufferedReader.
+
+    Args:
+        stream: A zstandard stream reader.
+    """
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self._stream.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+    def close(self):
+        self._stream.close()
+        super().close()
+
+
+def _read_zip_archive(filename: str) -> pd.DataFrame:
+    """Helper function that parses all members of a zip archive and
+    concatenates them in name order as consecutive parts of one capture,
+    see :func:`_read_zip_members`.
+
+    Args:
+        filename (str): The path to the zip archive.
+
+    Returns:
+        pd.DataFrame: A pandas.DataFrame containing the data of all members.
+    """
+    parts = _read_zip_members(filename)
+    if len(parts) == 1:
+        return parts[0]
+    data = pd.concat(parts, ignore_index=True)
+    data.attrs["units"] = parts[0].attrs["units"]
+    return data
+
+
+def _read_zip_members(filename: str) -> list:
+    """Helper function that parses all members of a zip archive. The members
+    are parsed in parallel, each worker with its own handle to the archive.
+
+    Args:
+        filename (str): The path to the zip archive.
+
+    Returns:
+        list: A pandas.DataFrame per member, in name order.
+    """
+    with zipfile.ZipFile(filename) as archive:
+        members = sorted(
+            info.filename for info in archive.infolist() if not info.is_dir()
+        )
+    if not members:
+        raise ValueError(f"No files found in archive {filename}")
+
+    def parse_member(member):
+        with zipfile.ZipFile(filename) as archive:
+            with archive.open(member) as raw:
+                stream = io.BufferedReader(raw, _READ_BUFFER_SIZE)
+                return _parse_picoscope_csv(stream)
+
+    if len(members) == 1:
+        return [parse_member(members[0])]
+
+    workers = min(len(members), os.cpu_count() or 1)
+    parts = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for part in executor.map(progress.bind(parse_member), members):
+            parts.append(part)
+            progress.update("load", len(parts), len(members), "files")
+    return parts
+
+
 class Data:
     """Class used for storing the data and important parameters.
 
     Args:
         loader (function): A function to use as a file importer.
-            Defaults to picoscope_data_loader.
+            Defaults to picoscope_data_loader. See :mod:`.loaders` for
+            loaders of the binary formats.
     """
     def __init__(self, loader=picoscope_data_loader) -> None:
         self._loader = loader
         self._data = None
         self._trigger_offset = None
+        self._events = None
+        self._pyramid = None
+        self._quality = None
+        self._strategy = "memory"
+        self._capabilities = getattr(loader, "capabilities", frozenset())
 
     def load(self, data_path: str, remove_offset: bool = True) -> None:
         """Method used to load the actual file from disk into memory.
@@ -73,8 +299,23 @@ class Data:
             print(error)
 
         self._size = len(self._data)
-        self._frequency_hz = _calculate_sampling_frequency(self._data)
-        self._period = 1 / self._frequency_hz
+
+        # Loaders that dispatch to other loaders report the capabilities
+        # of the loader that was actually used.
+        self._capabilities = self._data.attrs.get(
+            "capabilities",
+            self._capabilities
+        )
+
+        # Binary loaders know the real sample interval from the metadata
+        # of the file. Otherwise it is estimated from the time stamps.
+        period = self._data.attrs.get("period")
+        if period:
+            self._period = period
+            self._frequency_hz = 1 / period
+        else:
+            self._frequency_hz = _calculate_sampling_frequency(self._data)
+            self._period = 1 / self._frequency_hz
         self._memory_usage = self._data.memory_usage(index=True, deep=True)
 
         # With for example pre-trigger, the data starts from for example
@@ -83,6 +324,175 @@ class Data:
             self._trigger_offset = self._data.time.iloc[0]
             self._data.time -= self._data.time.iloc[0]
 
+    def decimate(self, factor: int = None, target_fs: float = None) -> None:
+        """Method that lowers the sampling frequency of the loaded data using
+        anti-aliased polyphase decimation, see :mod:`.resample`. Sampling
+        frequency, period, size and memory usage are updated, so that all
+        following stages process fewer samples. Any detected events are
+        cleared as their positions no longer apply.
+
+        Args:
+            factor (int, optional): Integer decimation factor.
+                Defaults to None.
+            target_fs (float, optional): The wanted sampling frequency in Hz,
+                used if no factor is given. Defaults to None.
+
+        Raises:
+            ValueError: If the factor is not an integer of at least 1, or if
+                target_fs is not positive or above the sampling frequency.
+        """
+        if factor is not None:
+            if factor < 1 or factor != int(factor):
+                raise ValueError(f"Invalid decimation factor: {factor}, "
+                                 "it must be an integer of at least 1")
+            up, down = 1, int(factor)
+        elif target_fs is not None:
+            if not 0 < target_fs <= self._frequency_hz:
+                raise ValueError(
+                    f"Invalid target sampling frequency: {target_fs} Hz, "
+                    f"it must be above 0 and at most {self._frequency_hz} Hz"
+                )
+            up, down = resample.resampling_ratio(self._frequency_hz, target_fs)
+        else:
+            return
+
+        if up == down:
+            return
+
+        acc = resample.resample_values(self._data.acc.to_numpy(), up, down)
+        self._frequency_hz = self._frequency_hz * up / down
+        self._period = 1 / self._frequency_hz
+
+        # Time is stored in ms.
+        start = self._data.time.iloc[0]
+        time = start + np.arange(len(acc)) * self._period * 1000
+
+        self._data = pd.DataFrame({"time": time, "acc": acc})
+        self._data.attrs["period"] = self._period
+        self._size = len(self._data)
+        self._memory_usage = self._data.memory_usage(index=True, deep=True)
+        self._events = None
+        self._pyramid = None
+        self._quality = None
+
+    def build_pyramid(self, base_block: int = 16,
+                      factor: int = 4) -> pyr.Pyramid:
+        """Method that builds a min/max/mean pyramid of the data in a single
+        pass, see :mod:`.pyramid`. The pyramid can render any interval at a
+        given width without reading the full data.
+
+        Args:
+            base_block (int, optional): Number of samples per block in the
+                finest level. Defaults to 16.
+            factor (int, optional): Number of blocks combined into one on
+                the next level. Defaults to 4.
+
+        Returns:
+            Pyramid: The built pyramid.
+        """
+        self._pyramid = pyr.build_pyramid(
+            self._data.acc.to_numpy(),
+            self._frequency_hz,
+            start_ms=self._data.time.iloc[0],
+            base_block=base_block,
+            factor=factor
+        )
+        return self._pyramid
+
+    @property
+    def pyramid(self) -> pyr.Pyramid:
+        """The pyramid built by :meth:`build_pyramid`."""
+        return self._pyramid
+
+    @pyramid.setter
+    def pyramid(self, pyramid: pyr.Pyramid):
+        self._pyramid = pyramid
+        if pyramid is not None:
+            pyramid.attach(self._data.acc.to_numpy())
+
+    def build_trend(self, window_ms: float,
+                    hop_ms: float = None) -> tr.Trend:
+        """Method that computes the RMS, peak, peak-to-peak, crest factor
+        and kurtosis of sliding windows over the data in a single pass,
+        chunk by chunk, see :mod:`.trend`. Replaces computing the
+        statistics of many slices one at a time.
+
+        Args:
+            window_ms (float): The length of a window in ms.
+            hop_ms (float, optional): The time between the starts of two
+                windows in ms. Defaults to None, i.e. no overlap.
+
+        Returns:
+            Trend: The statistics of the windows.
+        """
+        return tr.build_trend(
+            self._data.acc.to_numpy(),
+            self._frequency_hz,
+            window_ms,
+            hop_ms,
+            start_ms=self._data.time.iloc[0]
+        )
+
+    def detect_events(self, method: str = "threshold",
+                      threshold: float = None, **kwargs) -> ev.EventIndex:
+        """Method that runs event detection once over all of the data and
+        stores the positions of the events found. The events can be
+        analyzed with :func:`slice_events`.
+
+        Args:
+            method (str, optional): "threshold", "sta_lta" or "peaks".
+                Defaults to "threshold".
+            threshold (float, optional): The threshold of the detector.
+                Defaults to None, see :func:`.events.detect_events`.
+            **kwargs: Extra parameters passed on to the detector.
+
+        Returns:
+            EventIndex: The positions of all events.
+        """
+        self._events = ev.detect_events(
+            self._data.acc.to_numpy(),
+            self._frequency_hz,
+            method=method,
+            threshold=threshold,
+            **kwargs
+        )
+        return self._events
+
+    def check_quality(self, **kwargs) -> qc.QualityReport:
+        """Method that scans the data once for clipping, non-finite samples,
+        flat segments and time gaps, chunk by chunk, see
+        :func:`.quality.scan_quality`. The report is stored and can be used
+        with :func:`slice_clean`.
+
+        Args:
+            **kwargs: Thresholds passed on to the scanner.
+
+        Returns:
+            QualityReport: The found problems.
+        """
+        self._quality = qc.scan_quality(
+            self._data.acc.to_numpy(),
+            self._frequency_hz,
+            time=self._data.time.to_numpy(),
+            **kwargs
+        )
+        return self._quality
+
+    @property
+    def quality(self) -> qc.QualityReport:
+        """The report of the last quality scan, None if the data has not
+        been scanned."""
+        return self._quality
+
+    @property
+    def events(self) -> ev.EventIndex:
+        """The index of the events found by :meth:`detect_events`."""
+        return self._events
+
+    @events.setter
+    def events(self, events: ev.EventIndex):
+        self._events = events
+
     @property
     def data(self) -> pd.DataFrame:
         """The imported data stored as a pd.DataFrame."""
@@ -93,6 +503,18 @@ class Data:
         """The row count of the imported data."""
         return self._size
 
+    @property
+    def trigger_offset(self) -> float:
+        """The time of the first sample in ms before the offset was removed,
+        e.g. -200 with a pre-trigger. None if the offset was kept."""
+        return self._trigger_offset
+
+    @property
+    def capabilities(self) -> frozenset:
+        """The capabilities of the loader that imported the data, such as
+        "mmap", "streaming" and "multichannel". See :mod:`.loaders`."""
+        return self._capabilities
+
     @property
     def frequency_hz(self):
         """The calculated sampling frequency."""
@@ -104,6 +526,16 @@ class Data:
         of the sampling frequency."""
         return self._period
 
+    @property
+    def strategy(self) -> str:
+        """How the following stages use memory, "memory", "chunked" or
+        "mmap", see :mod:`.planner`."""
+        return self._strategy
+
+    @strategy.setter
+    def strategy(self, strategy: str) -> None:
+        self._strategy = strategy
+
     @property
     def memory_usage(self) -> pd.Series:
         """The memory used by the imported data.
@@ -139,7 +571,9 @@ def slice_data(data: Data, start_ms: int = None, end_ms: int = None) -> Data:
             Defaults to None.
 
     Returns:
-        Data: Returns a data object that is a subset of the input.
+        Data: Returns a data object that is a subset of the input. For
+        data loaded by a loader with the capability "mmap", the subset is a
+        view of the memory-mapped samples, otherwise a copy.
     """
 
     """
@@ -155,15 +589,91 @@ def slice_data(data: Data, start_ms: int = None, end_ms: int = None) -> Data:
     start_sample_count = round((start_ms / 1000) * data.frequency_hz)
     end_sample_count = round((end_ms / 1000) * data.frequency_hz)
 
-    # Creating a copy to make sure there is two separate data sets,
-    # i.e. not two object with references to the same data.
-    # Using iloc from Pandas DataFrame object to slice the data.
-    new_copy = copy.deepcopy(data)
-    new_copy._data = new_copy.data.iloc[start_sample_count: end_sample_count]
+    # Creating a copy of the slice to make sure there is two separate data
+    # sets, i.e. not two object with references to the same data. Only the
+    # slice is copied, not all of the data. Memory-mapped samples are
+    # read-only, so their slice is a view, which is not read from the file
+    # until it is used.
+    from .loaders import MMAP
+    new_copy = copy.copy(data)
+    new_copy._data = data.data.iloc[start_sample_count: end_sample_count]
+    if MMAP not in data.capabilities:
+        new_copy._data = new_copy._data.copy()
+    new_copy._size = len(new_copy._data)
+    new_copy._events = None
+    new_copy._pyramid = None
+    new_copy._quality = None
 
     return new_copy
 
 
+def slice_events(data: Data, events: ev.EventIndex = None,
+                 before_ms: float = 0, after_ms: float = 0) -> list:
+    """Function that slices a window around every event in an event index.
+    The slices are views of the data, i.e. the data is neither copied nor
+    searched again. The time stamps are kept from the original data.
+
+    Args:
+        data (Data): A Data object to be sliced.
+        events (EventIndex, optional): The events. If None, the events
+            stored in the data by :meth:`Data.detect_events` are used.
+            Defaults to None.
+        before_ms (float, optional): Length of the window before each
+            event, given in ms. Defaults to 0.
+        after_ms (float, optional): Length of the window after each event,
+            given in ms. Defaults to 0.
+
+    Returns:
+        list: A list of Data objects, one per event.
+    """
+    if events is None:
+        events = data.events
+
+    before = round((before_ms / 1000) * data.frequency_hz)
+    after = round((after_ms / 1000) * data.frequency_hz)
+
+    slices = []
+    for position in events.positions:
+        start = max(position - before, 0)
+        end = min(position + after, data.size)
+
+        # A shallow copy shares the parameters, while iloc gives a view
+        # of the DataFrame for the window.
+        new_view = copy.copy(data)
+        new_view._data = data.data.iloc[start: end]
+        new_view._size = end - start
+        new_view._events = None
+        slices.append(new_view)
+    return slices
+
+
+def slice_clean(data: Data, report: qc.QualityReport = None) -> Data:
+    """Function that slices the longest interval without any problems found
+    by a quality scan, see :meth:`Data.check_quality`. The slice is a view
+    of the data, as with :func:`slice_events`.
+
+    Args:
+        data (Data): A Data object to be sliced.
+        report (QualityReport, optional): The quality report. If None, the
+            report stored by :meth:`Data.check_quality` is used.
+            Defaults to None.
+
+    Returns:
+        Data: Returns a data object with the clean interval.
+    """
+    if report is None:
+        report = data.quality
+    start, end = report.clean_interval()
+
+    new_view = copy.copy(data)
+    new_view._data = data.data.iloc[start: end]
+    new_view._size = end - start
+    new_view._events = None
+    new_view._pyramid = None
+    new_view._quality = None
+    return new_view
+
+
 def _calculate_sampling_frequency(data: Data) -> int:
     """Function used to calculate the sampling frequency and making
     sure that the sampling frequency is constant. Without a constant
@@ -179,6 +689,15 @@ def _calculate_sampling_frequency(data: Data) -> int:
     # Calculate a pandas series with the difference between all elements.
     diff = data.time.diff()[1:]
 
+    # Segmented captures restart the time at every segment. The steps
+    # between the segments are left out.
+    restarts = int((diff <= 0).sum())
+    if restarts:
+        print(f"\nThe time restarts {restarts} times, i.e. the data holds "
+              f"{restarts + 1} segments. Load it with "
+              "segments.load_segments to analyze the segments.\n")
+        diff = diff[diff > 0]
+
     # If the standard deviation is "high", the sampling rate is not consistent.
     # Without a consistent sampling frequency, a FFT will not be accurate.
     # Maximum std is for now an arbitrary number i.e. estimated based
@@ -0,0 +1,171 @@
+"""Module that contains envelope analysis, also called demodulation, as
+used for bearing and gear diagnostics. The signal is band-pass filtered
+around a resonance, the envelope is taken as the magnitude of the analytic
+signal, and the spectrum of the envelope shows the repetition frequencies
+of the impacts that excite the resonance.
+
+The signal is processed in overlapping blocks. The band-pass filter and the
+Hilbert transform are applied together as one frequency-domain filter on a
+batch of blocks at a time, the overlap is discarded and the envelope is
+decimated to a rate that fits its bandwidth as the blocks are produced. No
+full-length complex array is ever created, and the full-length envelope is
+only kept at the decimated rate.
+"""
+import numpy as np
+from scipy.fft import fft, ifft, fftfreq, next_fast_len
+from scipy.signal import butter, sosfilt, sosfilt_zi
+from .fft import FFT, get_positive_part_of_fft
+from . import progress
+
+
+__all__ = ["envelope_values", "perform_envelope_on_signal"]
+
+
+# Number of samples per block, including the overlap on both sides.
+_BLOCK_SIZE = 2 ** 15
+
+# Number of blocks transformed in one batched FFT call, at the default
+# block size. Fewer larger blocks are transformed at a time.
+_BLOCKS_PER_BATCH = 16
+
+# The margin on each side of a block, in impulse lengths of the band
+# filter, i.e. the sampling frequency divided by the width of the taper.
+_MARGIN_LENGTHS = 4
+
+# Width of the taper of the band edges, as a share of the band width.
+_TAPER = 0.1
+
+# The decimated envelope is sampled at least this many times the width
+# of the band.
+_OVERSAMPLING = 2.5
+
+
+def envelope_values(values: np.ndarray, frequency_hz: float, f_low: float,
+                    f_high: float, block_size: int = _BLOCK_SIZE) -> tuple:
+    """Function that computes the envelope of the band between f_low and
+    f_high, decimated to a sampling frequency of about 2.5 times the width
+    of the band.
+
+    Args:
+        values (np.ndarray): The samples.
+        frequency_hz (float): The sampling frequency.
+        f_low (float): The lower edge of the band in Hz.
+        f_high (float): The upper edge of the band in Hz.
+        block_size (int, optional): Number of samples per block. It is
+            increased for narrow bands, whose filter rings longer.
+            Defaults to 32768.
+
+    Returns:
+        tuple: The decimated envelope and its sampling frequency.
+    """
+    if not 0 <= f_low < f_high <= frequency_hz / 2:
+        raise ValueError(f"Invalid band {f_low}-{f_high} Hz for the "
+                         f"sampling frequency {frequency_hz} Hz")
+
+    # The samples are read a batch at a time, so they are not copied here.
+    values = np.asarray(values)
+    length = len(values)
+    factor = max(int(frequency_hz / (_OVERSAMPLING * (f_high - f_low))), 1)
+
+    # Blocks overlap by a margin on each side, which is discarded after
+    # filtering. The margin covers the ringing of the band edges, which
+    # lasts a number of impulse lengths of the filter, and at least half
+    # of a block is kept. A signal that fits one block is one block.
+    impulse = frequency_hz / (_TAPER * (f_high - f_low))
+    margin = int(np.ceil(_MARGIN_LENGTHS * impulse))
+    block_size = next_fast_len(min(max(block_size, 4 * margin),
+                                   length + 2 * margin))
+    step = block_size - 2 * margin
+    batch_size = max(_BLOCKS_PER_BATCH * _BLOCK_SIZE // block_size, 1)
+    response = _analytic_band(block_size, frequency_hz, f_low, f_high)
+
+    # Anti-aliasing filter for the decimation, run across blocks.
+    if factor > 1:
+        sos = butter(8, 0.8 / factor, output="sos")
+        state = None
+    decimated = []
+    offsets = np.arange(block_size)
+
+    starts = np.arange(0, length, step)
+    for first in range(0, len(starts), batch_size):
+        batch = starts[first: first + batch_size]
+        span = _read_span(values, batch[0] - margin,
+                          batch[-1] - margin + block_size, margin)
+        blocks = span[(batch - batch[0])[:, None] + offsets]
+        analytic = ifft(fft(blocks, axis=1) * response, axis=1)
+        envelope = np.abs(analytic[:, margin: margin + step]).ravel()
+        envelope = envelope[: max(length - batch[0], 0)]
+
+        if factor > 1:
+            if state is None:
+                state = sosfilt_zi(sos) * envelope[0]
+            envelope, state = sosfilt(sos, envelope, zi=state)
+            # Keep every factor:th sample, counted from the first sample.
+            # The copy lets the full-rate envelope of the batch be freed.
+            envelope = envelope[(-batch[0]) % factor::factor].copy()
+        decimated.append(envelope)
+        progress.update("envelope", min(batch[-1] + step, length), length)
+
+    return np.concatenate(decimated), frequency_hz / factor
+
+
+def perform_envelope_on_signal(signal, f_low: float, f_high: float) -> FFT:
+    """Function to compute the envelope spectrum of a Signal, see
+    :func:`envelope_values`. The mean of the envelope is removed, so the
+    spectrum shows the modulation only.
+
+    The amplitude is scaled as for :func:`.fft.perform_fft_on_signal` of
+    the envelope at the full sampling frequency.
+
+    Args:
+        signal (Signal): The Signal object that should be analyzed.
+        f_low (float): The lower edge of the band in Hz.
+        f_high (float): The upper edge of the band in Hz.
+
+    Returns:
+        FFT: returns an object of class FFT that contain the data from the fft.
+    """
+    envelope, frequency_hz = envelope_values(
+        signal.data['acc'], signal.frequency_hz, f_low, f_high
+    )
+    factor = signal.frequency_hz / frequency_hz
+    envelope = envelope - envelope.mean()
+
+    return get_positive_part_of_fft(
+        fftfreq(len(envelope), 1 / frequency_hz),
+        fft(envelope) * factor
+    )
+
+
+def _read_span(values: np.ndarray, start: int, stop: int,
+               margin: int) -> np.ndarray:
+    """Helper function that reads the samples between two positions as
+    float64. Positions within margin before the first or after the last
+    sample are reflected in the edge samples, as np.pad does with mode
+    "reflect", and later positions are zero. Only the spans of the first
+    and the last block are reflected, the others are read as they are."""
+    length = len(values)
+    if start >= 0 and stop <= length:
+        return np.asarray(values[start: stop], dtype=np.float64)
+
+    span = np.zeros(stop - start)
+    positions = np.arange(start, min(stop, length + margin))
+    period = max(2 * (length - 1), 1)
+    positions %= period
+    positions = np.where(positions < length, positions, period - positions)
+    span[: len(positions)] = values[positions]
+    return span
+
+
+def _analytic_band(size: int, frequency_hz: float, f_low: float,
+                   f_high: float) -> np.ndarray:
+    """Helper function that returns the frequency response that gives the
+    analytic signal of the band, i.e. 2 for positive frequencies inside the
+    band and 0 elsewhere. The edges are tapered with half a cosine over a
+    tenth of the band width, which shortens the ringing of the filter."""
+    frequencies = fftfreq(size, 1 / frequency_hz)
+    taper = max(_TAPER * (f_high - f_low), 2 * frequency_hz / size)
+    distance = np.minimum(frequencies - f_low, f_high - frequencies)
+    response = np.clip(distance / taper + 0.5, 0.0, 1.0)
+    response = 0.5 - 0.5 * np.cos(np.pi * response)
+    return 2.0 * response * (frequencies > 0)
@@ -0,0 +1,326 @@
+"""Module that contains vectorized event detection, used to find the
+interesting parts of a capture, such as impacts, without looking for them
+by eye in a plot of the full time series.
+
+The detectors build an :class:`EventIndex`, a compact array with the sample
+position of each event. The index can be saved next to the capture and be
+used by :func:`.data.slice_events` to analyze a window around every event.
+The saved index holds the size and modification time of the capture, and
+is not loaded once the capture has changed.
+"""
+import json
+import os
+import numpy as np
+from scipy.signal import find_peaks
+
+
+__all__ = [
+    "EventIndex",
+    "detect_events",
+    "threshold_crossings",
+    "sta_lta",
+    "sta_lta_onsets",
+    "peak_positions",
+    "save_events",
+    "load_events",
+    "events_path",
+]
+
+
+_EVENTS_SUFFIX = ".events.npz"
+
+
+class EventIndex:
+    """Class for storing the sample positions of detected events.
+
+    Args:
+        positions (np.ndarray): The sample position of each event.
+        frequency_hz (float): Sampling frequency of the data the events
+            were detected in.
+        method (str): The detection method used.
+        params (dict, optional): The parameters given to the detector.
+            Defaults to None.
+    """
+    def __init__(self, positions, frequency_hz, method, params=None):
+        self._positions = np.asarray(positions, dtype=np.int64)
+        self._frequency_hz = frequency_hz
+        self._method = method
+        self._params = params or {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __repr__(self):
+        """For printing out information about the EventIndex object."""
+        return f"{self._method}_{len(self)}_events"
+
+    @property
+    def positions(self) -> np.ndarray:
+        """The sample position of each event."""
+        return self._positions
+
+    @property
+    def times_ms(self) -> np.ndarray:
+        """The time of each event in ms, counted from the first sample."""
+        return self._positions / self._frequency_hz * 1000
+
+    @property
+    def frequency_hz(self):
+        """Sampling frequency of the data the events were detected in."""
+        return self._frequency_hz
+
+    @property
+    def method(self) -> str:
+        """The detection method used."""
+        return self._method
+
+    @property
+    def params(self) -> dict:
+        """The parameters given to the detector."""
+        return self._params
+
+
+def detect_events(values: np.ndarray, frequency_hz: float,
+                  method: str = "threshold", threshold: float = None,
+                  **kwargs) -> EventIndex:
+    """Function that runs one of the detectors over a full capture and
+    returns an index of the events found.
+
+    * threshold - Where the absolute value rises above the threshold,
+      see :func:`threshold_crossings`.
+    * sta_lta - Where the STA/LTA ratio of the energy rises above the
+      threshold, see :func:`sta_lta_onsets`.
+    * peaks - Peaks of the absolute value higher than the threshold,
+      see :func:`peak_positions`.
+
+    Args:
+        values (np.ndarray): The samples to search.
+        frequency_hz (float): The sampling frequency of the samples.
+        method (str, optional): The detection method. Defaults to
+            "threshold".
+        threshold (float, optional): The threshold of the detector. For
+            "sta_lta" it is the ratio that triggers an event. Defaults to
+            None, which uses 3.0 for "sta_lta" and 5 standard deviations of
+            the values for the other methods.
+        **kwargs: Extra parameters passed on to the detector. Durations,
+            such as "holdoff_ms", are given in ms.
+
+    Returns:
+        EventIndex: The positions of all events.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if threshold is None:
+        threshold = 3.0 if method == "sta_lta" else 5 * np.std(values)
+
+    samples_per_ms = frequency_hz / 1000
+    holdoff = round(kwargs.get("holdoff_ms", 0) * samples_per_ms)
+
+    if method == "threshold":
+        positions = threshold_crossings(
+            np.abs(values),
+            threshold,
+            hysteresis=kwargs.get("hysteresis", 0.0),
+            holdoff=holdoff
+        )
+    elif method == "sta_lta":
+        positions = sta_lta_onsets(
+            values,
+            short_window=round(kwargs.get("short_ms", 1) * samples_per_ms),
+            long_window=round(kwargs.get("long_ms", 50) * samples_per_ms),
+            on=threshold,
+            off=kwargs.get("off", threshold / 2),
+            holdoff=holdoff
+        )
+    elif method == "peaks":
+        positions = peak_positions(values, threshold, distance=holdoff)
+    else:
+        raise ValueError(f"Unknown event detection method: {method}")
+
+    params = dict(kwargs, threshold=float(threshold))
+    return EventIndex(positions, frequency_hz, method, params)
+
+
+def threshold_crossings(values: np.ndarray, on: float, hysteresis: float = 0.,
+                        holdoff: int = 0) -> np.ndarray:
+    """Function that finds where the values rise above a threshold.
+    After a crossing, the values have to fall below on - hysteresis before
+    another crossing is detected. Computed without a loop over the samples.
+
+    Args:
+        values (np.ndarray): The values to search.
+        on (float): The threshold.
+        hysteresis (float, optional): How far below the threshold the values
+            must fall to re-arm the detector. Defaults to 0.
+        holdoff (int, optional): Minimum number of samples between two
+            events. Defaults to 0.
+
+    Returns:
+        np.ndarray: The positions of the crossings.
+    """
+    above = values >= on
+    below = values < on - hysteresis
+
+    # The state is 1 above the threshold, 0 below the re-arm level and
+    # carried forward from the last known state in between.
+    known = above | below
+    last_known = np.where(known, np.arange(len(values)), 0)
+    np.maximum.accumulate(last_known, out=last_known)
+    state = above[last_known] & known[last_known]
+
+    rising = np.flatnonzero(state[1:] & ~state[:-1]) + 1
+    if len(values) and state[0]:
+        rising = np.concatenate(([0], rising))
+    return _apply_holdoff(rising, holdoff)
+
+
+def sta_lta(values: np.ndarray, short_window: int,
+            long_window: int) -> np.ndarray:
+    """Function that calculates the ratio between the short-term and the
+    long-term average of the energy of the values. Using trailing windows
+    computed from one cumulative sum, i.e. in O(N) regardless of the
+    window lengths.
+
+    Args:
+        values (np.ndarray): The values.
+        short_window (int): Length of the short-term window in samples.
+        long_window (int): Length of the long-term window in samples.
+
+    Returns:
+        np.ndarray: The ratio for every sample. Zero for the first
+        long_window samples.
+    """
+    short_window = max(int(short_window), 1)
+    long_window = max(int(long_window), short_window + 1)
+
+    energy = np.concatenate(([0.], np.cumsum(np.square(values))))
+    ratio = np.zeros(len(values))
+    if len(values) < long_window:
+        return ratio
+
+    end = np.arange(long_window, len(values) + 1)
+    sta = (energy[end] - energy[end - short_window]) / short_window
+    lta = (energy[end] - energy[end - long_window]) / long_window
+    np.divide(sta, lta, out=ratio[long_window - 1:], where=lta > 0)
+    return ratio
+
+
+def sta_lta_onsets(values: np.ndarray, short_window: int, long_window: int,
+                   on: float = 3.0, off: float = 1.5,
+                   holdoff: int = 0) -> np.ndarray:
+    """Function that finds the onset of events as the positions where the
+    STA/LTA ratio rises above a trigger level.
+
+    Args:
+        values (np.ndarray): The values to search.
+        short_window (int): Length of the short-term window in samples.
+        long_window (int): Length of the long-term window in samples.
+        on (float, optional): Ratio that triggers an event. Defaults to 3.0.
+        off (float, optional): Ratio the detector must fall below before
+            it is re-armed. Defaults to 1.5.
+        holdoff (int, optional): Minimum number of samples between two
+            events. Defaults to 0.
+
+    Returns:
+        np.ndarray: The positions of the onsets.
+    """
+    ratio = sta_lta(values, short_window, long_window)
+    return threshold_crossings(ratio, on, hysteresis=on - off,
+                               holdoff=holdoff)
+
+
+def peak_positions(values: np.ndarray, height: float,
+                   distance: int = 0) -> np.ndarray:
+    """Function that finds peaks in the absolute value that are higher than
+    a given height. Using scipy.signal.find_peaks.
+
+    Args:
+        values (np.ndarray): The values to search.
+        height (float): The minimum height of a peak.
+        distance (int, optional): Minimum number of samples between two
+            peaks. Defaults to 0.
+
+    Returns:
+        np.ndarray: The positions of the peaks.
+    """
+    peaks, _ = find_peaks(np.abs(values), height=height,
+                          distance=max(int(distance), 1))
+    return peaks
+
+
+def _apply_holdoff(positions: np.ndarray, holdoff: int) -> np.ndarray:
+    """Helper function that removes events closer than holdoff samples to
+    the previous kept event. Loops over the events, not the samples."""
+    if holdoff <= 0 or len(positions) < 2:
+        return positions
+
+    kept = [positions[0]]
+    for position in positions[1:]:
+        if position - kept[-1] >= holdoff:
+            kept.append(position)
+    return np.asarray(kept, dtype=np.int64)
+
+
+def events_path(filename: str) -> str:
+    """Function that returns the path of the event index that belongs
+    to a capture.
+
+    Args:
+        filename (str): The path to the capture.
+
+    Returns:
+        str: The path to the event index.
+    """
+    return filename + _EVENTS_SUFFIX
+
+
+def save_events(events: EventIndex, filename: str) -> None:
+    """Function that saves an event index next to a capture.
+
+    Args:
+        events (EventIndex): The index to save.
+        filename (str): The path to the capture.
+    """
+    status = os.stat(filename)
+    np.savez(
+        events_path(filename),
+        positions=events.positions,
+        frequency_hz=events.frequency_hz,
+        method=events.method,
+        params=json.dumps(events.params),
+        file_size=status.st_size,
+        mtime_ns=status.st_mtime_ns
+    )
+
+
+def load_events(filename: str) -> EventIndex:
+    """Function that loads the event index saved next to a capture.
+
+    Args:
+        filename (str): The path to the capture.
+
+    Returns:
+        EventIndex: The saved index, None if there is no saved index or if
+        the capture has changed since the index was saved.
+    """
+    try:
+        with np.load(events_path(filename)) as content:
+            if not _is_current(content, filename):
+                return None
+            return EventIndex(
+                content["positions"],
+                float(content["frequency_hz"]),
+                str(content["method"]),
+                json.loads(str(content["params"]))
+            )
+    except FileNotFoundError:
+        return None
+
+
+def _is_current(content, filename: str) -> bool:
+    """Helper function that checks that a saved file was made from the
+    capture as it is now, by its size and modification time."""
+    if "mtime_ns" not in content:
+        return False
+    status = os.stat(filename)
+    return (int(content["file_size"]) == status.st_size
+            and int(content["mtime_ns"]) == status.st_mtime_ns)
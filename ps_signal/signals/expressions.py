@@ -0,0 +1,368 @@
+"""Module that contains lazy expressions of signals. An expression is built
+with arithmetic on signals and constants and with the methods of
+:class:`Expression`, for example velocity relative to a reference run:
+
+.. code-block:: python
+
+    velocity = (lazy(signal) - lazy(reference)).integrate() * 1000
+
+Nothing is computed while the expression is built. :meth:`Expression.evaluate`
+runs the whole expression chunk by chunk in one pass over the samples, so
+the result is the only array of the full length. Integration and
+differentiation keep their state from one chunk to the next.
+
+Integration in the frequency domain, see
+:func:`.fft.integrate_in_frequency_domain`, needs all samples of its operand
+at once. The operand is then evaluated into one array first, and the rest
+of the expression is evaluated in one pass as above.
+"""
+import numpy as np
+import pandas as pd
+from . import filters
+from . import progress
+from .data import Data
+from .fft import integrate_in_frequency_domain
+from .signal import Signal
+
+
+__all__ = ["Expression", "lazy"]
+
+
+# Number of samples evaluated at a time.
+_CHUNK_SIZE = 2 ** 18
+
+_INTEGRATION_METHODS = ("time", "frequency")
+
+_BINARY_OPERATIONS = {
+    "add": np.add,
+    "sub": np.subtract,
+    "mul": np.multiply,
+}
+
+
+class Expression:
+    """Class for a node of a lazy expression, see the module description.
+    Expressions are made with :func:`lazy` and combined with +, -, *, / by
+    a number, unary - and abs().
+
+    Args:
+        operation (str): The operation of the node, e.g. "add".
+        operands (tuple, optional): The operands of the operation, i.e.
+            other expressions. Defaults to ().
+        **settings: The settings of the operation.
+    """
+    def __init__(self, operation: str, operands: tuple = (),
+                 **settings) -> None:
+        self._operation = operation
+        self._operands = tuple(operands)
+        self._settings = settings
+
+        sources = self._sources()
+        if sources:
+            first = sources[0]
+            for signal in sources[1:]:
+                if signal.size != first.size:
+                    raise ValueError(
+                        f"The signals {first.id} and {signal.id} have "
+                        f"different lengths, {first.size} and "
+                        f"{signal.size} samples"
+                    )
+                if not np.isclose(signal.frequency_hz, first.frequency_hz):
+                    raise ValueError(
+                        f"The signals {first.id} and {signal.id} have "
+                        "different sampling frequencies"
+                    )
+
+    def __repr__(self):
+        """For printing out the expression."""
+        if self._operation == "signal":
+            return str(self._settings["signal"].id)
+        if self._operation == "constant":
+            return f"{self._settings['value']:g}"
+        arguments = [repr(operand) for operand in self._operands]
+        arguments += [f"{name}={value:g}"
+                      for name, value in sorted(self._settings.items())
+                      if value is not None]
+        return f"{self._operation}({','.join(arguments)})"
+
+    def __add__(self, other):
+        return Expression("add", (self, _as_expression(other)))
+
+    def __radd__(self, other):
+        return Expression("add", (_as_expression(other), self))
+
+    def __sub__(self, other):
+        return Expression("sub", (self, _as_expression(other)))
+
+    def __rsub__(self, other):
+        return Expression("sub", (_as_expression(other), self))
+
+    def __mul__(self, other):
+        return Expression("mul", (self, _as_expression(other)))
+
+    def __rmul__(self, other):
+        return Expression("mul", (_as_expression(other), self))
+
+    def __truediv__(self, other):
+        if isinstance(other, Expression):
+            return NotImplemented
+        return self.scale(1 / other)
+
+    def __neg__(self):
+        return self.scale(-1)
+
+    def __abs__(self):
+        return self.abs()
+
+    @property
+    def frequency_hz(self) -> float:
+        """The sampling frequency of the signals of the expression."""
+        return self._sources()[0].frequency_hz
+
+    @property
+    def size(self) -> int:
+        """The number of samples of the signals of the expression."""
+        return self._sources()[0].size
+
+    def scale(self, factor: float) -> "Expression":
+        """Method that multiplies the expression by a number, e.g. to
+        change the unit.
+
+        Args:
+            factor (float): The factor.
+
+        Returns:
+            Expression: The scaled expression.
+        """
+        return Expression("mul", (self, _as_expression(factor)))
+
+    def abs(self) -> "Expression":
+        """Method that takes the absolute value of the expression.
+
+        Returns:
+            Expression: The absolute value.
+        """
+        return Expression("abs", (self,))
+
+    def differentiate(self) -> "Expression":
+        """Method that differentiates the expression with respect to time
+        in seconds, with backward differences. The first sample gets the
+        forward difference.
+
+        Returns:
+            Expression: The derivative.
+        """
+        return Expression("differentiate", (self,))
+
+    def integrate(self, method: str = "time",
+                  f_min: float = None) -> "Expression":
+        """Method that integrates the expression with respect to time in
+        seconds, e.g. velocity from acceleration.
+
+        * time - Cumulative trapezoidal integration from 0 at the first
+          sample. An offset or noise at low frequencies in the operand
+          makes the result drift, so a highpass filter is usually applied
+          to the signals first.
+        * frequency - Integration in the frequency domain, see
+          :func:`.fft.integrate_in_frequency_domain`. Frequencies below
+          f_min are removed. Integrating twice in a row in the frequency
+          domain, e.g. displacement from acceleration, is made as one
+          integration of the second order.
+
+        Args:
+            method (str, optional): "time" or "frequency".
+                Defaults to "time".
+            f_min (float, optional): Lowest frequency kept by the frequency
+                method, given in Hz. Defaults to None.
+
+        Returns:
+            Expression: The integral.
+        """
+        if method not in _INTEGRATION_METHODS:
+            raise ValueError(f"Unknown integration method: {method}")
+        if method == "time":
+            return Expression("integrate", (self,))
+
+        if (self._operation == "integrate_frequency"
+                and self._settings["f_min"] == f_min):
+            return Expression("integrate_frequency", self._operands,
+                              order=self._settings["order"] + 1,
+                              f_min=f_min)
+        return Expression("integrate_frequency", (self,), order=1,
+                          f_min=f_min)
+
+    def evaluate(self, id: str = None, chunk_size: int = _CHUNK_SIZE,
+                 strategy: str = None) -> Signal:
+        """Method that evaluates the expression in one pass over the
+        samples, chunk by chunk, see the module description.
+
+        Args:
+            id (str, optional): The id of the resulting Signal. Defaults to
+                None, i.e. the expression as text.
+            chunk_size (int, optional): Number of samples evaluated at a
+                time. Defaults to 262144.
+            strategy (str, optional): "memory", "chunked" or "mmap", see
+                :mod:`.planner`. With "mmap" the result is written to a
+                memory-mapped temporary file. Defaults to None, i.e. the
+                strategy of the first signal.
+
+        Returns:
+            Signal: The result, with the time stamps of the first signal.
+        """
+        source = self._sources()[0]
+        strategy = strategy or source.strategy
+        size = self.size
+        output = filters._output_array(size, strategy)
+        kernel = self._compile(chunk_size)
+        for start in range(0, size, chunk_size):
+            end = min(start + chunk_size, size)
+            output[start: end] = kernel(start, end)
+            progress.update("evaluate", end, size)
+
+        # The result is used as is, as assign would copy it into memory.
+        frame = pd.DataFrame({"time": source.data.time.to_numpy(),
+                              "acc": output}, copy=False)
+        frame.attrs = dict(source.data.attrs)
+        frame.attrs["period"] = source.period
+        if "units" in frame.attrs:
+            frame.attrs["units"] = [frame.attrs["units"][0],
+                                    self._unit(frame.attrs["units"][1])]
+
+        data = Data(loader=lambda _: frame)
+        data.load("", remove_offset=False)
+        data.strategy = strategy
+        return Signal(repr(self) if id is None else id, data)
+
+    def _sources(self) -> list:
+        """Helper method that returns the signals of the expression, in
+        order of appearance."""
+        if self._operation == "signal":
+            return [self._settings["signal"]]
+        return [signal for operand in self._operands
+                for signal in operand._sources()]
+
+    def _unit(self, unit: str) -> str:
+        """Helper method that returns the unit of the expression, given the
+        unit of the signals."""
+        if self._operation == "integrate":
+            return f"{self._operands[0]._unit(unit)}*s"
+        if self._operation == "integrate_frequency":
+            power = self._settings["order"]
+            suffix = "*s" if power == 1 else f"*s^{power}"
+            return f"{self._operands[0]._unit(unit)}{suffix}"
+        if self._operation == "differentiate":
+            return f"{self._operands[0]._unit(unit)}/s"
+        if self._operands and self._operation != "constant":
+            return self._operands[0]._unit(unit)
+        return unit
+
+    def _compile(self, chunk_size: int):
+        """Helper method that makes a function of the expression, which
+        returns the samples between two positions. The function is called
+        for consecutive chunks in order, as integration and differentiation
+        keep their state between the chunks."""
+        operation = self._operation
+        settings = self._settings
+        period = 1 / self.frequency_hz if self._sources() else None
+
+        if operation == "signal":
+            values = settings["signal"].data.acc.to_numpy()
+            return lambda start, end: np.asarray(values[start: end],
+                                                 dtype=np.float64)
+
+        if operation == "constant":
+            value = settings["value"]
+            return lambda start, end: np.full(end - start, value)
+
+        kernels = [operand._compile(chunk_size)
+                   for operand in self._operands]
+
+        if operation in _BINARY_OPERATIONS:
+            function = _BINARY_OPERATIONS[operation]
+            first, second = kernels
+            return lambda start, end: function(first(start, end),
+                                               second(start, end))
+
+        (operand,) = kernels
+        if operation == "abs":
+            return lambda start, end: np.abs(operand(start, end))
+
+        if operation == "integrate":
+            state = {"sample": None, "integral": 0.0}
+
+            def integrate(start, end):
+                values = operand(start, end)
+                previous = state["sample"]
+                if previous is None:
+                    previous = values[0]
+                steps = np.empty_like(values)
+                steps[0] = previous + values[0]
+                steps[1:] = values[:-1] + values[1:]
+                steps *= period / 2
+                if state["sample"] is None:
+                    steps[0] = 0.0
+                integral = np.cumsum(steps, out=steps)
+                integral += state["integral"]
+                state["sample"] = values[-1]
+                state["integral"] = integral[-1]
+                return integral
+            return integrate
+
+        if operation == "differentiate":
+            state = {"sample": None}
+
+            def differentiate(start, end):
+                values = operand(start, end)
+                if state["sample"] is None:
+                    derivative = np.diff(values, prepend=values[0])
+                    if len(values) > 1:
+                        derivative[0] = derivative[1]
+                else:
+                    derivative = np.diff(values, prepend=state["sample"])
+                state["sample"] = values[-1]
+                return derivative / period
+            return differentiate
+
+        if operation == "integrate_frequency":
+            # The operand is evaluated into one array on the first call.
+            size = self.size
+            cache = {}
+
+            def integrate_frequency(start, end):
+                if "integral" not in cache:
+                    values = np.empty(size)
+                    for chunk_start in range(0, size, chunk_size):
+                        chunk_end = min(chunk_start + chunk_size, size)
+                        values[chunk_start: chunk_end] = operand(chunk_start,
+                                                                 chunk_end)
+                    cache["integral"] = integrate_in_frequency_domain(
+                        values, 1 / period, settings["order"],
+                        settings["f_min"]
+                    )
+                return cache["integral"][start: end]
+            return integrate_frequency
+
+        raise ValueError(f"Unknown operation: {operation}")
+
+
+def lazy(signal: Signal) -> Expression:
+    """Function that starts a lazy expression from a signal, see the
+    module description.
+
+    Args:
+        signal (Signal): The signal.
+
+    Returns:
+        Expression: The expression of the signal.
+    """
+    return Expression("signal", signal=signal)
+
+
+def _as_expression(value) -> Expression:
+    """Helper function that makes a number or a Signal into an
+    expression."""
+    if isinstance(value, Expression):
+        return value
+    if isinstance(value, Signal):
+        return lazy(value)
+    return Expression("constant", value=float(value))
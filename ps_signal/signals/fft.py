@@ -1,8 +1,26 @@
 """Module that contains various functions to perform an FFT
 on a Signal.
+
+Besides the full FFT, there are two band-limited modes that only compute
+the frequencies of interest:
+
+* Zoom FFT - A chirp-z transform over a frequency band with a chosen number
+  of bins, see :func:`perform_zoom_fft_on_signal`.
+* Goertzel - The amplitude at a handful of target frequencies, see
+  :func:`perform_goertzel_on_signal`.
+
+The spectrum is also used to integrate samples in the frequency domain,
+see :func:`integrate_in_frequency_domain`.
 """
-from scipy.fft import fft, fftfreq
+from scipy.fft import fft, ifft, irfft, next_fast_len, rfft, rfftfreq
+from scipy.signal import lfilter
 import numpy as np
+from . import progress
+
+
+# Number of samples processed at a time by the band-limited modes. Memory
+# use depends on this and on the number of bins, not on the signal length.
+_BLOCK_SIZE = 2 ** 16
 
 
 class FFT:
@@ -24,7 +42,8 @@ class FFT:
 
 
 def perform_fft_on_signal(signal):
-    """Function to perform a FFT on a Signal. Using scipy.fft and scipy.fftfreq.
+    """Function to perform a FFT on a Signal. Using scipy.fft.rfft and
+    scipy.fft.rfftfreq.
 
     Args:
         signal (Signal): The Signal object that should be analyzed.
@@ -32,10 +51,16 @@ def perform_fft_on_signal(signal):
     Returns:
         FFT: returns an object of class FFT that contain the data from the fft.
     """
-    fft_y = fft(np.array(signal.data['acc']))
-    fft_x = fftfreq(len(fft_y), signal.period)
+    # The input is real, so only the positive half of the spectrum is
+    # computed. It is the same as the positive part of the full FFT.
+    # The transform is made in one call, so only its end is reported.
+    values = signal.data['acc'].to_numpy()
+    progress.update("fft", 0, len(values))
+    fft_y = rfft(values)[: len(values) // 2]
+    fft_x = rfftfreq(len(values), signal.period)[: len(values) // 2]
+    progress.update("fft", len(values), len(values))
 
-    return get_positive_part_of_fft(fft_x, fft_y)
+    return FFT(fft_x / 1000, np.abs(fft_y))
 
 
 def get_positive_part_of_fft(x: np.ndarray, y: np.ndarray) -> FFT:
@@ -55,3 +80,121 @@ def get_positive_part_of_fft(x: np.ndarray, y: np.ndarray) -> FFT:
         FFT: returns an object of class FFT that contain the data from the fft.
     """
     return FFT(x[: len(x) // 2] / 1000, abs(y[: len(y) // 2]))
+
+
+def perform_zoom_fft_on_signal(signal, f_start: float, f_stop: float,
+                               bins: int = 1024) -> FFT:
+    """Function to perform a zoom FFT on a Signal, i.e. compute the spectrum
+    only between f_start and f_stop with the given number of bins. Using
+    the chirp-z transform, computed with Bluestein's algorithm on blocks of
+    the signal that are combined with a phase shift. Memory use thus scales
+    with the number of bins rather than with the length of the signal.
+
+    The amplitude is scaled as for :func:`perform_fft_on_signal`.
+
+    Args:
+        signal (Signal): The Signal object that should be analyzed.
+        f_start (float): The lowest frequency of the band, given in Hz.
+        f_stop (float): The highest frequency of the band, given in Hz.
+        bins (int, optional): The number of frequencies to compute.
+            Defaults to 1024.
+
+    Returns:
+        FFT: returns an object of class FFT that contain the data from the fft.
+    """
+    values = np.asarray(signal.data['acc'], dtype=np.float64)
+    frequency_hz = signal.frequency_hz
+    freqs = np.linspace(f_start, f_stop, bins)
+    step = (f_stop - f_start) / (bins - 1) if bins > 1 else 0.0
+
+    block = min(_BLOCK_SIZE, len(values))
+    n = np.arange(block)
+    k = np.arange(bins)
+    length = next_fast_len(block + bins - 1)
+
+    # Chirps of Bluestein's algorithm. The chirp-z transform is written
+    # as a convolution, which is made with FFTs of the padded length.
+    pre_chirp = np.exp(-2j * np.pi * (f_start * n + 0.5 * step * n ** 2)
+                       / frequency_hz)
+    m = np.arange(-(block - 1), bins)
+    kernel = fft(np.exp(1j * np.pi * step * m ** 2 / frequency_hz), length)
+    post_chirp = np.exp(-1j * np.pi * step * k ** 2 / frequency_hz)
+
+    spectrum = np.zeros(bins, dtype=np.complex128)
+    for start in range(0, len(values), block):
+        chunk = values[start: start + block]
+        convolved = ifft(fft(chunk * pre_chirp[: len(chunk)], length)
+                         * kernel)
+        # Shift the phase of the block by its position in the signal.
+        shift = np.exp(-2j * np.pi * freqs * start / frequency_hz)
+        spectrum += shift * post_chirp * convolved[block - 1: block - 1 + bins]
+        progress.update("fft", start + len(chunk), len(values))
+
+    return FFT(freqs / 1000, np.abs(spectrum))
+
+
+def perform_goertzel_on_signal(signal, frequencies) -> FFT:
+    """Function to compute the amplitude of a Signal at a few target
+    frequencies using the Goertzel algorithm. The recursion of the
+    algorithm is run as an IIR filter with scipy.signal.lfilter, block by
+    block, keeping only the filter state between the blocks.
+
+    The amplitude is scaled as for :func:`perform_fft_on_signal`.
+
+    Args:
+        signal (Signal): The Signal object that should be analyzed.
+        frequencies (list): The target frequencies, given in Hz.
+
+    Returns:
+        FFT: returns an object of class FFT that contain the data from the fft.
+    """
+    values = np.asarray(signal.data['acc'], dtype=np.float64)
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    amplitudes = np.zeros(len(frequencies))
+
+    for index, frequency in enumerate(frequencies):
+        omega = 2 * np.pi * frequency / signal.frequency_hz
+        a = [1.0, -2.0 * np.cos(omega), 1.0]
+        state = np.zeros(2)
+        last = np.zeros(2)
+        for start in range(0, len(values), _BLOCK_SIZE):
+            chunk = values[start: start + _BLOCK_SIZE]
+            output, state = lfilter([1.0], a, chunk, zi=state)
+            last = np.concatenate((last, output))[-2:]
+            progress.update("fft", index * len(values) + start + len(chunk),
+                            len(frequencies) * len(values))
+        amplitudes[index] = abs(last[1] - np.exp(-1j * omega) * last[0])
+
+    return FFT(frequencies / 1000, amplitudes)
+
+
+def integrate_in_frequency_domain(values: np.ndarray, frequency_hz: float,
+                                  order: int = 1,
+                                  f_min: float = None) -> np.ndarray:
+    """Function that integrates samples once or several times in the
+    frequency domain, i.e. divides the spectrum by (j * 2 * pi * f) to the
+    power of order. The DC component, and all frequencies below f_min, are
+    removed, so the result has no drift from an offset or from noise at low
+    frequencies, as integration in the time domain has. The samples are
+    treated as one period of a periodic signal.
+
+    Args:
+        values (np.ndarray): The samples.
+        frequency_hz (float): The sampling frequency.
+        order (int, optional): The number of integrations, e.g. 2 for
+            displacement from acceleration. Defaults to 1.
+        f_min (float, optional): Frequencies below this, given in Hz, are
+            removed. Defaults to None, i.e. only the DC component.
+
+    Returns:
+        np.ndarray: The integrated samples, with the unit of the samples
+        times seconds to the power of order.
+    """
+    size = len(values)
+    spectrum = rfft(values)
+    omega = 2 * np.pi * rfftfreq(size, 1 / frequency_hz)
+    keep = omega > 2 * np.pi * (f_min or 0.0)
+    keep[0] = False
+    spectrum[~keep] = 0
+    spectrum[keep] /= (1j * omega[keep]) ** order
+    return irfft(spectrum, size)
@@ -5,15 +5,97 @@ Filter objects for the following filter types:
 * Highpass - highpass_filter
 * Bandstop - bandstop_filter
 * Bandpass - bandpass_filter
+
+These are 5th order Butterworth filters applied forwards and backwards.
+The same four types are also available as linear-phase FIR filters, see
+:func:`fir_lowpass`. An FIR filter can have a much steeper transition band,
+at the cost of hundreds or thousands of taps. It is applied once, with FFT
+overlap-save convolution, and is compensated for its delay, so it has zero
+phase like the Butterworth filters. The cost per sample grows with the
+logarithm of the number of taps instead of with the number of taps.
+
+The comb filter, see :func:`comb`, removes a fundamental frequency and its
+harmonics, e.g. from mains or a rotating shaft. All notches are combined
+into one cascade of second-order sections that is applied in one go, and
+the fundamental can be tracked from the spectrum of the signal first.
+
+The Filter objects are stateless. The parameters of every application of
+a filter are recorded as a :class:`FilterSpec` in the filtered Signal, so
+the same objects can be used to filter different signals concurrently.
+
+With the "chunked" and "mmap" strategies of a Signal, see :mod:`.planner`,
+the filters run chunk by chunk into a single output array, which for "mmap"
+is a memory-mapped temporary file. The result is the same as with the
+default "memory" strategy.
 """
 from .signal import Signal
-from scipy.signal import filtfilt, butter
+from .fft import perform_zoom_fft_on_signal
+from . import progress
+from scipy.signal import (sosfilt, sosfilt_zi, sosfiltfilt, butter,
+                          firwin, kaiserord, kaiser_beta, remez, iirnotch)
+from scipy.fft import rfft, irfft, next_fast_len
 from copy import deepcopy
+import tempfile
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from functools import lru_cache
+
+
+# Number of samples filtered at a time by the chunked strategies.
+_CHUNK_SIZE = 2 ** 18
+
+# The FIR filter designs. The transition band is given as a fraction of
+# the lowest cutoff frequency if neither the number of taps nor the width
+# of the band is given.
+_FIR_METHODS = ("window", "remez")
+_FIR_TRANSITION = 0.1
+_FIR_ATTENUATION_DB = 80.0
+
+# The comb filter. The quality factor is the frequency of a notch divided
+# by its -3 dB bandwidth. The fundamental is tracked within a tolerance,
+# given as a fraction of the fundamental, on a grid of candidates.
+_COMB_HARMONICS = 10
+_COMB_Q = 30.0
+_TRACK_TOLERANCE = 0.02
+_TRACK_BINS = 256
+
+
+class FilterSpec(namedtuple("FilterSpec",
+                            ["filter_type", "cutoff", "cutoff_upper"])):
+    """Immutable record of one application of a filter. A new FilterSpec is
+    created every time a filter is applied and stored in the filtered
+    Signal, so the filter objects themselves hold no state.
+
+    Args:
+        filter_type (str): The type of the filter, e.g. "lowpass".
+        cutoff (float): The cutoff frequency of the filter.
+        cutoff_upper (float): The upper cutoff frequency, None for
+            lowpass and highpass filters.
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        """For printing out information about the applied filter."""
+        if not self.cutoff_upper:
+            return f"{self.filter_type}_{self.cutoff:.3g}"
+        else:
+
+            return (f"{self.filter_type}"
+                    "_("
+                    f"{self.cutoff:.3g}"
+                    "-"
+                    f"{self.cutoff_upper:.3g}"
+                    ")")
 
 
 class _Filter:
     """A callable class that applies filtering to a Signal.
 
+    The object is stateless, i.e. the parameters of each call are stored
+    in a :class:`FilterSpec` in the filtered Signal. One and the same
+    object can thus be used from several threads at the same time.
+
     Args:
         filter_fn (function): A function to use when applying the filter.
         filter_type (str): A string used to identify the filter type
@@ -22,11 +104,10 @@ class _Filter:
     def __init__(self, filter_fn, filter_type):
         self._filter_fn = filter_fn
         self._filter_type = filter_type
-        self._cutoff = None
-        self._cutoff_upper = None
 
     def __call__(self, signal: Signal, cutoff: float,
-                 cutoff_upper: float = None, inplace=False) -> Signal:
+                 cutoff_upper: float = None, inplace=False,
+                 **options) -> Signal:
         """Making a filter object callable. This method applies a filter.
 
         Args:
@@ -39,38 +120,501 @@ class _Filter:
             inplace (bool, optional): If the signal filtering should be made
                 inplace, i.e. replacing the Signal object or creating a new
                 Signal object. Defaults to False.
+            **options: Settings of the filter design, only used by the
+                FIR filters, see :func:`_design_fir`.
 
         Returns:
             Signal: Returns a filtered Signal.
         """
         if isinstance(signal, Signal):
-            self._cutoff = cutoff
-            self._cutoff_upper = cutoff_upper
+            spec = FilterSpec(self._filter_type, cutoff, cutoff_upper)
 
             if inplace:
-                self._filter_fn(signal, cutoff, cutoff_upper)
-                signal._add_filter(self)
+                self._filter_fn(signal, cutoff, cutoff_upper, **options)
+                signal._add_filter(spec)
                 return None
             else:
                 new_signal = deepcopy(signal)
-                signal._add_filter(self)
-                return self._filter_fn(new_signal, cutoff, cutoff_upper)
+                new_signal._add_filter(spec)
+                return self._filter_fn(new_signal, cutoff, cutoff_upper,
+                                       **options)
         else:
             print("Can't apply filter to object"
                   "that is not instances of Signal()")
 
     def __repr__(self):
         """For printing out information about the Filter object."""
-        if not self._cutoff_upper:
-            return f"{self._filter_type}_{self._cutoff:.3g}"
-        else:
+        return self._filter_type
 
-            return (f"{self._filter_type}"
-                    "_("
-                    f"{self._cutoff:.3g}"
-                    "-"
-                    f"{self._cutoff_upper:.3g}"
-                    ")")
+
+class _CombFilter(_Filter):
+    """A :class:`_Filter` for the comb filter. With track set, the actual
+    fundamental is found first, see :func:`track_fundamental`, and it is
+    both removed and recorded in the :class:`FilterSpec` instead of the
+    nominal one.
+    """
+    def __call__(self, signal: Signal, cutoff: float,
+                 cutoff_upper: float = None, inplace=False,
+                 track: bool = False,
+                 tolerance: float = _TRACK_TOLERANCE,
+                 **options) -> Signal:
+        """Applies the comb filter, see :meth:`_Filter.__call__` and
+        :func:`_apply_comb_filter`.
+
+        Args:
+            track (bool, optional): Set this to find the actual fundamental
+                near cutoff first. Defaults to False.
+            tolerance (float, optional): The tolerance of the tracking, as a
+                fraction of cutoff. Defaults to 0.02.
+        """
+        if track and isinstance(signal, Signal):
+            cutoff = track_fundamental(
+                signal, cutoff,
+                options.get("harmonics", _COMB_HARMONICS), tolerance
+            )
+        return super().__call__(signal, cutoff, cutoff_upper, inplace,
+                                **options)
+
+
+@lru_cache(maxsize=128)
+def _design_butter(btype: str, cutoffs: tuple, frequency_hz: float):
+    """Function that designs a 5th order Butterworth filter as second-order
+    sections. The designs are cached, as they only depend on the arguments.
+    The returned array is shared between callers and must not be modified.
+
+    Args:
+        btype (str): The type of the filter as given to scipy.signal.butter.
+        cutoffs (tuple): The cutoff frequencies in Hz.
+        frequency_hz (float): The sampling frequency.
+
+    Returns:
+        np.ndarray: The second-order sections of the filter.
+    """
+    nyq = 0.5 * frequency_hz
+    normalized_cutoff = [cutoff / nyq for cutoff in cutoffs]
+    if len(normalized_cutoff) == 1:
+        normalized_cutoff = normalized_cutoff[0]
+    sos = butter(
+        5,
+        normalized_cutoff,
+        btype=btype,
+        analog=False,
+        output="sos"
+    )
+    return sos
+
+
+def _apply_butter(signal: Signal, btype: str, cutoffs: tuple) -> Signal:
+    """Function that filters a signal forwards and backwards with a
+    Butterworth filter, see :func:`_apply_sos`.
+
+    Args:
+        signal (Signal): A Signal object to which a filter will be applied.
+        btype (str): The type of the filter as given to scipy.signal.butter.
+        cutoffs (tuple): The cutoff frequencies in Hz.
+
+    Returns:
+        Signal: A Signal object with an applied filter.
+    """
+    sos = _design_butter(btype, tuple(cutoffs), signal.frequency_hz)
+    return _apply_sos(signal, sos)
+
+
+def _apply_sos(signal: Signal, sos: np.ndarray) -> Signal:
+    """Function that filters a signal forwards and backwards with a filter
+    of second-order sections. The filtering is made with
+    scipy.signal.sosfiltfilt, whose inner loop runs without holding the GIL,
+    so several signals can be filtered in parallel from a thread pool.
+
+    The filtered values are stored in a new DataFrame, i.e. a DataFrame that
+    is shared with other signals or with the Data object is not modified.
+    When progress is tracked, see :mod:`.progress`, the signal is filtered
+    chunk by chunk as with the "chunked" strategy.
+
+    Args:
+        signal (Signal): A Signal object to which a filter will be applied.
+        sos (np.ndarray): The second-order sections of the filter.
+
+    Returns:
+        Signal: A Signal object with an applied filter.
+    """
+    values = signal.data.acc.to_numpy()
+    strategy = getattr(signal, "strategy", "memory")
+    if strategy == "memory" and not progress.active():
+        filtered = sosfiltfilt(sos, values)
+        signal._data = signal.data.assign(acc=filtered)
+        return signal
+
+    # The chunked filter gives the same result and reports its progress.
+    # The filtered array is used as is, as assign would copy it into memory.
+    filtered = _sosfiltfilt_chunked(sos, values, strategy)
+    data = pd.DataFrame({"time": signal.data.time.to_numpy(),
+                         "acc": filtered}, copy=False)
+    data.attrs = dict(signal.data.attrs)
+    signal._data = data
+    return signal
+
+
+def _sosfiltfilt_chunked(sos, values: np.ndarray, strategy: str,
+                         chunk_size: int = _CHUNK_SIZE) -> np.ndarray:
+    """Function that gives the same result as scipy.signal.sosfiltfilt with
+    its default odd padding, without the temporary copies of the full
+    signal. The forward pass is written chunk by chunk into the output
+    array, and the backward pass runs over the output array in place.
+
+    Args:
+        sos (np.ndarray): The second-order sections of the filter.
+        values (np.ndarray): The samples.
+        strategy (str): "chunked" for an output array in memory, "mmap"
+            for an output array in a memory-mapped temporary file.
+        chunk_size (int, optional): Number of samples filtered at a time.
+            Defaults to 262144.
+
+    Returns:
+        np.ndarray: The filtered samples.
+    """
+    # Length of the odd extension at each end, as in sosfiltfilt.
+    edge = 3 * (2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(),
+                                       (sos[:, 5] == 0).sum()))
+    size = len(values)
+    if size <= edge:
+        return sosfiltfilt(sos, values)
+
+    filtered = _output_array(size, strategy)
+    zi = sosfilt_zi(sos)
+    left = 2 * values[0] - values[edge: 0: -1]
+    right = 2 * values[-1] - values[-2: -edge - 2: -1]
+
+    _, state = sosfilt(sos, left, zi=zi * left[0])
+    for start in range(0, size, chunk_size):
+        filtered[start: start + chunk_size], state = sosfilt(
+            sos, values[start: start + chunk_size], zi=state
+        )
+        progress.update("filter", min(start + chunk_size, size), 2 * size)
+    right, state = sosfilt(sos, right, zi=state)
+
+    # The backward pass starts from the end of the forward pass.
+    _, state = sosfilt(sos, right[::-1], zi=zi * right[-1])
+    for end in range(size, 0, -chunk_size):
+        start = max(end - chunk_size, 0)
+        chunk, state = sosfilt(sos, filtered[start: end][::-1], zi=state)
+        filtered[start: end] = chunk[::-1]
+        progress.update("filter", 2 * size - start, 2 * size)
+    return filtered
+
+
+def _output_array(size: int, strategy: str) -> np.ndarray:
+    """Function that allocates the output array of a filter, in a
+    memory-mapped temporary file for the "mmap" strategy and in memory
+    otherwise. The file is removed when the array is no longer used."""
+    if strategy == "mmap":
+        return np.memmap(tempfile.TemporaryFile(), dtype=np.float64,
+                         mode="w+", shape=(size,))
+    return np.empty(size, dtype=np.float64)
+
+
+@lru_cache(maxsize=128)
+def _design_fir(btype: str, cutoffs: tuple, frequency_hz: float,
+                numtaps: int = None, transition_hz: float = None,
+                attenuation_db: float = _FIR_ATTENUATION_DB,
+                method: str = "window") -> np.ndarray:
+    """Function that designs a linear-phase FIR filter. The design is cached
+    like :func:`_design_butter`.
+
+    The number of taps is always odd, so that the delay of the filter is a
+    whole number of samples and all four types can be designed. If it is
+    not given, it is estimated from the width of the transition band and
+    the stopband attenuation with Kaiser's formula, see
+    :func:`_fir_numtaps`.
+
+    Args:
+        btype (str): "lowpass", "highpass", "bandpass" or "bandstop".
+        cutoffs (tuple): The cutoff frequencies in Hz.
+        frequency_hz (float): The sampling frequency.
+        numtaps (int, optional): The number of taps. Defaults to None.
+        transition_hz (float, optional): The width of the transition band
+            in Hz, centered on the cutoff frequencies. Defaults to 10 % of
+            the lowest cutoff frequency.
+        attenuation_db (float, optional): The stopband attenuation in dB.
+            Defaults to 80.
+        method (str, optional): "window" for a Kaiser window design or
+            "remez" for an equiripple design. The equiripple design often
+            fails to converge beyond a few hundred taps, so the window
+            design is used for long filters. Defaults to "window".
+
+    Returns:
+        np.ndarray: The taps of the filter.
+    """
+    if method not in _FIR_METHODS:
+        raise ValueError(f"Unknown FIR design method: {method}")
+    nyq = 0.5 * frequency_hz
+    if transition_hz is None:
+        transition_hz = _FIR_TRANSITION * min(cutoffs)
+    if numtaps is None:
+        numtaps = _fir_numtaps(cutoffs, frequency_hz, transition_hz,
+                               attenuation_db)
+    numtaps = int(numtaps) | 1
+
+    if method == "window":
+        return firwin(
+            numtaps,
+            list(cutoffs),
+            window=("kaiser", kaiser_beta(attenuation_db)),
+            pass_zero=btype,
+            fs=frequency_hz
+        )
+
+    # The bands of the equiripple design are the edges of the transition
+    # bands, and the gain alternates between them.
+    half = transition_hz / 2
+    edges = [edge for cutoff in cutoffs
+             for edge in (cutoff - half, cutoff + half)]
+    if min(edges) <= 0 or max(edges) >= nyq:
+        raise ValueError("The transition band must lie between 0 Hz and "
+                         "the Nyquist frequency")
+    gains = [1.0, 0.0] if btype in ("lowpass", "bandstop") else [0.0, 1.0]
+    desired = [gains[band % 2] for band in range(len(cutoffs) + 1)]
+    return remez(numtaps, [0.0] + edges + [nyq], desired, fs=frequency_hz)
+
+
+def _fir_numtaps(cutoffs: tuple, frequency_hz: float,
+                 transition_hz: float = None,
+                 attenuation_db: float = _FIR_ATTENUATION_DB) -> int:
+    """Function that estimates the number of taps of an FIR filter from the
+    width of the transition band and the stopband attenuation with Kaiser's
+    formula. The number is odd, see :func:`_design_fir`.
+
+    Args:
+        cutoffs (tuple): The cutoff frequencies in Hz.
+        frequency_hz (float): The sampling frequency.
+        transition_hz (float, optional): The width of the transition band
+            in Hz. Defaults to 10 % of the lowest cutoff frequency.
+        attenuation_db (float, optional): The stopband attenuation in dB.
+            Defaults to 80.
+
+    Returns:
+        int: The number of taps.
+    """
+    if transition_hz is None:
+        transition_hz = _FIR_TRANSITION * min(cutoffs)
+    if transition_hz <= 0:
+        raise ValueError(f"Invalid transition band: {transition_hz} Hz")
+    nyq = 0.5 * frequency_hz
+    numtaps, _ = kaiserord(attenuation_db, transition_hz / nyq)
+    return int(numtaps) | 1
+
+
+def _apply_fir(signal: Signal, btype: str, cutoffs: tuple,
+               **options) -> Signal:
+    """Function that filters a signal with a linear-phase FIR filter, see
+    :func:`_design_fir`. The filter is applied once with overlap-save
+    convolution, see :func:`_overlap_save`, and compensated for its delay.
+    As it is not applied twice, the gain is that of the design and not its
+    square as with the Butterworth filters.
+
+    The filter always runs chunk by chunk into a single output array, which
+    for the "mmap" strategy is a memory-mapped temporary file.
+
+    If the number of taps is not given, the estimated number is at most the
+    number of samples, so a short signal gets a wider transition band than
+    asked for instead of a filter longer than the signal.
+
+    Args:
+        signal (Signal): A Signal object to which a filter will be applied.
+        btype (str): "lowpass", "highpass", "bandpass" or "bandstop".
+        cutoffs (tuple): The cutoff frequencies in Hz.
+        **options: The settings of :func:`_design_fir`.
+
+    Returns:
+        Signal: A Signal object with an applied filter.
+    """
+    values = signal.data.acc.to_numpy()
+    if options.get("numtaps") is None:
+        numtaps = _fir_numtaps(
+            tuple(cutoffs), signal.frequency_hz,
+            options.get("transition_hz"),
+            options.get("attenuation_db", _FIR_ATTENUATION_DB)
+        )
+        options["numtaps"] = min(numtaps, len(values) - 1 | 1)
+    taps = _design_fir(btype, tuple(cutoffs), signal.frequency_hz,
+                       **options)
+    filtered = _output_array(len(values),
+                             getattr(signal, "strategy", "memory"))
+    _overlap_save(taps, values, filtered)
+
+    # The filtered array is used as is, as assign would copy it.
+    data = pd.DataFrame({"time": signal.data.time.to_numpy(),
+                         "acc": filtered}, copy=False)
+    data.attrs = dict(signal.data.attrs)
+    signal._data = data
+    return signal
+
+
+def _overlap_save(taps: np.ndarray, values: np.ndarray, output: np.ndarray,
+                  chunk_size: int = _CHUNK_SIZE) -> np.ndarray:
+    """Function that convolves samples with an FIR filter of an odd number
+    of taps using FFT overlap-save, compensated for the delay of the
+    filter. The samples are extended by odd reflection at both ends, as by
+    scipy.signal.sosfiltfilt, to reduce the transients.
+
+    The samples are read and the output is written chunk by chunk. Every
+    chunk is split into overlapping blocks that are transformed together
+    in one call, so the memory use depends on the chunk size and not on
+    the number of samples.
+
+    Args:
+        taps (np.ndarray): The taps of the filter.
+        values (np.ndarray): The samples.
+        output (np.ndarray): Array of the same length as the samples that
+            the filtered samples are written to.
+        chunk_size (int, optional): Approximate number of samples filtered
+            at a time. Defaults to 262144.
+
+    Returns:
+        np.ndarray: The output array.
+    """
+    numtaps = len(taps)
+    delay = numtaps // 2
+    size = len(values)
+    if size <= delay:
+        raise ValueError(f"The signal of {size} samples is too short for "
+                         f"a filter of {numtaps} taps")
+
+    # An FFT of several times the filter length keeps the share of every
+    # block that is thrown away small.
+    nfft = next_fast_len(max(8 * numtaps, 1024), real=True)
+    step = nfft - numtaps + 1
+    response = rfft(taps, nfft)
+    chunk_size = max(chunk_size // step, 1) * step
+
+    for start in range(0, size, chunk_size):
+        end = min(start + chunk_size, size)
+        blocks = -(-(end - start) // step)
+        segment = np.zeros(blocks * step + numtaps - 1)
+        extended = _odd_extension(values, start - delay, end + delay)
+        segment[:len(extended)] = extended
+
+        # Only the last step samples of every block are free from
+        # wrap-around. The blocks are read-only views of the segment.
+        stride = segment.strides[0]
+        frames = np.lib.stride_tricks.as_strided(
+            segment, (blocks, nfft), (step * stride, stride),
+            writeable=False
+        )
+        filtered = irfft(rfft(frames, axis=1) * response, nfft, axis=1)
+        output[start: end] = filtered[:, numtaps - 1:].reshape(-1)[
+            :end - start
+        ]
+        progress.update("filter", end, size)
+    return output
+
+
+def _odd_extension(values: np.ndarray, start: int, end: int) -> np.ndarray:
+    """Function that returns the samples between start and end, where
+    positions before the first and after the last sample are filled by
+    odd reflection around the first and last sample."""
+    size = len(values)
+    parts = [np.asarray(values[max(start, 0): min(end, size)],
+                        dtype=np.float64)]
+    if start < 0:
+        parts.insert(0, 2 * values[0] - values[-start: 0: -1])
+    if end > size:
+        parts.append(2 * values[-1] - values[-2: size - end - 2: -1])
+    return np.concatenate(parts)
+
+
+@lru_cache(maxsize=128)
+def _design_comb(fundamental: float, harmonics: int, q: float,
+                 frequency_hz: float) -> np.ndarray:
+    """Function that designs a comb of notch filters at a fundamental
+    frequency and its harmonics, as one cascade of second-order sections
+    with one section per notch. Harmonics at or above the Nyquist frequency
+    are left out. The design is cached like :func:`_design_butter`.
+
+    Args:
+        fundamental (float): The fundamental frequency in Hz.
+        harmonics (int): The number of notches, counting the fundamental
+            as the first.
+        q (float): The quality factor of every notch.
+        frequency_hz (float): The sampling frequency.
+
+    Returns:
+        np.ndarray: The second-order sections of the filter.
+    """
+    sections = []
+    for harmonic in range(1, harmonics + 1):
+        frequency = harmonic * fundamental
+        if frequency >= 0.5 * frequency_hz:
+            break
+        b, a = iirnotch(frequency, q, fs=frequency_hz)
+        sections.append(np.concatenate((b, a)))
+    if not sections:
+        raise ValueError(f"The fundamental {fundamental} Hz must be between "
+                         "0 Hz and the Nyquist frequency")
+    return np.array(sections)
+
+
+def track_fundamental(signal: Signal, fundamental: float,
+                      harmonics: int = _COMB_HARMONICS,
+                      tolerance: float = _TRACK_TOLERANCE,
+                      bins: int = _TRACK_BINS) -> float:
+    """Function that finds the actual fundamental frequency of a signal
+    near an expected one, e.g. the mains frequency or the speed of a shaft.
+    The candidates are spread within the tolerance around the expected
+    frequency, and the candidate with the largest sum of the amplitudes at
+    its harmonics is chosen. The amplitudes are computed with one zoom FFT
+    per harmonic, see :func:`.fft.perform_zoom_fft_on_signal`, so the
+    higher harmonics give a finer resolution of the fundamental.
+
+    Args:
+        signal (Signal): The signal to analyze.
+        fundamental (float): The expected fundamental frequency in Hz.
+        harmonics (int, optional): The number of harmonics to sum, counting
+            the fundamental as the first. Defaults to 10.
+        tolerance (float, optional): The largest deviation from the
+            expected frequency, as a fraction of it. Defaults to 0.02.
+        bins (int, optional): The number of candidates. Defaults to 256.
+
+    Returns:
+        float: The fundamental frequency in Hz.
+    """
+    low = fundamental * (1 - tolerance)
+    high = fundamental * (1 + tolerance)
+    score = np.zeros(bins)
+    for harmonic in range(1, harmonics + 1):
+        if harmonic * high >= 0.5 * signal.frequency_hz:
+            break
+        score += perform_zoom_fft_on_signal(
+            signal, harmonic * low, harmonic * high, bins
+        ).y
+    return float(np.linspace(low, high, bins)[np.argmax(score)])
+
+
+def _apply_comb_filter(signal: Signal, cutoff: float,
+                       cutoff_upper: float = None,
+                       harmonics: int = _COMB_HARMONICS,
+                       q: float = _COMB_Q) -> Signal:
+    """Function for removing a fundamental frequency and its harmonics from
+    a signal, with all notches in one cascade of second-order sections
+    applied forwards and backwards, see :func:`_apply_sos`. Intended to be
+    passed as a filtering function when instantiating a Filter object.
+
+    Args:
+        signal (Signal): A Signal object to which a filter will be applied.
+        cutoff (float): The fundamental frequency in Hz.
+        cutoff_upper (float, optional): This parameter is not used for the
+            comb filter. It is here due to compability reasons with other
+            filtering functions. Defaults to None.
+        harmonics (int, optional): The number of notches, counting the
+            fundamental as the first. Defaults to 10.
+        q (float, optional): The quality factor of every notch, i.e. its
+            frequency divided by its bandwidth. Defaults to 30.
+
+    Returns:
+        Signal: A Signal object with an applied filter.
+    """
+    sos = _design_comb(cutoff, harmonics, q, signal.frequency_hz)
+    return _apply_sos(signal, sos)
 
 
 def _apply_lowpass_filter(signal: Signal, cutoff: float,
@@ -89,16 +633,7 @@ def _apply_lowpass_filter(signal: Signal, cutoff: float,
     Returns:
         Signal: A Signal object with an applied filter.
     """
-    nyq = 0.5 * signal.frequency_hz
-    normalized_cutoff = cutoff / nyq
-    b, a = butter(
-        5,
-        normalized_cutoff,
-        btype="low",
-        analog=False
-    )
-    signal._data.acc = filtfilt(b, a, signal.data.acc)
-    return signal
+    return _apply_butter(signal, "low", (cutoff,))
 
 
 def _apply_highpass_filter(signal: Signal, cutoff: float,
@@ -117,16 +652,7 @@ def _apply_highpass_filter(signal: Signal, cutoff: float,
     Returns:
         Signal: A Signal object with an applied filter.
     """
-    nyq = 0.5 * signal.frequency_hz
-    normalized_cutoff = cutoff / nyq
-    b, a = butter(
-        5,
-        normalized_cutoff,
-        btype="high",
-        analog=False
-    )
-    signal._data.acc = filtfilt(b, a, signal.data.acc)
-    return signal
+    return _apply_butter(signal, "high", (cutoff,))
 
 
 def _apply_bandpass_filter(signal: Signal, cutoff: float,
@@ -148,16 +674,7 @@ def _apply_bandpass_filter(signal: Signal, cutoff: float,
     Returns:
         Signal: A Signal object with an applied filter.
     """
-    nyq = 0.5 * signal.frequency_hz
-    normalized_cutoff = [cutoff / nyq for cutoff in (cutoff, cutoff_upper)]
-    b, a = butter(
-        5,
-        normalized_cutoff,
-        btype="bandpass",
-        analog=False
-    )
-    signal._data.acc = filtfilt(b, a, signal.data.acc)
-    return signal
+    return _apply_butter(signal, "bandpass", (cutoff, cutoff_upper))
 
 
 def _apply_bandstop_filter(signal: Signal, cutoff: float,
@@ -178,22 +695,95 @@ def _apply_bandstop_filter(signal: Signal, cutoff: float,
     Returns:
         Signal: A Signal object with an applied filter.
     """
-    nyq = 0.5 * signal.frequency_hz
-    normalized_cutoff = [cutoff / nyq for cutoff in (cutoff, cutoff_upper)]
-    b, a = butter(
-        5,
-        normalized_cutoff,
-        btype="bandstop",
-        analog=False
-    )
-    signal._data.acc = filtfilt(b, a, signal.data.acc)
-    return signal
+    return _apply_butter(signal, "bandstop", (cutoff, cutoff_upper))
+
+
+def _apply_fir_lowpass_filter(signal: Signal, cutoff: float,
+                              cutoff_upper: float = None,
+                              **options) -> Signal:
+    """Function for performing low pass filtering on a signal with a
+    linear-phase FIR filter. Intended to be passed as a filtering function
+    when instantiating a Filter object.
+
+    Args:
+        signal (Signal): A Signal object to which a filter will be applied.
+        cutoff (float): The wanted cutoff frequency of the filter.
+        cutoff_upper (float, optional): Not used for low pass filtering.
+            Defaults to None.
+        **options: The settings of the design, see :func:`_design_fir`.
+
+    Returns:
+        Signal: A Signal object with an applied filter.
+    """
+    return _apply_fir(signal, "lowpass", (cutoff,), **options)
+
+
+def _apply_fir_highpass_filter(signal: Signal, cutoff: float,
+                               cutoff_upper: float = None,
+                               **options) -> Signal:
+    """Function for performing high pass filtering on a signal with a
+    linear-phase FIR filter. Intended to be passed as a filtering function
+    when instantiating a Filter object.
+
+    Args:
+        signal (Signal): A Signal object to which a filter will be applied.
+        cutoff (float): The wanted cutoff frequency of the filter.
+        cutoff_upper (float, optional): Not used for high pass filtering.
+            Defaults to None.
+        **options: The settings of the design, see :func:`_design_fir`.
+
+    Returns:
+        Signal: A Signal object with an applied filter.
+    """
+    return _apply_fir(signal, "highpass", (cutoff,), **options)
+
+
+def _apply_fir_bandpass_filter(signal: Signal, cutoff: float,
+                               cutoff_upper: float = None,
+                               **options) -> Signal:
+    """Function for performing band pass filtering on a signal with a
+    linear-phase FIR filter. Intended to be passed as a filtering function
+    when instantiating a Filter object.
+
+    Args:
+        signal (Signal): A Signal object to which a filter will be applied.
+        cutoff (float): The lower cutoff frequency.
+        cutoff_upper (float, optional): The upper cutoff frequency.
+            Defaults to None.
+        **options: The settings of the design, see :func:`_design_fir`.
+
+    Returns:
+        Signal: A Signal object with an applied filter.
+    """
+    return _apply_fir(signal, "bandpass", (cutoff, cutoff_upper), **options)
+
+
+def _apply_fir_bandstop_filter(signal: Signal, cutoff: float,
+                               cutoff_upper: float = None,
+                               **options) -> Signal:
+    """Function for performing band stop filtering on a signal with a
+    linear-phase FIR filter. Intended to be passed as a filtering function
+    when instantiating a Filter object.
+
+    Args:
+        signal (Signal): A Signal object to which a filter will be applied.
+        cutoff (float): The lower cutoff frequency.
+        cutoff_upper (float, optional): The upper cutoff frequency.
+            Defaults to None.
+        **options: The settings of the design, see :func:`_design_fir`.
+
+    Returns:
+        Signal: A Signal object with an applied filter.
+    """
+    return _apply_fir(signal, "bandstop", (cutoff, cutoff_upper), **options)
 
 
 _lowpass_filter_instance = None
 _highpass_filter_instance = None
 _bandpass_filter_instance = None
 _bandstop_filter_instance = None
+_fir_filter_instances = {}
+_comb_filter_instance = None
 
 
 def lowpass():
@@ -250,3 +840,74 @@ def bandstop():
     if _bandstop_filter_instance is None:
         _bandstop_filter_instance = _Filter(_apply_bandstop_filter, 'bandstop')
     return _bandstop_filter_instance
+
+
+def comb():
+    """Function to create a singelton of _Filter class that will
+    be used as a comb filter, removing a fundamental frequency given as
+    cutoff and its harmonics. The number of harmonics, the quality factor
+    and the tracking are given as keyword arguments when the filter is
+    applied, see :class:`_CombFilter` and :func:`_apply_comb_filter`.
+
+    Returns:
+        _Filter: Returns an object of type _Filter that is parametrized
+        for comb filtering.
+    """
+    global _comb_filter_instance
+    if _comb_filter_instance is None:
+        _comb_filter_instance = _CombFilter(_apply_comb_filter, 'comb')
+    return _comb_filter_instance
+
+
+def _fir_filter(filter_fn, filter_type):
+    """Helper function that creates a singelton of _Filter class per FIR
+    filter type."""
+    if filter_type not in _fir_filter_instances:
+        _fir_filter_instances[filter_type] = _Filter(filter_fn, filter_type)
+    return _fir_filter_instances[filter_type]
+
+
+def fir_lowpass():
+    """Function to create a singelton of _Filter class that will
+    be used as a linear-phase FIR lowpass filter. The settings of the
+    design, e.g. numtaps or transition_hz, are given as keyword arguments
+    when the filter is applied, see :func:`_design_fir`.
+
+    Returns:
+        _Filter: Returns an object of type _Filter that is parametrized
+        for FIR lowpass filtering.
+    """
+    return _fir_filter(_apply_fir_lowpass_filter, "fir_lowpass")
+
+
+def fir_highpass():
+    """Function to create a singelton of _Filter class that will
+    be used as a linear-phase FIR highpass filter, see :func:`fir_lowpass`.
+
+    Returns:
+        _Filter: Returns an object of type _Filter that is parametrized
+        for FIR highpass filtering.
+    """
+    return _fir_filter(_apply_fir_highpass_filter, "fir_highpass")
+
+
+def fir_bandpass():
+    """Function to create a singelton of _Filter class that will
+    be used as a linear-phase FIR bandpass filter, see :func:`fir_lowpass`.
+
+    Returns:
+        _Filter: Returns an object of type _Filter that is parametrized
+        for FIR bandpass filtering.
+    """
+    return _fir_filter(_apply_fir_bandpass_filter, "fir_bandpass")
+
+
+def fir_bandstop():
+    """Function to create a singelton of _Filter class that will
+    be used as a linear-phase FIR bandstop filter, see :func:`fir_lowpass`.
+
+    Returns:
+        _Filter: Returns an object of type _Filter that is parametrized
+        for FIR bandstop filtering.
+    """
+    return _fir_filter(_apply_fir_bandstop_filter, "fir_bandstop")
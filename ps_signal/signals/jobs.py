@@ -0,0 +1,413 @@
+"""Module that contains a job queue for processing captures with several
+worker processes, on one host or on several hosts that share storage. A job
+is a file and the settings of a :class:`.pipeline.Pipeline`, and the queue
+is a SQLite database.
+
+A worker claims a job by taking a lease on it, which it renews while the job
+runs. If a worker dies, its lease runs out and the job is claimed again by
+another worker. A failed job is retried until it has been attempted
+max_attempts times and is then marked as failed.
+
+Jobs can be cancelled with :meth:`JobQueue.cancel`. A worker notices that
+its job was cancelled when it checks its lease, and stops the job at the
+next chunk, see :mod:`.progress`.
+
+SQLite locking relies on the file locks of the file system. It works for
+processes on one host, but on network file systems such as NFS the locks
+must be supported and enabled.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import closing, contextmanager
+from . import progress
+from .pipeline import Pipeline
+
+
+__all__ = ["Job", "JobQueue", "run_worker"]
+
+
+# Number of seconds a claimed job is leased to a worker before another
+# worker may claim it, unless the lease is renewed.
+_LEASE_S = 300.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    config TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT,
+    result TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_until);
+"""
+
+
+Job = namedtuple("Job", ["id", "path", "config", "attempts"])
+Job.__doc__ = """A claimed job.
+
+Args:
+    id (int): The id of the job in the queue.
+    path (str): The path to the file.
+    config (dict): The pipeline settings, see
+        :meth:`.pipeline.Pipeline.from_dict`.
+    attempts (int): The number of attempts, including this one.
+"""
+
+
+class JobQueue:
+    """Class for a job queue stored in a SQLite database. The database is
+    created if it does not exist. Every method opens its own connection,
+    so the object can be shared between threads.
+
+    Args:
+        path (str): The path to the database.
+        lease_s (float, optional): Length of a lease in seconds.
+            Defaults to 300.
+        max_attempts (int, optional): Number of attempts before a job is
+            marked as failed. Defaults to 3.
+    """
+    def __init__(self, path: str, lease_s: float = _LEASE_S,
+                 max_attempts: int = 3) -> None:
+        self._path = path
+        self._lease_s = lease_s
+        self._max_attempts = max_attempts
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def __repr__(self):
+        """For printing out information about the JobQueue object."""
+        return f"job_queue_{self._path}"
+
+    @property
+    def path(self) -> str:
+        """The path to the database."""
+        return self._path
+
+    @property
+    def lease_s(self) -> float:
+        """The length of a lease in seconds."""
+        return self._lease_s
+
+    def submit(self, files: list, config: dict) -> list:
+        """Method that adds a job per file to the queue.
+
+        Args:
+            files (list): Paths to the files. Stored as absolute paths, so
+                workers can be started from any directory.
+            config (dict): The pipeline settings of the jobs.
+
+        Returns:
+            list: The ids of the added jobs.
+        """
+        # Fail here rather than in every worker.
+        Pipeline.from_dict(config)
+        text = json.dumps(config, sort_keys=True)
+        now = time.time()
+        ids = []
+        with self._transaction() as connection:
+            for path in files:
+                cursor = connection.execute(
+                    "INSERT INTO jobs (path, config, updated) "
+                    "VALUES (?, ?, ?)",
+                    (os.path.abspath(path), text, now)
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def claim(self, worker: str) -> Job:
+        """Method that leases the oldest pending job, or a job whose lease
+        has run out, to a worker.
+
+        Args:
+            worker (str): The id of the worker.
+
+        Returns:
+            Job: The claimed job, None if there is no job to claim.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            # Jobs of workers that died on their last attempt.
+            connection.execute(
+                "UPDATE jobs SET state = 'failed', error = 'lease expired', "
+                "updated = ? WHERE state = 'running' AND lease_until < ? "
+                "AND attempts >= ?",
+                (now, now, self._max_attempts)
+            )
+            row = connection.execute(
+                "SELECT id, path, config, attempts FROM jobs "
+                "WHERE state = 'pending' "
+                "OR (state = 'running' AND lease_until < ?) "
+                "ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            connection.execute(
+                "UPDATE jobs SET state = 'running', worker = ?, "
+                "lease_until = ?, attempts = attempts + 1, updated = ? "
+                "WHERE id = ?",
+                (worker, now + self._lease_s, now, row[0])
+            )
+        return Job(row[0], row[1], json.loads(row[2]), row[3] + 1)
+
+    def renew(self, job_id: int, worker: str) -> bool:
+        """Method that extends the lease of a job.
+
+        Args:
+            job_id (int): The id of the job.
+            worker (str): The id of the worker holding the lease.
+
+        Returns:
+            bool: False if the worker no longer holds the lease.
+        """
+        now = time.time()
+        return self._update_owned(
+            job_id, worker,
+            "lease_until = ?, updated = ?", (now + self._lease_s, now)
+        )
+
+    def complete(self, job_id: int, worker: str, result: str = None) -> bool:
+        """Method that marks a job as done.
+
+        Args:
+            job_id (int): The id of the job.
+            worker (str): The id of the worker holding the lease.
+            result (str, optional): A description of the result, e.g. the
+                output filename. Defaults to None.
+
+        Returns:
+            bool: False if the worker no longer holds the lease, i.e. the
+            job has been claimed by another worker.
+        """
+        return self._update_owned(
+            job_id, worker,
+            "state = 'done', lease_until = NULL, result = ?, updated = ?",
+            (result, time.time())
+        )
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """Method that records a failed attempt. The job is pending again
+        if it has attempts left, otherwise it is marked as failed.
+
+        Args:
+            job_id (int): The id of the job.
+            worker (str): The id of the worker holding the lease.
+            error (str): A description of the error.
+
+        Returns:
+            bool: False if the worker no longer holds the lease.
+        """
+        return self._update_owned(
+            job_id, worker,
+            "state = CASE WHEN attempts >= ? THEN 'failed' "
+            "ELSE 'pending' END, lease_until = NULL, error = ?, updated = ?",
+            (self._max_attempts, error, time.time())
+        )
+
+    def cancel(self, job_id: int = None) -> int:
+        """Method that cancels a pending or running job, or all of them.
+        A running job is stopped by its worker, see :func:`run_worker`.
+
+        Args:
+            job_id (int, optional): The id of the job. Defaults to None,
+                i.e. all jobs.
+
+        Returns:
+            int: The number of jobs cancelled.
+        """
+        query = ("UPDATE jobs SET state = 'cancelled', lease_until = NULL, "
+                 "updated = ? WHERE state IN ('pending', 'running')")
+        values = (time.time(),)
+        if job_id is not None:
+            query += " AND id = ?"
+            values += (job_id,)
+        with self._transaction() as connection:
+            return connection.execute(query, values).rowcount
+
+    def holds(self, job_id: int, worker: str) -> bool:
+        """Method that checks if a worker still holds the lease of a job.
+
+        Args:
+            job_id (int): The id of the job.
+            worker (str): The id of the worker.
+
+        Returns:
+            bool: False if the job was cancelled or claimed by another
+            worker.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT 1 FROM jobs WHERE id = ? AND worker = ? "
+                "AND state = 'running'", (job_id, worker)
+            ).fetchone()
+        return row is not None
+
+    def progress(self) -> dict:
+        """Method that counts the jobs in every state.
+
+        Returns:
+            dict: The number of jobs keyed by the state, i.e. "pending",
+            "running", "done", "failed" and "cancelled".
+        """
+        counts = dict.fromkeys(("pending", "running", "done", "failed",
+                                "cancelled"), 0)
+        with self._connect() as connection:
+            for state, count in connection.execute(
+                "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+            ):
+                counts[state] = count
+        return counts
+
+    def failures(self) -> list:
+        """Method that lists the failed jobs.
+
+        Returns:
+            list: Tuples of the path and the last error of every failed job.
+        """
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT path, error FROM jobs WHERE state = 'failed' "
+                "ORDER BY id"
+            ).fetchall()
+
+    def _connect(self):
+        """Helper method that opens a connection that waits for locks held
+        by other workers, closed when leaving the with-block."""
+        return closing(sqlite3.connect(self._path, timeout=60,
+                                       isolation_level=None))
+
+    @contextmanager
+    def _transaction(self):
+        """Helper method that opens a connection in a write transaction,
+        so that no other worker can claim the same job. The transaction is
+        committed when leaving the with-block and rolled back on errors."""
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def _update_owned(self, job_id: int, worker: str, assignments: str,
+                      values: tuple) -> bool:
+        """Helper method that updates a running job if the worker still
+        holds its lease."""
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                f"UPDATE jobs SET {assignments} "
+                "WHERE id = ? AND worker = ? AND state = 'running'",
+                values + (job_id, worker)
+            )
+            return cursor.rowcount == 1
+
+
+def run_worker(queue: JobQueue, worker: str = None, poll_s: float = 1.0,
+               wait: bool = False, progress_callback=None,
+               token: progress.CancellationToken = None) -> int:
+    """Function that runs jobs from a queue until it is empty. The lease of
+    the current job is renewed in the background while the job runs, and
+    the job is stopped if it is cancelled in the queue.
+
+    Args:
+        queue (JobQueue): The queue.
+        worker (str, optional): The id of the worker. Defaults to None,
+            i.e. the host name and the process id.
+        poll_s (float, optional): Seconds between checks for new jobs when
+            waiting. Defaults to 1.
+        wait (bool, optional): Keep polling while there is no job to claim
+            but jobs are running in other workers, as these may be retried.
+            Defaults to False.
+        progress_callback (function, optional): Called with the progress of
+            the jobs, see :func:`.progress.tracking`. Defaults to None.
+        token (CancellationToken, optional): Stops the worker when it is
+            cancelled. The current job is then put back in the queue.
+            Defaults to None.
+
+    Returns:
+        int: The number of jobs completed by this worker.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    completed = 0
+    while True:
+        if token is not None:
+            token.check()
+        job = queue.claim(worker)
+        if job is None:
+            if wait and queue.progress()["running"]:
+                time.sleep(poll_s)
+                continue
+            return completed
+
+        stop = threading.Event()
+        job_token = progress.CancellationToken()
+        heartbeat = threading.Thread(
+            target=_renew_lease,
+            args=(queue, job.id, worker, stop, job_token, token, poll_s),
+            daemon=True
+        )
+        heartbeat.start()
+        try:
+            with progress.tracking(progress_callback, job_token,
+                                   label=f"[{worker}] {job.path}"):
+                signal = Pipeline.from_dict(job.config).run(job.path)
+        except progress.Cancelled as error:
+            stop.set()
+            if token is not None and token.cancelled:
+                queue.fail(job.id, worker, f"Cancelled: {error}")
+                raise
+            print(f"[{worker}] {job.path}: cancelled: {error}")
+            continue
+        except BaseException as error:
+            stop.set()
+            queue.fail(job.id, worker, f"{type(error).__name__}: {error}")
+            print(f"[{worker}] {job.path}: attempt {job.attempts} "
+                  f"failed: {error}")
+            if isinstance(error, KeyboardInterrupt):
+                raise
+            continue
+        finally:
+            stop.set()
+            heartbeat.join()
+
+        if queue.complete(job.id, worker, signal.output_filename):
+            completed += 1
+        counts = queue.progress()
+        print(f"[{worker}] {job.path}: done "
+              f"({counts['done']} done, {counts['pending']} pending, "
+              f"{counts['running']} running, {counts['failed']} failed)")
+
+
+def _renew_lease(queue: JobQueue, job_id: int, worker: str,
+                 stop: threading.Event, job_token: progress.CancellationToken,
+                 token: progress.CancellationToken, poll_s: float) -> None:
+    """Helper function that renews the lease of a job a few times per
+    lease period, until stop is set. The job token is cancelled when the
+    lease is lost, e.g. as the job was cancelled, or when the token of the
+    worker is cancelled."""
+    interval_s = min(poll_s, queue.lease_s / 3)
+    renewed = time.monotonic()
+    while not stop.wait(interval_s):
+        if token is not None and token.cancelled:
+            job_token.cancel(token.reason)
+            return
+        if time.monotonic() - renewed >= queue.lease_s / 3:
+            held = queue.renew(job_id, worker)
+            renewed = time.monotonic()
+        else:
+            held = queue.holds(job_id, worker)
+        if not held:
+            job_token.cancel("The job was cancelled or lost its lease")
+            return
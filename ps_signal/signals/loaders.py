@@ -0,0 +1,542 @@
+"""Module that contains file loaders for the binary formats that can be
+exported from PicoScope. These loaders can be given to :class:`.data.Data`
+as an alternative to the default .csv loader.
+
+All loaders, including the .csv loader, are kept in a registry together
+with the file extensions they handle, a function that sniffs the header of
+a file and the capabilities of the loader. :func:`auto_data_loader` uses the
+registry to pick the fastest loader that matches a file.
+
+The binary loaders read the sample arrays in bulk, or memory-map them
+when the layout on disk allows it, and they read the real sample interval
+from the file metadata. The interval is stored in ``DataFrame.attrs`` with
+the key "period" (in seconds) and is used by :meth:`.data.Data.load` instead
+of estimating the sampling frequency from the time stamps.
+
+Note:
+    The native PicoScope .psdata format is not documented and can not be
+    read. Export the capture as a MATLAB .mat file instead.
+"""
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+import scipy.io
+from .data import picoscope_data_loader, detect_codec
+
+
+__all__ = [
+    "matlab_data_loader",
+    "raw_data_loader",
+    "excel_data_loader",
+    "sidecar_data_loader",
+    "auto_data_loader",
+    "cached_data_loader",
+    "write_sidecar",
+    "register_loader",
+    "get_loader",
+    "detect_loader",
+    "available_loaders",
+    "MMAP",
+    "STREAMING",
+    "MULTICHANNEL",
+]
+
+
+# Capabilities that a loader can declare.
+MMAP = "mmap"
+STREAMING = "streaming"
+MULTICHANNEL = "multichannel"
+
+# Number of bytes from the start of a file that is passed to the sniffers.
+_SNIFF_SIZE = 512
+
+_SIDECAR_SUFFIX = ".npz"
+
+
+# The first bytes of a MATLAB v7.3 file is a text header followed by
+# an ordinary HDF5 file.
+_MAT73_HEADER = b"MATLAB 7.3 MAT-file"
+
+
+class LoaderInfo:
+    """Class for storing a registered loader together with the information
+    used to match it against a file.
+
+    Args:
+        name (str): The name of the loader, used with :func:`get_loader`.
+        loader (function): The file loader.
+        extensions (tuple): File extensions handled by the loader.
+        sniff (function): A function taking the filename and the first bytes
+            of the file, returning True if the loader can read the file.
+            If None, the file is matched on the extension only.
+        capabilities (frozenset): The capabilities of the loader, such as
+            :data:`MMAP`, :data:`STREAMING` and :data:`MULTICHANNEL`.
+        priority (int): Loaders with a lower priority are faster and are
+            preferred when several loaders match a file.
+    """
+    def __init__(self, name, loader, extensions, sniff, capabilities,
+                 priority):
+        self.name = name
+        self.loader = loader
+        self.extensions = extensions
+        self.sniff = sniff
+        self.capabilities = capabilities
+        self.priority = priority
+
+    def matches(self, filename: str, header: bytes) -> bool:
+        """Method that checks if the loader can read a file.
+
+        Args:
+            filename (str): The path to the file.
+            header (bytes): The first bytes of the file.
+
+        Returns:
+            bool: True if the loader can read the file.
+        """
+        if self.sniff is not None:
+            return self.sniff(filename, header)
+        return filename.lower().endswith(self.extensions)
+
+    def __repr__(self):
+        """For printing out information about the LoaderInfo object."""
+        return f"{self.name}({', '.join(sorted(self.capabilities))})"
+
+
+_registry = dict()
+
+
+def register_loader(name: str, extensions: tuple = (), sniff=None,
+                    capabilities: tuple = (), priority: int = 100):
+    """Decorator factory used to add a file loader to the registry.
+
+    Examples:
+
+        .. code-block:: python
+
+            @register_loader("npy", extensions=(".npy",),
+                             capabilities=(MMAP,), priority=5)
+            def npy_data_loader(filename):
+                ...
+
+    Args:
+        name (str): The name of the loader.
+        extensions (tuple, optional): File extensions handled by the loader.
+            Defaults to ().
+        sniff (function, optional): Function used to match the loader against
+            a file, see :class:`LoaderInfo`. Defaults to None.
+        capabilities (tuple, optional): The capabilities of the loader.
+            Defaults to ().
+        priority (int, optional): Lower is preferred. Defaults to 100.
+
+    Returns:
+        function: A decorator that registers the function and returns it
+        with the attributes "loader_name" and "capabilities" added.
+    """
+    def inner(fn):
+        _registry[name] = LoaderInfo(
+            name,
+            fn,
+            tuple(extensions),
+            sniff,
+            frozenset(capabilities),
+            priority
+        )
+        fn.loader_name = name
+        fn.capabilities = frozenset(capabilities)
+        return fn
+    return inner
+
+
+def available_loaders() -> list:
+    """Function that lists the names of all registered loaders, ordered with
+    the fastest first.
+
+    Returns:
+        list: The names of the loaders.
+    """
+    infos = sorted(_registry.values(), key=lambda info: info.priority)
+    return [info.name for info in infos]
+
+
+def get_loader(name: str):
+    """Function that returns a loader by name. Besides the registered
+    loaders, "auto" gives :func:`auto_data_loader` and "cached" gives
+    :func:`cached_data_loader`.
+
+    Args:
+        name (str): The name of the loader.
+
+    Returns:
+        function: The file loader.
+    """
+    if name == "auto":
+        return auto_data_loader
+    if name == "cached":
+        return cached_data_loader
+    try:
+        return _registry[name].loader
+    except KeyError:
+        sys.exit(f"Unknown loader: {name}. Available loaders are "
+                 f"auto, cached, {', '.join(available_loaders())}")
+
+
+def loader_capabilities(name: str) -> frozenset:
+    """Function that returns the capabilities of a registered loader.
+
+    Args:
+        name (str): The name of the loader.
+
+    Returns:
+        frozenset: The capabilities. Empty if the loader is not registered.
+    """
+    info = _registry.get(name)
+    return info.capabilities if info else frozenset()
+
+
+def detect_loader(filename: str) -> LoaderInfo:
+    """Function that sniffs the header and extension of a file and returns
+    the fastest registered loader that can read it.
+
+    Args:
+        filename (str): The path to the file.
+
+    Returns:
+        LoaderInfo: The matching loader.
+    """
+    with open(filename, "rb") as file:
+        header = file.read(_SNIFF_SIZE)
+
+    for info in sorted(_registry.values(), key=lambda info: info.priority):
+        if info.matches(filename, header):
+            return info
+    raise ValueError(f"No loader found for {filename}")
+
+
+def auto_data_loader(filename: str) -> pd.DataFrame:
+    """Custom file loader that picks the fastest registered loader that
+    matches the file, see :func:`detect_loader`. The name and capabilities
+    of the used loader are stored in attrs["loader"] and attrs["capabilities"]
+    of the returned DataFrame.
+
+    Args:
+        filename (str): The path to the file that should be imported.
+
+    Returns:
+        pd.DataFrame: A pandas.DataFrame containing all the data.
+    """
+    try:
+        info = detect_loader(filename)
+    except (FileNotFoundError, ValueError) as error:
+        sys.exit(error)
+
+    data = info.loader(filename)
+    data.attrs["loader"] = info.name
+    data.attrs["capabilities"] = info.capabilities
+    return data
+
+
+def cached_data_loader(filename: str) -> pd.DataFrame:
+    """Custom file loader that works as :func:`auto_data_loader`, but also
+    writes a sidecar file next to the capture when it was loaded by a slow
+    loader. The next time the capture is loaded, the sidecar is used.
+
+    Args:
+        filename (str): The path to the file that should be imported.
+
+    Returns:
+        pd.DataFrame: A pandas.DataFrame containing all the data.
+    """
+    data = auto_data_loader(filename)
+    if data.attrs["loader"] in ("csv", "excel"):
+        try:
+            write_sidecar(filename, data)
+        except OSError as error:
+            print(f"Could not write sidecar for {filename}: {error}")
+    return data
+
+
+def write_sidecar(filename: str, data: pd.DataFrame) -> None:
+    """Function that stores loaded data in a binary sidecar file next to
+    the capture, named as the capture with ".npz" appended.
+
+    Args:
+        filename (str): The path to the capture.
+        data (pd.DataFrame): The data as returned by a loader.
+    """
+    np.savez(
+        filename + _SIDECAR_SUFFIX,
+        time=data.time.to_numpy(),
+        acc=data.acc.to_numpy(),
+        period=data.attrs.get("period", 0.0)
+    )
+
+
+def _sidecar_path(filename: str) -> str:
+    """Helper function that returns the path to the sidecar of a capture,
+    or the path itself if it already is a sidecar."""
+    if filename.endswith(_SIDECAR_SUFFIX):
+        return filename
+    return filename + _SIDECAR_SUFFIX
+
+
+def _sniff_sidecar(filename: str, header: bytes) -> bool:
+    """Sniffer that matches a capture with a sidecar that is newer than the
+    capture itself."""
+    sidecar = _sidecar_path(filename)
+    if sidecar == filename:
+        return header.startswith(b"PK\x03\x04")
+    return (os.path.exists(sidecar)
+            and os.path.getmtime(sidecar) >= os.path.getmtime(filename))
+
+
+@register_loader("sidecar", extensions=(_SIDECAR_SUFFIX,),
+                 sniff=_sniff_sidecar, priority=0)
+def sidecar_data_loader(filename: str) -> pd.DataFrame:
+    """Custom file loader for loading a sidecar file written by
+    :func:`write_sidecar`. The filename can be either the path to the
+    sidecar or to the capture it belongs to.
+
+    Args:
+        filename (str): The path to the file that should be imported.
+
+    Returns:
+        pd.DataFrame: A pandas.DataFrame containing all the data.
+    """
+    try:
+        with np.load(_sidecar_path(filename)) as content:
+            data = pd.DataFrame({"time": content["time"],
+                                 "acc": content["acc"]})
+            period = float(content["period"])
+    except (FileNotFoundError, Exception) as error:
+        sys.exit(error)
+    else:
+        if period:
+            data.attrs["period"] = period
+        return data
+
+
+def _sniff_raw(filename: str, header: bytes) -> bool:
+    """Sniffer that matches a raw buffer with a .json layout file."""
+    return os.path.exists(filename + ".json")
+
+
+def _sniff_matlab(filename: str, header: bytes) -> bool:
+    """Sniffer that matches the text header of a .mat file."""
+    return header.startswith(b"MATLAB")
+
+
+@register_loader("matlab", extensions=(".mat",), sniff=_sniff_matlab,
+                 capabilities=(MMAP, MULTICHANNEL), priority=20)
+def matlab_data_loader(filename: str, channel: str = "A") -> pd.DataFrame:
+    """Custom file loader for loading a file from disk. This file
+    loader is made for loading files exported from picoscope as a .mat,
+    both the v5 and the v7.3 (HDF5) version of the format.
+
+    Version 7.3 files need the optional package h5py. Channels stored
+    contiguously in a v7.3 file are memory-mapped rather than read.
+
+    Args:
+        filename (str): The path to the file that should be imported.
+        channel (str, optional): The channel to import. Defaults to "A".
+
+    Returns:
+        pd.DataFrame: A pandas.DataFrame containing all the data.
+
+    Important:
+        PicoScope stores the following variables in the exported file,
+        where the sample interval and start time are given in seconds.
+
+        .. code-block:: python
+
+            Tstart, Tinterval, Length, A, B, ...
+    """
+    try:
+        with open(filename, "rb") as file:
+            header = file.read(len(_MAT73_HEADER))
+        if header == _MAT73_HEADER:
+            values, start, interval = _read_mat73(filename, channel)
+        else:
+            values, start, interval = _read_mat5(filename, channel)
+    except (FileNotFoundError, Exception) as error:
+        sys.exit(error)
+    else:
+        return _to_data_frame(values, start, interval)
+
+
+@register_loader("raw", extensions=(".bin", ".raw"), sniff=_sniff_raw,
+                 capabilities=(MMAP,), priority=10)
+def raw_data_loader(filename: str) -> pd.DataFrame:
+    """Custom file loader for loading a raw binary buffer of samples, as
+    written by for example the PicoSDK. The samples are memory-mapped.
+
+    The layout of the buffer is described by a .json file next to it,
+    named as the buffer with ".json" appended.
+
+    Args:
+        filename (str): The path to the file that should be imported.
+
+    Returns:
+        pd.DataFrame: A pandas.DataFrame containing all the data.
+
+    Important:
+        The .json file must give the sample interval in seconds. The data
+        type of the samples, start time in seconds and the size of any
+        header to skip in bytes are optional.
+
+        .. code-block:: python
+
+            {
+                "interval": 1e-05,
+                "dtype": "<f4",
+                "start": -0.2,
+                "offset": 0
+            }
+    """
+    try:
+        with open(filename + ".json") as file:
+            metadata = json.load(file)
+        values = np.memmap(
+            filename,
+            dtype=np.dtype(metadata.get("dtype", "<f4")),
+            mode="r",
+            offset=int(metadata.get("offset", 0))
+        )
+        start = float(metadata.get("start", 0.0))
+        interval = float(metadata["interval"])
+    except (FileNotFoundError, KeyError, Exception) as error:
+        sys.exit(error)
+    else:
+        return _to_data_frame(values, start, interval)
+
+
+def _read_mat5(filename: str, channel: str) -> tuple:
+    """Helper function that reads a channel from a v5 .mat file.
+
+    Args:
+        filename (str): The path to the file.
+        channel (str): The channel to read.
+
+    Returns:
+        tuple: The samples, the start time and the sample interval.
+    """
+    content = scipy.io.loadmat(
+        filename,
+        variable_names=[channel, "Tstart", "Tinterval"],
+        squeeze_me=True
+    )
+    if channel not in content:
+        raise KeyError(f"Channel {channel} not found in {filename}")
+    return (
+        np.asarray(content[channel]).ravel(),
+        float(content.get("Tstart", 0.0)),
+        float(content["Tinterval"])
+    )
+
+
+def _read_mat73(filename: str, channel: str) -> tuple:
+    """Helper function that reads a channel from a v7.3 .mat file.
+    If the channel is stored contiguously and uncompressed, it is
+    memory-mapped directly from the file.
+
+    Args:
+        filename (str): The path to the file.
+        channel (str): The channel to read.
+
+    Returns:
+        tuple: The samples, the start time and the sample interval.
+    """
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("Reading MATLAB v7.3 files requires the optional "
+                          "package 'h5py'.")
+
+    with h5py.File(filename, "r") as file:
+        if channel not in file:
+            raise KeyError(f"Channel {channel} not found in {filename}")
+        dataset = file[channel]
+        start = float(np.ravel(file["Tstart"])[0]) if "Tstart" in file else 0.
+        interval = float(np.ravel(file["Tinterval"])[0])
+
+        offset = dataset.id.get_offset()
+        if offset is not None and dataset.chunks is None:
+            values = np.memmap(
+                filename,
+                dtype=dataset.dtype,
+                mode="r",
+                offset=offset,
+                shape=(dataset.size,)
+            )
+        else:
+            values = dataset[()].ravel()
+    return values, start, interval
+
+
+def _to_data_frame(values: np.ndarray, start: float,
+                   interval: float) -> pd.DataFrame:
+    """Helper function that creates the DataFrame used by :class:`.data.Data`
+    from an array of samples and the metadata of the capture.
+
+    Args:
+        values (np.ndarray): The samples.
+        start (float): Time of the first sample, given in seconds.
+        interval (float): The sample interval, given in seconds.
+
+    Returns:
+        pd.DataFrame: A pandas.DataFrame with the columns "time" and "acc".
+        The sample interval is stored in attrs["period"].
+    """
+    # Time is stored in ms to be consistent with the .csv loader.
+    time = (start + np.arange(len(values)) * interval) * 1000
+    data = pd.DataFrame({"time": time, "acc": values}, copy=False)
+    data.attrs["period"] = interval
+    return data
+
+
+def _sniff_excel(filename: str, header: bytes) -> bool:
+    """Sniffer that matches Excel files. The old .xls format is recognized
+    by its header, while .xlsx is a zip archive and is matched on the
+    extension to not be mistaken for a zipped .csv."""
+    return (header.startswith(b"\xd0\xcf\x11\xe0")
+            or filename.lower().endswith((".xls", ".xlsx")))
+
+
+@register_loader("excel", extensions=(".xls", ".xlsx"), sniff=_sniff_excel,
+                 priority=40)
+def excel_data_loader(filename: str) -> pd.DataFrame:
+    """Custom file loader for loading a capture that has been saved as an
+    Excel workbook. The first sheet is expected to have the same layout as
+    the .csv export, i.e. time and values in the first two columns.
+    Rows that are not numeric, such as headers and units, are skipped.
+
+    Args:
+        filename (str): The path to the file that should be imported.
+
+    Returns:
+        pd.DataFrame: A pandas.DataFrame containing all the data.
+    """
+    try:
+        data = pd.read_excel(filename, header=None, usecols=[0, 1])
+    except (FileNotFoundError, Exception) as error:
+        sys.exit(error)
+    else:
+        data = data.apply(pd.to_numeric, errors="coerce").dropna()
+        data.columns = ["time", "acc"]
+        return data.reset_index(drop=True)
+
+
+def _sniff_csv(filename: str, header: bytes) -> bool:
+    """Sniffer that matches .csv exports, either compressed or as plain
+    text with ';' as delimiter."""
+    if filename.lower().endswith((".xls", ".xlsx")):
+        return False
+    if filename.lower().endswith(".csv") or detect_codec(filename):
+        return True
+    return b";" in header and b"\x00" not in header
+
+
+register_loader("csv", extensions=(".csv",), sniff=_sniff_csv,
+                capabilities=(STREAMING,),
+                priority=30)(picoscope_data_loader)
@@ -0,0 +1,306 @@
+"""Module that contains fractional-octave band analysis, e.g. in 1/1 or 1/3
+octave bands, as used in acoustics and vibration standards. The levels are
+the RMS values of the bands, over the whole signal and frame by frame.
+
+The bands are computed with a multirate filter bank. The bands of the
+highest octave are filtered at the sampling frequency. The signal is then
+low-pass filtered and decimated by 2, and the same band filters give the
+bands of the next octave, as all frequencies are halved. Every octave thus
+runs on half the samples of the octave above, and the whole bank costs
+about two passes of one octave over the signal, however many bands there
+are. The band filters are only designed once, for the highest octave, where
+they are numerically well-conditioned.
+
+The midband frequencies are base-two, i.e. 1000 Hz times 2 to the power of
+k / fraction for integers k, and the band edges are half a band below and
+above them. The filters are causal and run chunk by chunk with their state
+kept between the chunks, so the signal can be memory-mapped.
+"""
+from functools import lru_cache
+import numpy as np
+from scipy.signal import butter, ellip, ellipord, sosfilt, sosfilt_zi
+from . import progress
+
+
+__all__ = ["OctaveBands", "band_centers", "octave_values",
+           "perform_octave_on_signal"]
+
+
+# Order of the Butterworth prototype of the band filters.
+_BAND_ORDER = 3
+
+# The upper edge of the highest band is at most this share of the
+# sampling frequency, which leaves room for the decimation filter.
+_MAX_EDGE = 0.4
+
+# Number of samples at the sampling frequency filtered at a time.
+_CHUNK_SIZE = 2 ** 18
+
+# Default length of a frame, the time constant "fast" of sound level
+# meters.
+_FRAME_MS = 125.0
+
+
+class OctaveBands:
+    """Class for the levels of fractional-octave bands, see
+    :func:`octave_values`.
+
+    Args:
+        centers_hz (np.ndarray): The exact midband frequencies in Hz.
+        time_ms (np.ndarray): The start of every frame in ms.
+        levels (np.ndarray): The RMS value of every band (rows) in every
+            frame (columns).
+        overall (np.ndarray): The RMS value of every band over the signal.
+        fraction (int): The number of bands per octave.
+        reference (float, optional): The reference value of the levels
+            in decibels. Defaults to 1.
+    """
+    def __init__(self, centers_hz, time_ms, levels, overall, fraction,
+                 reference=1.0):
+        self._centers_hz = centers_hz
+        self._time_ms = time_ms
+        self._levels = levels
+        self._overall = overall
+        self._fraction = fraction
+        self._reference = reference
+
+    def __repr__(self):
+        """For printing out information about the OctaveBands object."""
+        return (f"octave_1/{self._fraction}_{len(self._centers_hz)}_bands_"
+                f"{len(self._time_ms)}_frames")
+
+    @property
+    def centers_hz(self) -> np.ndarray:
+        """The exact midband frequencies in Hz."""
+        return self._centers_hz
+
+    @property
+    def fraction(self) -> int:
+        """The number of bands per octave."""
+        return self._fraction
+
+    @property
+    def time(self) -> np.ndarray:
+        """The start of every frame in ms."""
+        return self._time_ms
+
+    @property
+    def levels(self) -> np.ndarray:
+        """The RMS value of every band (rows) in every frame (columns)."""
+        return self._levels
+
+    @property
+    def overall(self) -> np.ndarray:
+        """The RMS value of every band over the whole signal."""
+        return self._overall
+
+    @property
+    def levels_db(self) -> np.ndarray:
+        """The levels in decibels relative to the reference."""
+        return _decibels(self._levels, self._reference)
+
+    @property
+    def overall_db(self) -> np.ndarray:
+        """The overall levels in decibels relative to the reference."""
+        return _decibels(self._overall, self._reference)
+
+    @property
+    def labels(self) -> list:
+        """The midband frequencies rounded for labels, e.g. "1k" or "31.5".
+        """
+        return [_label(center) for center in self._centers_hz]
+
+
+def band_centers(fraction: int, f_min: float, f_max: float) -> np.ndarray:
+    """Function that returns the exact base-two midband frequencies of the
+    bands whose centers lie between f_min and f_max.
+
+    Args:
+        fraction (int): The number of bands per octave, e.g. 1 or 3.
+        f_min (float): The lowest midband frequency in Hz.
+        f_max (float): The highest midband frequency in Hz.
+
+    Returns:
+        np.ndarray: The midband frequencies in Hz, in increasing order.
+    """
+    first = int(np.ceil(fraction * np.log2(f_min / 1000) - 1e-9))
+    last = int(np.floor(fraction * np.log2(f_max / 1000) + 1e-9))
+    return 1000 * 2.0 ** (np.arange(first, last + 1) / fraction)
+
+
+def octave_values(values: np.ndarray, frequency_hz: float, fraction: int = 3,
+                  frame_ms: float = _FRAME_MS, f_min: float = None,
+                  f_max: float = None, start_ms: float = 0.0,
+                  chunk_size: int = _CHUNK_SIZE) -> OctaveBands:
+    """Function that computes the levels of the fractional-octave bands of
+    the samples with a multirate filter bank, see the module description.
+
+    Args:
+        values (np.ndarray): The samples.
+        frequency_hz (float): The sampling frequency.
+        fraction (int, optional): The number of bands per octave, e.g. 1 for
+            octaves and 3 for third octaves. Defaults to 3.
+        frame_ms (float, optional): The length of a frame of the levels over
+            time, in ms. It is rounded to whole samples. Frames shorter
+            than a sample of a decimated octave hold no samples of some
+            bands, whose levels are NaN in those frames. Defaults to 125.
+        f_min (float, optional): The lowest midband frequency in Hz.
+            Defaults to None, i.e. the lowest band that fits ten periods in
+            the signal.
+        f_max (float, optional): The highest midband frequency in Hz.
+            Defaults to None, i.e. the highest band that fits below the
+            Nyquist frequency.
+        start_ms (float, optional): The time of the first sample, which the
+            times of the frames start from. Defaults to 0.
+        chunk_size (int, optional): Number of samples filtered at a time.
+            Defaults to 262144.
+
+    Returns:
+        OctaveBands: The levels of the bands.
+    """
+    fraction = int(fraction)
+    if fraction < 1:
+        raise ValueError(f"Invalid number of bands per octave: {fraction}")
+    length = len(values)
+    half_band = 2.0 ** (1 / (2 * fraction))
+    highest = _MAX_EDGE * frequency_hz / half_band
+    lowest = 10 * frequency_hz / max(length, 1)
+    centers = band_centers(fraction, max(f_min or lowest, lowest),
+                           min(f_max or highest, highest))
+    if not len(centers):
+        raise ValueError("No bands fit the sampling frequency and the "
+                         "length of the signal")
+
+    # The bands of the highest octave, divided by the sampling frequency,
+    # are the same for every octave. Octave j holds the bands j * fraction
+    # to (j + 1) * fraction - 1 from the top.
+    top = centers[::-1][:fraction] / frequency_hz
+    octaves = -(-len(centers) // fraction)
+    band_sos = [_design_band(round(center, 12), fraction) for center in top]
+    decimation_sos = _design_decimation()
+
+    # A frame is a whole number of samples at the sampling frequency. The
+    # samples of every octave are assigned to the frames by their position
+    # in the signal, so the frames of all octaves cover the same time.
+    frame = max(int(round(frame_ms / 1000 * frequency_hz)), 1)
+    frames = -(-length // frame)
+
+    squares = np.zeros((octaves * fraction, frames))
+    counts = np.zeros((octaves, frames))
+    states = [None] * octaves
+    chunk_size = -(-chunk_size // 2 ** octaves) * 2 ** octaves
+    for start in range(0, length, chunk_size):
+        chunk = np.asarray(values[start: start + chunk_size],
+                           dtype=np.float64)
+        position = start
+        for octave in range(octaves):
+            if states[octave] is None:
+                states[octave] = _initial_state(band_sos, decimation_sos,
+                                                chunk[0])
+            band_states, decimation_state = states[octave]
+            index = ((position + np.arange(len(chunk))) << octave) // frame
+            boundaries = np.flatnonzero(np.diff(index, prepend=-1))
+            for band, sos in enumerate(band_sos):
+                filtered, band_states[band] = sosfilt(sos, chunk,
+                                                      zi=band_states[band])
+                row = octave * fraction + band
+                squares[row, index[boundaries]] += np.add.reduceat(
+                    filtered * filtered, boundaries
+                )
+            counts[octave, index[boundaries]] += np.diff(
+                np.append(boundaries, len(chunk))
+            )
+            if octave + 1 < octaves:
+                # Chunks start at even samples at every octave.
+                chunk, decimation_state = sosfilt(decimation_sos, chunk,
+                                                  zi=decimation_state)
+                chunk = chunk[::2]
+                position //= 2
+            states[octave] = (band_states, decimation_state)
+        progress.update("octave", min(start + chunk_size, length), length)
+
+    # Rows from the top band down, reversed to increasing frequency, and
+    # cut to the bands asked for in the lowest octave.
+    counts = np.repeat(counts, fraction, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        levels = np.sqrt(squares / counts)[::-1][-len(centers):]
+        overall = np.sqrt(squares.sum(axis=1) / counts.sum(axis=1))
+    overall = overall[::-1][-len(centers):]
+    time_ms = start_ms + np.arange(frames) * (frame / frequency_hz * 1000)
+    return OctaveBands(centers, time_ms, levels, overall, fraction)
+
+
+def perform_octave_on_signal(signal, fraction: int = 3,
+                             frame_ms: float = _FRAME_MS,
+                             f_min: float = None,
+                             f_max: float = None) -> OctaveBands:
+    """Function to compute the fractional-octave band levels of a Signal,
+    see :func:`octave_values`.
+
+    Args:
+        signal (Signal): The Signal object that should be analyzed.
+        fraction (int, optional): The number of bands per octave.
+            Defaults to 3.
+        frame_ms (float, optional): The length of a frame in ms.
+            Defaults to 125.
+        f_min (float, optional): The lowest midband frequency in Hz.
+            Defaults to None.
+        f_max (float, optional): The highest midband frequency in Hz.
+            Defaults to None.
+
+    Returns:
+        OctaveBands: The levels of the bands.
+    """
+    time = signal.data.time.to_numpy()
+    return octave_values(
+        signal.data.acc.to_numpy(),
+        signal.frequency_hz,
+        fraction=fraction,
+        frame_ms=frame_ms,
+        f_min=f_min,
+        f_max=f_max,
+        start_ms=float(time[0]) if len(time) else 0.0
+    )
+
+
+@lru_cache(maxsize=64)
+def _design_band(center: float, fraction: int) -> np.ndarray:
+    """Helper function that designs the Butterworth band-pass filter of a
+    band, given its midband frequency divided by the sampling frequency.
+    Cached, as the same bands are used for every file."""
+    half_band = 2.0 ** (1 / (2 * fraction))
+    edges = 2 * center * np.array([1 / half_band, half_band])
+    return butter(_BAND_ORDER, edges, btype="bandpass", output="sos")
+
+
+@lru_cache(maxsize=1)
+def _design_decimation() -> np.ndarray:
+    """Helper function that designs the elliptic low-pass filter applied
+    before decimating by 2. It passes the bands of the next octave, below
+    a fifth of the sampling frequency, and attenuates by 80 dB from 0.3
+    times the sampling frequency. What is aliased from between a fourth and
+    0.3 of the sampling frequency lands above the bands."""
+    order, cutoff = ellipord(0.4, 0.6, 0.01, 80)
+    return ellip(order, 0.01, 80, cutoff, output="sos")
+
+
+def _initial_state(band_sos: list, decimation_sos: np.ndarray,
+                   first: float) -> tuple:
+    """Helper function that returns the initial states of the filters of an
+    octave, as if the first sample had been there forever, so that an
+    offset does not make the filters ring at the start."""
+    band_states = [sosfilt_zi(sos) * first for sos in band_sos]
+    return band_states, sosfilt_zi(decimation_sos) * first
+
+
+def _decibels(values: np.ndarray, reference: float) -> np.ndarray:
+    """Helper function that returns values in decibels."""
+    with np.errstate(divide="ignore"):
+        return 20 * np.log10(values / reference)
+
+
+def _label(center: float) -> str:
+    """Helper function that returns the label of a midband frequency."""
+    if center >= 1000:
+        return f"{center / 1000:.3g}k"
+    return f"{center:.3g}"
@@ -0,0 +1,514 @@
+"""Module that contains declarative processing pipelines. A pipeline is
+described in a JSON, YAML or TOML file that lists the loader, the stages and
+the outputs, for example:
+
+.. code-block:: json
+
+    {
+        "loader": "auto",
+        "stages": [
+            {"type": "quality", "action": "trim"},
+            {"type": "decimate", "factor": 4},
+            {"type": "slice", "start_ms": 0, "end_ms": 500},
+            {"type": "lowpass", "cutoff": 2000},
+            {"type": "fft"}
+        ],
+        "outputs": [{"type": "fft"}, {"type": "npz"}],
+        "cache_dir": ".ps_signal-cache",
+        "budget_mb": 2000
+    }
+
+The stages are run in the given order. "quality", "decimate" and "slice"
+work on the loaded data and must come before the filters ("lowpass",
+"highpass", "bandpass" and "bandstop", and their FIR versions such as
+"fir_lowpass", and "comb") and "fft", which work on a Signal. The FIR
+filters also take the settings of the design, e.g. "numtaps" or
+"transition_hz", and "comb" takes "harmonics", "q" and "track".
+The "quality" stage scans the data for problems, see :mod:`.quality`, and
+either fails the file ("reject") or keeps its longest clean interval
+("trim"). Other settings of the stage are passed on to the scanner.
+
+The result of every stage is cached under a key that is the hash of the
+key of the previous stage and the settings of the stage itself. The first
+key is made from the path, size and modification time of the file and the
+loader. Changing a stage thus only reruns that stage and the following
+ones, while the earlier results are read from the cache. The outputs are
+always written and are not cached. The "octave" output plots the
+fractional-octave band levels, see :mod:`.octave`, and takes "fraction",
+"frame_ms", "f_min" and "f_max". The "trend" output saves and plots the
+statistics of sliding windows, see :mod:`.trend`, and takes "window_ms"
+and "hop_ms".
+
+With a memory budget, the peak memory of every file is estimated before it
+is loaded and the filters run in memory, chunk by chunk or with
+memory-mapped temporary files to fit the budget, see :mod:`.planner`.
+
+YAML needs the optional package PyYAML, and TOML needs Python 3.11 or the
+optional package toml.
+"""
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import ps_signal
+from . import filters
+from . import loaders
+from . import octave
+from . import planner
+from . import plot
+from . import progress
+from . import report
+from . import trend
+from .data import Data, slice_clean, slice_data
+from .fft import FFT
+from .signal import Signal
+
+
+__all__ = ["Pipeline", "load_pipeline", "read_config"]
+
+
+_DEFAULT_CACHE_DIR = ".ps_signal-cache"
+
+# Stages that work on the loaded data, before it is made into a Signal.
+_DATA_STAGES = ("quality", "decimate", "slice")
+
+_QUALITY_ACTIONS = ("reject", "trim")
+
+_FILTERS = {
+    "lowpass": filters.lowpass(),
+    "highpass": filters.highpass(),
+    "bandpass": filters.bandpass(),
+    "bandstop": filters.bandstop(),
+    "comb": filters.comb(),
+    "fir_lowpass": filters.fir_lowpass(),
+    "fir_highpass": filters.fir_highpass(),
+    "fir_bandpass": filters.fir_bandpass(),
+    "fir_bandstop": filters.fir_bandstop(),
+}
+
+_SIGNAL_STAGES = tuple(_FILTERS) + ("fft",)
+
+_OUTPUTS = ("time_series", "fft", "npz", "report", "octave", "trend")
+
+# Plotting with pyplot is not thread-safe, so outputs are written one
+# at a time when files are processed in parallel.
+_OUTPUT_LOCK = threading.Lock()
+
+
+class Pipeline:
+    """Class for a processing pipeline, see the module description.
+
+    Args:
+        stages (list): The stages, each a dict with the key "type" and
+            the settings of the stage.
+        loader (str, optional): Name of the loader, see
+            :func:`.loaders.get_loader`. Defaults to "auto".
+        outputs (list, optional): The outputs, each a dict with the key
+            "type", one of "time_series", "fft", "npz", "report",
+            "octave" or "trend". Defaults to None.
+        cache_dir (str, optional): Directory of the stage cache. If None,
+            nothing is cached. Defaults to None.
+        budget_mb (float, optional): Memory budget in MB for every file,
+            see :func:`.planner.plan_execution`. If None, everything is
+            processed in memory. Defaults to None.
+    """
+    def __init__(self, stages: list, loader: str = "auto",
+                 outputs: list = None, cache_dir: str = None,
+                 budget_mb: float = None) -> None:
+        self._stages = [dict(stage) for stage in stages]
+        self._loader = loader
+        self._outputs = [dict(output) for output in outputs or ()]
+        self._cache_dir = cache_dir
+        self._budget_mb = budget_mb
+        _validate(self._stages, self._outputs)
+
+    @classmethod
+    def from_dict(cls, config: dict) -> "Pipeline":
+        """Method that creates a pipeline from a parsed pipeline file.
+
+        Args:
+            config (dict): The content of the pipeline file.
+
+        Returns:
+            Pipeline: The pipeline.
+        """
+        return cls(
+            stages=config.get("stages", []),
+            loader=config.get("loader", "auto"),
+            outputs=config.get("outputs", []),
+            cache_dir=config.get("cache_dir", _DEFAULT_CACHE_DIR),
+            budget_mb=config.get("budget_mb")
+        )
+
+    def __repr__(self):
+        """For printing out information about the Pipeline object."""
+        names = [self._loader] + [stage["type"] for stage in self._stages]
+        return "pipeline_" + "-".join(names)
+
+    @property
+    def stages(self) -> list:
+        """The stages of the pipeline."""
+        return self._stages
+
+    @property
+    def cache_dir(self) -> str:
+        """The directory of the stage cache, None if nothing is cached."""
+        return self._cache_dir
+
+    def stage_keys(self, path: str) -> list:
+        """Method that computes the cache key of the loaded file and of the
+        result of every stage.
+
+        Args:
+            path (str): The path to the file.
+
+        Returns:
+            list: The keys, the first for the loaded file followed by one
+            per stage.
+        """
+        status = os.stat(path)
+        key = _hash({
+            "file": os.path.realpath(path),
+            "size": status.st_size,
+            "mtime_ns": status.st_mtime_ns,
+            "loader": self._loader,
+            "version": ps_signal.__version__,
+        })
+        keys = [key]
+        for stage in self._stages:
+            key = _hash({"previous": key, "stage": stage})
+            keys.append(key)
+        return keys
+
+    def run(self, path: str, signal_id: str = None) -> Signal:
+        """Method that runs the pipeline on a file and writes the outputs.
+        Stages whose result is in the cache are skipped.
+
+        Args:
+            path (str): The path to the file.
+            signal_id (str, optional): The id of the signal, used for the
+                output files. Defaults to None, i.e. the name of the file.
+
+        Returns:
+            Signal: The signal after the last stage.
+        """
+        if signal_id is None:
+            signal_id = os.path.splitext(os.path.basename(path))[0]
+        keys = self.stage_keys(path)
+
+        # The memory use is planned before anything is loaded.
+        plan = None
+        if self._budget_mb is not None:
+            plan = planner.plan_execution(
+                path,
+                self._stages,
+                budget_mb=self._budget_mb,
+                loader=self._loader
+            )
+
+        # Start after the last stage with a cached result.
+        state, first = None, 0
+        if self._cache_dir:
+            for index in reversed(range(len(keys))):
+                state = _read_cache(self._cache_path(keys[index]), signal_id)
+                if state is not None:
+                    first = index
+                    break
+
+        if state is None:
+            input_data = Data(loader=loaders.get_loader(self._loader))
+            input_data.load(path)
+            state = input_data
+            self._write_cache(keys[0], state)
+
+        # The strategy does not change the results, so it is not part of
+        # the cache keys.
+        if plan is not None:
+            plan.apply(state)
+
+        for index in range(first, len(self._stages)):
+            state = _run_stage(state, self._stages[index], signal_id)
+            self._write_cache(keys[index + 1], state)
+
+        signal = _as_signal(state, signal_id)
+        with _OUTPUT_LOCK:
+            for output in self._outputs:
+                _write_output(signal, output)
+        return signal
+
+    def run_many(self, files: list, max_workers: int = None) -> dict:
+        """Method that runs the pipeline on many files in parallel.
+
+        Args:
+            files (list): Paths to the files.
+            max_workers (int, optional): Number of files processed in
+                parallel. Defaults to None, i.e. the number of CPUs.
+
+        Returns:
+            dict: The resulting Signal of every path. If the pipeline failed
+            for a path, the value is the raised exception.
+        """
+        def run_one(path):
+            with progress.tracking(label=path):
+                try:
+                    return self.run(path)
+                except SystemExit as error:
+                    return RuntimeError(f"{path}: {error}")
+                except Exception as error:
+                    return error
+
+        # A cancelled run raises progress.Cancelled, which is not caught.
+        max_workers = max_workers or os.cpu_count() or 1
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for path, result in zip(files, executor.map(
+                    progress.bind(run_one), files)):
+                results[path] = result
+                progress.update("files", len(results), len(files), "files")
+        return results
+
+    def _cache_path(self, key: str) -> str:
+        """Helper method that returns the path of a cache entry."""
+        return os.path.join(self._cache_dir, key[:2], key + ".npz")
+
+    def _write_cache(self, key: str, state) -> None:
+        """Helper method that writes the result of a stage to the cache.
+        The entry is written atomically, so a concurrent run never reads a
+        partial entry, see :func:`.progress.atomic_output`."""
+        if not self._cache_dir:
+            return
+        path = self._cache_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with progress.atomic_output(path) as temporary:
+                with open(temporary, "wb") as file:
+                    np.savez(file, **_serialize(state))
+        except OSError as error:
+            print(f"Could not write to the pipeline cache: {error}")
+
+
+def load_pipeline(filename: str) -> Pipeline:
+    """Function that loads a pipeline file, see :func:`read_config`.
+
+    Args:
+        filename (str): The path to the pipeline file.
+
+    Returns:
+        Pipeline: The pipeline.
+    """
+    return Pipeline.from_dict(read_config(filename))
+
+
+def read_config(filename: str) -> dict:
+    """Function that reads the content of a pipeline file. The format is
+    given by the extension, i.e. .json, .yaml, .yml or .toml.
+
+    Args:
+        filename (str): The path to the pipeline file.
+
+    Returns:
+        dict: The content of the pipeline file.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("Reading YAML pipelines requires the optional "
+                              "package 'PyYAML'.")
+        with open(filename, "r") as file:
+            config = yaml.safe_load(file)
+    elif extension == ".toml":
+        try:
+            import tomllib
+            with open(filename, "rb") as file:
+                config = tomllib.load(file)
+        except ImportError:
+            try:
+                import toml
+            except ImportError:
+                raise ImportError("Reading TOML pipelines requires Python "
+                                  "3.11 or the optional package 'toml'.")
+            with open(filename, "r") as file:
+                config = toml.load(file)
+    elif extension == ".json":
+        with open(filename, "r") as file:
+            config = json.load(file)
+    else:
+        raise ValueError(f"Unknown pipeline format: {filename}")
+
+    if not isinstance(config, dict):
+        raise ValueError(f"Invalid pipeline file: {filename}")
+    return config
+
+
+def _validate(stages: list, outputs: list) -> None:
+    """Helper function that checks the types and order of the stages and
+    the types of the outputs."""
+    seen_signal_stage = False
+    for stage in stages:
+        kind = stage.get("type")
+        if kind in _DATA_STAGES:
+            if seen_signal_stage:
+                raise ValueError(f"Stage '{kind}' must come before the "
+                                 "filters and the FFT.")
+        elif kind in _SIGNAL_STAGES:
+            seen_signal_stage = True
+        else:
+            raise ValueError(f"Unknown pipeline stage: {kind}")
+
+        if (kind == "quality"
+                and stage.get("action", "reject") not in _QUALITY_ACTIONS):
+            raise ValueError(f"Unknown quality action: {stage['action']}")
+
+    for output in outputs:
+        if output.get("type") not in _OUTPUTS:
+            raise ValueError(f"Unknown pipeline output: {output.get('type')}")
+
+
+def _hash(content: dict) -> str:
+    """Helper function that hashes JSON-serializable content, independent
+    of the order of the keys."""
+    text = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _run_stage(state, stage: dict, signal_id: str):
+    """Helper function that runs one stage. Data stages are run on a Data
+    object, the other stages on a Signal."""
+    settings = {key: value for key, value in stage.items() if key != "type"}
+    kind = stage["type"]
+
+    if kind == "decimate":
+        state.decimate(**settings)
+        return state
+    if kind == "slice":
+        return slice_data(state, **settings)
+    if kind == "quality":
+        action = settings.pop("action", "reject")
+        report = state.check_quality(**settings)
+        if report.ok:
+            return state
+        if action == "reject":
+            raise ValueError(f"Rejected by the quality check: "
+                             f"{report.summary()}")
+        return slice_clean(state, report)
+
+    signal = _as_signal(state, signal_id)
+    if kind == "fft":
+        signal.calc_fft(**settings)
+    else:
+        _FILTERS[kind](signal, inplace=True, **settings)
+    return signal
+
+
+def _as_signal(state, signal_id: str) -> Signal:
+    """Helper function that makes a Signal of a Data object. A Signal is
+    returned as is."""
+    if isinstance(state, Signal):
+        return state
+    return Signal(id=signal_id, input_data=state)
+
+
+def _serialize(state) -> dict:
+    """Helper function that converts a Data object or a Signal to arrays
+    that can be stored with numpy.savez."""
+    content = {
+        "time": state.data.time.to_numpy(),
+        "acc": state.data.acc.to_numpy(),
+        "period": state.period,
+        "frequency_hz": state.frequency_hz,
+        "is_signal": isinstance(state, Signal),
+    }
+    if isinstance(state, Signal):
+        content["filters"] = json.dumps(
+            [list(spec) for spec in state._applied_filters]
+        )
+        if state._fft is not None:
+            content["fft_x"] = state._fft.x
+            content["fft_y"] = state._fft.y
+            content["fft_key"] = json.dumps(state._fft_key)
+    return content
+
+
+def _read_cache(path: str, signal_id: str):
+    """Helper function that reads a cache entry. Returns None if there is no
+    entry or it cannot be read."""
+    try:
+        with np.load(path, allow_pickle=False) as content:
+            frame = pd.DataFrame({
+                "time": content["time"],
+                "acc": content["acc"],
+            })
+            frame.attrs["period"] = float(content["period"])
+            input_data = Data(loader=lambda _: frame)
+            input_data.load(path, remove_offset=False)
+
+            # Restored as stored, rather than as the inverse of the period.
+            input_data._frequency_hz = content["frequency_hz"].item()
+            if not bool(content["is_signal"]):
+                return input_data
+
+            signal = Signal(id=signal_id, input_data=input_data)
+            for spec in json.loads(str(content["filters"])):
+                signal._add_filter(filters.FilterSpec(*spec))
+            if "fft_x" in content:
+                mode, f_start, f_stop, bins, frequencies = json.loads(
+                    str(content["fft_key"])
+                )
+                signal._fft = FFT(content["fft_x"], content["fft_y"])
+                signal._fft_key = (mode, f_start, f_stop, bins,
+                                   tuple(frequencies))
+            return signal
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+def _write_output(signal: Signal, output: dict) -> None:
+    """Helper function that writes one output of a pipeline."""
+    kind = output["type"]
+    if kind == "time_series":
+        signal.plot_signal()
+    elif kind == "fft":
+        signal.plot_fft()
+    elif kind == "report":
+        report.add_to_report(
+            signal,
+            directory=output.get("directory", "report"),
+            title=output.get("title"),
+            max_points=output.get("max_points", 2000)
+        )
+    elif kind == "octave":
+        bands = octave.perform_octave_on_signal(
+            signal,
+            fraction=output.get("fraction", 3),
+            frame_ms=output.get("frame_ms", 125.0),
+            f_min=output.get("f_min"),
+            f_max=output.get("f_max")
+        )
+        plot.plot_data(style="octave", bands=bands,
+                       output_filename=signal.output_filename,
+                       title=signal.id)
+    elif kind == "trend":
+        result = signal.calc_trend(output.get("window_ms", 100.0),
+                                   output.get("hop_ms"))
+        trend.save_trend(result, f"{signal.output_filename}-trend.npz")
+        plot.plot_data(style="trend", trend=result,
+                       output_filename=signal.output_filename,
+                       title=signal.id)
+    elif kind == "npz":
+        if signal._fft is not None:
+            path = f"{signal.output_filename}-fft.npz"
+            arrays = {"frequency_khz": signal._fft.x,
+                      "amplitude": signal._fft.y}
+        else:
+            path = f"{signal.output_filename}.npz"
+            arrays = {"time": signal.data.time.to_numpy(),
+                      "acc": signal.data.acc.to_numpy()}
+        with progress.atomic_output(path) as temporary:
+            with open(temporary, "wb") as file:
+                np.savez(file, **arrays)
@@ -0,0 +1,490 @@
+"""Module that contains an execution planner, which estimates the peak
+memory of loading and processing a capture before it is loaded, and picks
+a strategy that fits a memory budget:
+
+* memory - Everything is processed in memory, which is the fastest.
+* chunked - The filters run chunk by chunk into a single output array,
+  without the temporary copies of the full signal made by
+  scipy.signal.sosfiltfilt.
+* mmap - As chunked, but the filtered samples are written to memory-mapped
+  temporary files, so they are paged out rather than held in memory.
+
+The estimate is made from the size of the file, the data type and layout of
+the samples and the stages that are run, using the number of bytes per
+sample that every stage allocates. The stages are given as in a pipeline
+file, see :mod:`.pipeline`. The peak can be measured with
+:func:`track_peak` and compared with the estimate in
+:meth:`ExecutionPlan.report`.
+
+Memory-mapped samples, e.g. from the raw loader, are not counted, as their
+pages are read from the file when used and can always be dropped again.
+Whether the samples can be memory-mapped follows from the capabilities of
+the loader, see :mod:`.loaders`, and slices of memory-mapped samples are
+views, see :func:`.data.slice_data`.
+"""
+import json
+import os
+import tracemalloc
+import zipfile
+from contextlib import contextmanager
+import numpy as np
+import scipy.io
+from . import loaders
+from .data import detect_codec, _open_decompressed
+
+
+__all__ = ["ExecutionPlan", "plan_execution", "estimate_samples",
+           "estimate_peak", "track_peak", "STRATEGIES"]
+
+
+# The strategies, from the fastest to the one using the least memory.
+STRATEGIES = ("memory", "chunked", "mmap")
+
+# Share of the available memory used as the budget if none is given.
+_BUDGET_FRACTION = 0.5
+
+# Number of bytes read from a text capture to estimate the length of a row.
+_SAMPLE_BYTES = 2 ** 16
+
+# Assumed compression ratio of compressed text captures, whose
+# decompressed size is not known without reading them.
+_COMPRESSION_RATIO = 3.0
+
+# Bytes per sample while parsing a text capture, and of the loaded
+# DataFrame with the time stamps and the samples in float64.
+_TEXT_LOAD_PEAK = 41
+_TEXT_RESIDENT = 16
+
+# Bytes per sample of the time stamps made by the binary loaders, and of
+# the temporaries used to make them.
+_TIME_RESIDENT = 8
+_TIME_TEMPORARY = 8
+
+# Bytes per sample of the filters, per strategy. The temporaries are freed
+# when the filter returns, while the filtered samples stay in memory and
+# replace the samples of the previous filter.
+_FILTER_TEMPORARY = {"memory": 16, "chunked": 0, "mmap": 0}
+_FILTER_RESIDENT = {"memory": 8, "chunked": 8, "mmap": 0}
+
+# Bytes per sample of the full FFT, i.e. the half spectrum, its amplitude
+# and the frequencies, and of the FFT result that is kept.
+_FFT_TEMPORARY = 12
+_FFT_RESIDENT = 8
+
+# Bytes per sample of a slice, which is copied from the data. The length
+# of the slice is not known before loading, so it is taken as all of it.
+_SLICE_TEMPORARY = 16
+_SLICE_RESIDENT = 16
+
+# Bytes allocated by the stages and FFT modes that work block by block,
+# independent of the number of samples.
+_BLOCK_BYTES = 64 * 2 ** 20
+_BLOCK_STAGES = ("quality", "octave", "trend")
+_BLOCK_MODES = ("zoom", "goertzel", "envelope")
+
+# Bytes per sample of a chunk of the chunked filters, and the number of
+# samples in a chunk, as in :mod:`.filters`.
+_CHUNK_BYTES = 16
+_CHUNK_SIZE = 2 ** 18
+
+_FILTER_STAGES = ("lowpass", "highpass", "bandpass", "bandstop", "comb")
+
+# The FIR filters always run chunk by chunk, with the overlapping blocks
+# of a chunk and their spectra as temporaries. Long filters use blocks of
+# eight times the number of taps, and a chunk of at least one block, which
+# comes to the bytes per tap.
+_FIR_STAGES = ("fir_lowpass", "fir_highpass", "fir_bandpass",
+               "fir_bandstop")
+_FIR_CHUNK_BYTES = 48
+_FIR_TAP_BYTES = 320
+
+
+class ExecutionPlan:
+    """Class for the strategy chosen for a capture, see
+    :func:`plan_execution`.
+
+    Args:
+        path (str): The path to the capture.
+        strategy (str): The chosen strategy, one of :data:`STRATEGIES`.
+        samples (int): The estimated number of samples.
+        predicted (dict): The estimated peak in bytes of every strategy.
+        budget (int): The memory budget in bytes, None if there is none.
+        reason (str): Why the strategy was chosen.
+    """
+    def __init__(self, path, strategy, samples, predicted, budget, reason):
+        self._path = path
+        self._strategy = strategy
+        self._samples = samples
+        self._predicted = predicted
+        self._budget = budget
+        self._reason = reason
+
+    def __repr__(self):
+        """For printing out information about the ExecutionPlan object."""
+        return f"plan_{self._strategy}_{self.predicted_bytes}_bytes"
+
+    @property
+    def path(self) -> str:
+        """The path to the capture."""
+        return self._path
+
+    @property
+    def strategy(self) -> str:
+        """The chosen strategy."""
+        return self._strategy
+
+    @property
+    def samples(self) -> int:
+        """The estimated number of samples."""
+        return self._samples
+
+    @property
+    def predicted(self) -> dict:
+        """The estimated peak in bytes of every strategy."""
+        return self._predicted
+
+    @property
+    def predicted_bytes(self) -> int:
+        """The estimated peak in bytes of the chosen strategy."""
+        return self._predicted[self._strategy]
+
+    @property
+    def budget(self) -> int:
+        """The memory budget in bytes, None if there is none."""
+        return self._budget
+
+    @property
+    def fits(self) -> bool:
+        """True if the estimated peak is within the budget."""
+        return self._budget is None or self.predicted_bytes <= self._budget
+
+    @property
+    def reason(self) -> str:
+        """Why the strategy was chosen."""
+        return self._reason
+
+    def apply(self, target) -> None:
+        """Method that sets the strategy of a Data or Signal object.
+
+        Args:
+            target (Data): The loaded data, or a Signal.
+        """
+        target.strategy = self._strategy
+
+    def report(self, actual_bytes: int = None) -> str:
+        """Method that describes the plan in a line of text, and compares
+        the estimate with the measured peak if given.
+
+        Args:
+            actual_bytes (int, optional): The measured peak in bytes, see
+                :func:`track_peak`. Defaults to None.
+
+        Returns:
+            str: The description.
+        """
+        text = (f"{self._strategy} strategy, about {self._samples} samples, "
+                f"predicted peak {_megabytes(self.predicted_bytes)}")
+        if self._budget is not None:
+            text += f" of {_megabytes(self._budget)} budget"
+        if actual_bytes is not None:
+            return text + f", actual peak {_megabytes(actual_bytes)}"
+        return text + f" ({self._reason})"
+
+
+def plan_execution(path: str, stages: list = (), budget_mb: float = None,
+                   loader: str = "auto") -> ExecutionPlan:
+    """Function that estimates the peak memory of every strategy and picks
+    the fastest strategy that fits the budget. If none fits, the strategy
+    using the least memory is picked.
+
+    Args:
+        path (str): The path to the capture.
+        stages (list, optional): The stages, each a dict with the key
+            "type" and the settings of the stage, see :mod:`.pipeline`.
+            Defaults to ().
+        budget_mb (float, optional): The memory budget in MB. Defaults to
+            None, i.e. half of the available memory, or no budget if that
+            is not known.
+        loader (str, optional): Name of the loader, see
+            :func:`.loaders.get_loader`. Defaults to "auto".
+
+    Returns:
+        ExecutionPlan: The chosen strategy.
+    """
+    if budget_mb is None:
+        budget = _available_memory()
+        if budget is not None:
+            budget = int(budget * _BUDGET_FRACTION)
+    else:
+        budget = int(budget_mb * 2 ** 20)
+
+    samples, itemsize, layout = estimate_samples(path, loader)
+    predicted = {
+        strategy: estimate_peak(samples, stages, strategy, itemsize, layout)
+        for strategy in STRATEGIES
+    }
+
+    if budget is None:
+        strategy, reason = "memory", "no budget"
+    else:
+        fitting = [strategy for strategy in STRATEGIES
+                   if predicted[strategy] <= budget]
+        if fitting:
+            strategy = fitting[0]
+            reason = ("fits the budget" if strategy == "memory"
+                      else "memory strategy exceeds the budget")
+        else:
+            strategy = min(STRATEGIES, key=predicted.get)
+            reason = "no strategy fits the budget"
+    return ExecutionPlan(path, strategy, samples, predicted, budget, reason)
+
+
+def estimate_samples(path: str, loader: str = "auto") -> tuple:
+    """Function that estimates the number of samples of a capture without
+    loading it. Binary formats give the exact number, while for text
+    captures it is estimated from the length of the first rows.
+
+    Args:
+        path (str): The path to the capture.
+        loader (str, optional): Name of the loader, see
+            :func:`.loaders.get_loader`. Defaults to "auto".
+
+    Returns:
+        tuple: The number of samples, the number of bytes per sample as
+        loaded, and the layout, "text", "binary" or "mapped" for
+        memory-mapped samples. Only loaders with the capability
+        :data:`.loaders.MMAP` give mapped samples.
+    """
+    if loader in ("auto", "cached"):
+        loader = loaders.detect_loader(path).name
+    mappable = loaders.MMAP in loaders.loader_capabilities(loader)
+    file_size = os.path.getsize(path)
+
+    if loader == "raw":
+        with open(path + ".json") as file:
+            metadata = json.load(file)
+        itemsize = np.dtype(metadata.get("dtype", "<f4")).itemsize
+        offset = int(metadata.get("offset", 0))
+        return ((file_size - offset) // itemsize, itemsize,
+                _layout(mappable))
+    if loader == "matlab":
+        samples, itemsize, contiguous = _matlab_samples(path)
+        return samples, itemsize, _layout(mappable and contiguous)
+    if loader == "sidecar":
+        return _sidecar_samples(path), 8, "binary"
+    return _text_samples(path, file_size), 8, "text"
+
+
+def estimate_peak(samples: int, stages: list = (), strategy: str = "memory",
+                  itemsize: int = 8, layout: str = "text") -> int:
+    """Function that estimates the peak memory of loading a capture and
+    running the stages on it with a strategy.
+
+    Args:
+        samples (int): The number of samples.
+        stages (list, optional): The stages, see :func:`plan_execution`.
+            Defaults to ().
+        strategy (str, optional): One of :data:`STRATEGIES`.
+            Defaults to "memory".
+        itemsize (int, optional): Bytes per loaded sample. Defaults to 8.
+        layout (str, optional): "text", "binary" or "mapped", see
+            :func:`estimate_samples`. Defaults to "text".
+
+    Returns:
+        int: The estimated peak in bytes.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+
+    if layout == "text":
+        resident = _TEXT_RESIDENT
+        peak = _TEXT_LOAD_PEAK
+    else:
+        resident = _TIME_RESIDENT + (0 if layout == "mapped" else itemsize)
+        peak = resident + _TIME_TEMPORARY
+    peak *= samples
+    resident *= samples
+    fixed = 0
+
+    # The data is kept while a Signal is processed, so the filtered
+    # samples come on top of it.
+    filtered = False
+    mapped = layout == "mapped"
+    for stage in stages:
+        kind = stage.get("type")
+        if kind == "decimate":
+            # The samples are copied as float64 and replaced by the
+            # decimated time stamps and samples.
+            factor = stage.get("factor") or 1
+            peak = max(peak, resident + samples * (8 + 16 / factor))
+            samples = samples // factor
+            resident = samples * 16
+            mapped = False
+        elif kind == "slice" and not mapped:
+            # A slice of memory-mapped samples is a view, anything else
+            # is copied.
+            peak = max(peak, resident
+                       + samples * (_SLICE_TEMPORARY + _SLICE_RESIDENT))
+            resident += samples * _SLICE_RESIDENT
+        elif kind in _FILTER_STAGES:
+            peak = max(peak, resident
+                       + samples * (_FILTER_TEMPORARY[strategy]
+                                    + _FILTER_RESIDENT[strategy]))
+            if strategy != "memory":
+                fixed = max(fixed,
+                            _CHUNK_BYTES * min(samples, _CHUNK_SIZE))
+            if stage.get("track"):
+                # The fundamental is tracked with zoom FFTs.
+                fixed = max(fixed, _BLOCK_BYTES)
+            if not filtered:
+                resident += samples * _FILTER_RESIDENT[strategy]
+                filtered = True
+        elif kind in _FIR_STAGES:
+            # Without a given number of taps, the estimated number is at
+            # most the number of samples, see :func:`.filters._apply_fir`.
+            numtaps = min(stage.get("numtaps") or samples, samples)
+            peak = max(peak, resident
+                       + samples * _FILTER_RESIDENT[strategy])
+            fixed = max(fixed, _FIR_CHUNK_BYTES * min(samples, _CHUNK_SIZE),
+                        _FIR_TAP_BYTES * numtaps)
+            if not filtered:
+                resident += samples * _FILTER_RESIDENT[strategy]
+                filtered = True
+        elif kind == "fft":
+            if stage.get("mode", "full") in _BLOCK_MODES:
+                fixed = max(fixed, _BLOCK_BYTES)
+            else:
+                peak = max(peak, resident
+                           + samples * (_FFT_TEMPORARY + _FFT_RESIDENT))
+                resident += samples * _FFT_RESIDENT
+        elif kind in _BLOCK_STAGES:
+            fixed = max(fixed, _BLOCK_BYTES)
+        peak = max(peak, resident)
+    return int(peak + fixed)
+
+
+class PeakMemory:
+    """Class for the peak memory measured by :func:`track_peak`.
+
+    Args:
+        bytes (int): The peak in bytes, set when the with-block is left.
+    """
+    def __init__(self, bytes=None):
+        self.bytes = bytes
+
+    def __repr__(self):
+        """For printing out information about the PeakMemory object."""
+        return f"peak_{self.bytes}_bytes"
+
+
+@contextmanager
+def track_peak():
+    """Context manager that measures the peak memory allocated inside the
+    with-block with tracemalloc. Allocations made before the block are not
+    counted. Tracing slows down the allocation of Python objects, but not
+    the processing of arrays.
+
+    Examples:
+
+        .. code-block:: python
+
+            with track_peak() as peak:
+                input_data.load(path)
+            print(plan.report(peak.bytes))
+
+    If tracing is already active, e.g. by an outer block, its peak can not
+    be reset before Python 3.9, so the peak is counted from the memory
+    traced when the block is entered and includes any earlier higher peak.
+
+    Yields:
+        PeakMemory: The measured peak, available after the block.
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        # Tracing from the start of the block measures the peak from zero.
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    peak = PeakMemory()
+    try:
+        yield peak
+    finally:
+        peak.bytes = tracemalloc.get_traced_memory()[1] - before
+        if started:
+            tracemalloc.stop()
+
+
+def _text_samples(path: str, file_size: int) -> int:
+    """Helper function that estimates the number of rows of a text capture
+    from the average length of the rows at the start of the file."""
+    codec = detect_codec(path)
+    if codec is None:
+        with open(path, "rb") as file:
+            head = file.read(_SAMPLE_BYTES)
+    elif codec == "zip":
+        return int(file_size * _COMPRESSION_RATIO / 20)
+    else:
+        with _open_decompressed(path, codec) as file:
+            head = file.read(_SAMPLE_BYTES)
+        file_size *= _COMPRESSION_RATIO
+
+    # The header rows are skipped, and the last row may be cut.
+    rows = head.splitlines()[3:-1]
+    if not rows:
+        return 0
+    row_bytes = sum(len(row) + 1 for row in rows) / len(rows)
+    return int(file_size / row_bytes)
+
+
+def _sidecar_samples(path: str) -> int:
+    """Helper function that reads the number of samples from the header of
+    the samples in a sidecar file."""
+    sidecar = path if path.endswith(".npz") else path + ".npz"
+    with zipfile.ZipFile(sidecar) as archive:
+        with archive.open("acc.npy") as file:
+            if np.lib.format.read_magic(file) == (1, 0):
+                shape, _, _ = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape, _, _ = np.lib.format.read_array_header_2_0(file)
+    return int(np.prod(shape))
+
+
+def _layout(mapped: bool) -> str:
+    """Helper function that returns the layout of binary samples, "mapped"
+    if they are memory-mapped."""
+    return "mapped" if mapped else "binary"
+
+
+def _matlab_samples(path: str) -> tuple:
+    """Helper function that reads the size and data type of channel A from
+    the header of a .mat file, and if the channel is stored contiguously,
+    so that it can be memory-mapped."""
+    try:
+        variables = scipy.io.whosmat(path)
+    except (NotImplementedError, ValueError):
+        # Version 7.3 files are HDF5 files.
+        import h5py
+        with h5py.File(path, "r") as file:
+            dataset = file["A"]
+            contiguous = (dataset.chunks is None
+                          and dataset.id.get_offset() is not None)
+            return dataset.size, dataset.dtype.itemsize, contiguous
+
+    itemsizes = {"single": 4, "double": 8, "int16": 2, "int8": 1}
+    for name, shape, kind in variables:
+        if name == "A":
+            return int(np.prod(shape)), itemsizes.get(kind, 8), False
+    raise KeyError(f"Channel A not found in {path}")
+
+
+def _available_memory() -> int:
+    """Helper function that returns the available physical memory in bytes,
+    None if it is not known."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _megabytes(size: int) -> str:
+    """Helper function that formats a number of bytes in MB."""
+    return f"{size / 2 ** 20:.1f} MB"
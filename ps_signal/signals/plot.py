@@ -1,8 +1,14 @@
 """Module that contains functions for plotting.
+
+The figures are written atomically, see :func:`.progress.atomic_output`,
+so a plot that fails or is cancelled never leaves a partial file.
 """
 from functools import wraps
+import os
 import matplotlib.pyplot as plt
+import numpy as np
 import seaborn as sns
+from . import progress
 sns.set(color_codes=True)
 
 
@@ -77,6 +83,21 @@ def plot_data(signal, **kwargs):
     pass
 
 
+def _save_figure(filename: str) -> None:
+    """Helper function that saves the current figure atomically and closes
+    it, also if saving fails or is cancelled.
+
+    Args:
+        filename (str): The output filename, with extension.
+    """
+    try:
+        with progress.atomic_output(filename) as temporary:
+            plt.savefig(temporary, format=os.path.splitext(filename)[1][1:])
+        progress.update("plot", 1, 1, "figures")
+    finally:
+        plt.close()
+
+
 @plot_data.register("time_series")
 def _plot_time_series(*, signal, **kwargs):
     """This function is registered as a plotting function
@@ -116,8 +137,7 @@ def _plot_time_series(*, signal, **kwargs):
     fig.suptitle(signal.id)
     plt.plot(signal.data.time, signal.data.acc, figure=fig, axes=ax)
 
-    plt.savefig(f"{signal.output_filename}.png")
-    plt.close()
+    _save_figure(f"{signal.output_filename}.png")
 
 
 @plot_data.register("fft")
@@ -166,5 +186,349 @@ def _plot_fft(*, signal, **kwargs):
     fig.suptitle(signal.id)
     plt.plot(signal._fft.x, signal._fft.y, figure=fig, axes=ax)
 
-    plt.savefig(f"{signal.output_filename}-fft.png")
-    plt.close()
+    _save_figure(f"{signal.output_filename}-fft.png")
+
+
+@plot_data.register("zoom")
+def _plot_zoom_fft(*, signal, **kwargs):
+    """This function is registered as a plotting function
+    for the zoom-"style", i.e. a FFT computed for a band only.
+
+    Same as :func:`_plot_fft`, but the x-axis is limited to the computed
+    band and the y-axis is scaled to the data.
+
+    Args:
+        signal (Signal): The Signal object to be plotted.
+    """
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.figure.Figure.html
+    fig = plt.figure(figsize=(14, 10))
+
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.pyplot.axes.html
+    ax = plt.axes(
+        xlabel="Frequency",
+        ylabel="Amplitude",
+        title=f"Zoom FFT\nApplied filters: {signal.filter_string}",
+        xlim=(signal._fft.x[0], signal._fft.x[-1])
+    )
+    fig.suptitle(signal.id)
+    plt.plot(signal._fft.x, signal._fft.y, figure=fig, axes=ax)
+
+    _save_figure(f"{signal.output_filename}-zoomfft.png")
+
+
+@plot_data.register("goertzel")
+def _plot_goertzel(*, signal, **kwargs):
+    """This function is registered as a plotting function
+    for the goertzel-"style", i.e. the amplitude at a few frequencies.
+    Each frequency is plotted as a bar.
+
+    Args:
+        signal (Signal): The Signal object to be plotted.
+    """
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.figure.Figure.html
+    fig = plt.figure(figsize=(14, 10))
+
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.pyplot.axes.html
+    ax = plt.axes(
+        xlabel="Frequency",
+        ylabel="Amplitude",
+        title=f"Goertzel\nApplied filters: {signal.filter_string}"
+    )
+    fig.suptitle(signal.id)
+    labels = [f"{x:.6g}" for x in signal._fft.x]
+    ax.bar(labels, signal._fft.y)
+
+    _save_figure(f"{signal.output_filename}-goertzel.png")
+
+
+@plot_data.register("envelope")
+def _plot_envelope(*, signal, **kwargs):
+    """This function is registered as a plotting function
+    for the envelope-"style", i.e. the spectrum of the envelope of a band.
+    The band is taken from the arguments of the last FFT of the signal.
+
+    Args:
+        signal (Signal): The Signal object to be plotted.
+    """
+    _, f_start, f_stop, _, _ = signal._fft_key
+
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.figure.Figure.html
+    fig = plt.figure(figsize=(14, 10))
+
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.pyplot.axes.html
+    ax = plt.axes(
+        xlabel="Frequency",
+        ylabel="Amplitude",
+        title=(f"Envelope spectrum of {f_start:.6g}-{f_stop:.6g} Hz\n"
+               f"Applied filters: {signal.filter_string}"),
+        xlim=(0, signal._fft.x[-1])
+    )
+    fig.suptitle(signal.id)
+    ax.plot(signal._fft.x, signal._fft.y)
+
+    _save_figure(f"{signal.output_filename}-envelope.png")
+
+
+@plot_data.register("preview")
+def _plot_preview(*, pyramid, output_filename, start_ms=None, end_ms=None,
+                  width=1000, title="", **kwargs):
+    """This function is registered as a plotting function
+    for the preview-"style". Plots an interval of a capture from its
+    min/max/mean pyramid, i.e. without reading the full data. The range
+    between minimum and maximum is shaded and the mean is drawn as a line.
+
+    Args:
+        pyramid (Pyramid): The pyramid of the capture.
+        output_filename (str): The output filename without extension.
+        start_ms (float, optional): Start of the interval in ms.
+            Defaults to None.
+        end_ms (float, optional): End of the interval in ms.
+            Defaults to None.
+        width (int, optional): Number of points to plot. Defaults to 1000.
+        title (str, optional): Title of the figure. Defaults to "".
+    """
+    time, mins, maxs, means = pyramid.render(start_ms, end_ms, width)
+
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.figure.Figure.html
+    fig = plt.figure(figsize=(14, 10))
+
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.pyplot.axes.html
+    ax = plt.axes(
+        xlabel="Time (ms)",
+        ylabel="Amplitude",
+        title="Preview (min/max)"
+    )
+    fig.suptitle(title)
+    ax.fill_between(time, mins, maxs, alpha=0.5)
+    ax.plot(time, means, linewidth=0.5)
+
+    _save_figure(f"{output_filename}-preview.png")
+
+
+@plot_data.register("aggregate")
+def _plot_aggregate(*, spectrum, output_filename, title="", **kwargs):
+    """This function is registered as a plotting function
+    for the aggregate-"style". Plots the mean, max-hold, min-hold and
+    percentile spectra of an :class:`.aggregate.AggregateFFT` in one figure.
+
+    Args:
+        spectrum (AggregateFFT): The accumulated spectra.
+        output_filename (str): The output filename without extension.
+        title (str, optional): Title of the figure. Defaults to "".
+    """
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.figure.Figure.html
+    fig = plt.figure(figsize=(14, 10))
+
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.pyplot.axes.html
+    ax = plt.axes(
+        xlabel="Frequency",
+        ylabel="Amplitude",
+        title=f"Spectra of {spectrum.count} captures",
+        xlim=(spectrum.x[0], spectrum.x[-1])
+    )
+    fig.suptitle(title)
+    ax.fill_between(spectrum.x, spectrum.min_hold, spectrum.max_hold,
+                    alpha=0.2, label="min/max-hold")
+    for percentile, values in sorted(spectrum.percentiles.items()):
+        ax.plot(spectrum.x, values, linewidth=0.5,
+                label=f"{percentile}th percentile")
+    ax.plot(spectrum.x, spectrum.y, label="mean")
+    ax.legend()
+
+    _save_figure(f"{output_filename}-aggregate.png")
+
+
+@plot_data.register("correlation")
+def _plot_correlation(*, correlation, output_filename, title="", **kwargs):
+    """This function is registered as a plotting function
+    for the correlation-"style". Plots a :class:`.correlation.Correlation`
+    against the lag and marks the delay.
+
+    Args:
+        correlation (Correlation): The cross-correlation.
+        output_filename (str): The output filename without extension.
+        title (str, optional): Title of the figure. Defaults to "".
+    """
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.figure.Figure.html
+    fig = plt.figure(figsize=(14, 10))
+
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.pyplot.axes.html
+    ax = plt.axes(
+        xlabel="Lag (ms)",
+        ylabel="Correlation",
+        title=f"Cross-correlation\nDelay: {correlation.delay_ms:.6g} ms",
+        xlim=(correlation.x[0], correlation.x[-1]),
+        ylim=(-1, 1)
+    )
+    fig.suptitle(title)
+    ax.plot(correlation.x, correlation.y)
+    ax.axvline(correlation.delay_ms, color="r", linewidth=0.5)
+
+    _save_figure(f"{output_filename}-correlation.png")
+
+
+@plot_data.register("coherence")
+def _plot_coherence(*, coherence, output_filename, title="", **kwargs):
+    """This function is registered as a plotting function
+    for the coherence-"style". Plots the magnitude-squared coherence and
+    the magnitude of the cross-spectral density of a
+    :class:`.correlation.Coherence`.
+
+    Args:
+        coherence (Coherence): The coherence.
+        output_filename (str): The output filename without extension.
+        title (str, optional): Title of the figure. Defaults to "".
+    """
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.figure.Figure.html
+    fig, (ax_coherence, ax_csd) = plt.subplots(2, 1, sharex=True,
+                                               figsize=(14, 10))
+    ax_coherence.set(
+        ylabel="Coherence",
+        title="Coherence",
+        xlim=(coherence.x[0], coherence.x[-1]),
+        ylim=(0, 1)
+    )
+    ax_csd.set(
+        xlabel="Frequency",
+        ylabel="Cross-spectral density"
+    )
+    fig.suptitle(title)
+    ax_coherence.plot(coherence.x, coherence.y)
+    ax_csd.semilogy(coherence.x, abs(coherence.csd))
+
+    _save_figure(f"{output_filename}-coherence.png")
+
+
+@plot_data.register("segments")
+def _plot_segments(*, segments, output_filename, title="", max_lines=50,
+                   **kwargs):
+    """This function is registered as a plotting function
+    for the segments-"style". Plots the segments of a
+    :class:`.segments.SegmentedData` on top of each other with their
+    synchronous average, and the mean spectrum of the segments with the
+    range between the lowest and the highest spectrum shaded.
+
+    Args:
+        segments (SegmentedData): The segmented capture.
+        output_filename (str): The output filename without extension.
+        title (str, optional): Title of the figure. Defaults to "".
+        max_lines (int, optional): Largest number of segments to draw.
+            Defaults to 50.
+    """
+    time = segments.time
+    spectra = segments.fft()
+
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.figure.Figure.html
+    fig, (ax_time, ax_fft) = plt.subplots(2, 1, figsize=(14, 10))
+    ax_time.set(
+        xlabel="Time (ms)",
+        ylabel="Amplitude",
+        title=f"{segments.segments} segments and their average",
+        xlim=(time[0], time[-1])
+    )
+    ax_fft.set(
+        xlabel="Frequency",
+        ylabel="Amplitude",
+        title="Mean spectrum (min/max)",
+        xlim=(spectra.x[0], spectra.x[-1])
+    )
+    fig.suptitle(title)
+
+    step = max(1, -(-segments.segments // max_lines))
+    for values in segments.values[::step]:
+        ax_time.plot(time, values, color="0.7", linewidth=0.3)
+    ax_time.plot(time, segments.values.mean(axis=0), linewidth=0.8)
+
+    ax_fft.fill_between(spectra.x, spectra.y.min(axis=0),
+                        spectra.y.max(axis=0), alpha=0.3)
+    ax_fft.plot(spectra.x, spectra.y.mean(axis=0))
+
+    _save_figure(f"{output_filename}-segments.png")
+
+
+@plot_data.register("octave")
+def _plot_octave(*, bands, output_filename, title="", **kwargs):
+    """This function is registered as a plotting function
+    for the octave-"style". Plots the overall levels of the bands of an
+    :class:`.octave.OctaveBands` as bars, and their levels over time as a
+    color map.
+
+    Args:
+        bands (OctaveBands): The levels of the bands.
+        output_filename (str): The output filename without extension.
+        title (str, optional): Title of the figure. Defaults to "".
+    """
+    positions = range(len(bands.centers_hz))
+    step = max(1, -(-len(bands.centers_hz) // 16))
+
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.figure.Figure.html
+    fig, (ax_overall, ax_time) = plt.subplots(2, 1, figsize=(14, 10))
+    ax_overall.set(
+        xlabel="Band (Hz)",
+        ylabel="Level (dB)",
+        title=f"1/{bands.fraction} octave bands"
+    )
+    ax_time.set(
+        xlabel="Time (ms)",
+        ylabel="Band (Hz)",
+        title="Levels over time (dB)"
+    )
+    fig.suptitle(title)
+
+    ax_overall.bar(positions, bands.overall_db)
+    ax_overall.set_xticks(positions[::step])
+    ax_overall.set_xticklabels(bands.labels[::step])
+
+    # Frames are drawn from their start to the start of the next frame,
+    # and the colors cover 80 dB below the highest level.
+    frame_ms = bands.time[1] - bands.time[0] if len(bands.time) > 1 else 1
+    edges = list(bands.time) + [bands.time[-1] + frame_ms]
+    levels = bands.levels_db
+    finite = levels[np.isfinite(levels)]
+    highest = finite.max() if len(finite) else 0
+    mesh = ax_time.pcolormesh(edges, range(len(bands.centers_hz) + 1),
+                              levels, shading="flat", vmin=highest - 80,
+                              vmax=highest)
+    ax_time.set_yticks([position + 0.5 for position in positions[::step]])
+    ax_time.set_yticklabels(bands.labels[::step])
+    fig.colorbar(mesh, ax=ax_time)
+
+    _save_figure(f"{output_filename}-octave.png")
+
+
+@plot_data.register("trend")
+def _plot_trend(*, trend, output_filename, title="", **kwargs):
+    """This function is registered as a plotting function
+    for the trend-"style". Plots the RMS and peak, the peak-to-peak value,
+    the crest factor and the kurtosis of the windows of a
+    :class:`.trend.Trend` against time.
+
+    Args:
+        trend (Trend): The statistics of the windows.
+        output_filename (str): The output filename without extension.
+        title (str, optional): Title of the figure. Defaults to "".
+    """
+    # https://matplotlib.org/3.1.1/api/_as_gen/matplotlib.figure.Figure.html
+    fig, axes = plt.subplots(4, 1, sharex=True, figsize=(14, 10))
+    ax_rms, ax_ptp, ax_crest, ax_kurtosis = axes
+    window_ms = trend.window / trend.frequency_hz * 1000
+    ax_rms.set(
+        ylabel="Amplitude",
+        title=f"Trend of windows of {window_ms:.6g} ms",
+        xlim=(trend.time[0], trend.time[-1]) if len(trend) > 1 else None
+    )
+    ax_ptp.set(ylabel="Peak-to-peak")
+    ax_crest.set(ylabel="Crest factor")
+    ax_kurtosis.set(xlabel="Time (ms)", ylabel="Kurtosis")
+    fig.suptitle(title)
+
+    ax_rms.plot(trend.time, trend.peak, linewidth=0.5, label="peak")
+    ax_rms.plot(trend.time, trend.rms, label="RMS")
+    ax_rms.legend()
+    ax_ptp.plot(trend.time, trend.peak_to_peak)
+    ax_crest.plot(trend.time, trend.crest_factor)
+    ax_kurtosis.plot(trend.time, trend.kurtosis)
+    # Kurtosis of normally distributed samples.
+    ax_kurtosis.axhline(3, color="r", linewidth=0.5)
+
+    _save_figure(f"{output_filename}-trend.png")
@@ -0,0 +1,350 @@
+"""Module that contains progress reporting and cooperative cancellation of
+long-running stages. Progress is tracked within a with-block:
+
+.. code-block:: python
+
+    token = progress.CancellationToken()
+    with progress.tracking(progress.ProgressPrinter(), token):
+        input_data.load(path)
+        ...
+
+Inside the block, the loaders, filters, spectral stages and plots report
+their progress chunk by chunk as a :class:`ProgressEvent` to the callback.
+At every chunk they also check the token, and raise :class:`Cancelled` once
+it has been cancelled, e.g. from another thread. Outputs are written with
+:func:`atomic_output`, so a cancelled run never leaves a partial file.
+
+The tracking belongs to the thread that entered the block. Functions that
+run in a thread pool are wrapped with :func:`bind` to be tracked as well.
+Outside of a block, nothing is reported and nothing can be cancelled.
+"""
+import io
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+__all__ = ["Cancelled", "CancellationToken", "ProgressEvent",
+           "ProgressPrinter", "tracking", "bind", "active", "update",
+           "check", "atomic_output", "reader"]
+
+
+# Seconds between two lines printed by ProgressPrinter for the same stage.
+_PRINT_INTERVAL_S = 1.0
+
+_local = threading.local()
+
+
+class Cancelled(BaseException):
+    """Exception raised by a stage when its :class:`CancellationToken` has
+    been cancelled. It derives from BaseException, like KeyboardInterrupt,
+    so that it is not caught by the handlers for errors in a stage."""
+
+
+class CancellationToken:
+    """Class for a token that stops the stages that check it, see the
+    module description. The token can be cancelled from any thread.
+    """
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._reason = None
+
+    def __repr__(self):
+        """For printing out information about the CancellationToken
+        object."""
+        return "token_cancelled" if self.cancelled else "token"
+
+    @property
+    def cancelled(self) -> bool:
+        """True if the token has been cancelled."""
+        return self._event.is_set()
+
+    @property
+    def reason(self) -> str:
+        """Why the token was cancelled, None if it has not been."""
+        return self._reason
+
+    def cancel(self, reason: str = "Cancelled") -> None:
+        """Method that cancels the token. The stages that check it stop at
+        their next chunk.
+
+        Args:
+            reason (str, optional): Why the token was cancelled.
+                Defaults to "Cancelled".
+        """
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    def check(self) -> None:
+        """Method that raises :class:`Cancelled` if the token has been
+        cancelled."""
+        if self._event.is_set():
+            raise Cancelled(self._reason)
+
+
+class ProgressEvent(namedtuple("ProgressEvent", ["label", "stage", "done",
+                                                 "total", "unit",
+                                                 "elapsed_s"])):
+    """Immutable record of the progress of a stage.
+
+    Args:
+        label (str): The label of the tracking, e.g. the file.
+        stage (str): The stage, e.g. "load" or "filter".
+        done (float): The amount of work done, in units.
+        total (float): The total amount of work, in units.
+        unit (str): The unit of done and total, e.g. "samples" or "bytes".
+        elapsed_s (float): Seconds since the stage started.
+    """
+    __slots__ = ()
+
+    @property
+    def fraction(self) -> float:
+        """The share of the work that is done, between 0 and 1."""
+        return min(self.done / self.total, 1.0) if self.total else 1.0
+
+    @property
+    def rate(self) -> float:
+        """The throughput in units per second."""
+        return self.done / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    @property
+    def eta_s(self) -> float:
+        """The estimated number of seconds left, None if it is not known
+        yet."""
+        if not self.rate:
+            return None
+        return max(self.total - self.done, 0) / self.rate
+
+
+class ProgressPrinter:
+    """A callable class that prints progress events as lines with the
+    share done, the throughput and the estimated time left. A stage is
+    printed at most once per interval and always when it is done.
+
+    Args:
+        stream (file-like, optional): Where to print. Defaults to None,
+            i.e. sys.stderr.
+        interval_s (float, optional): Seconds between the lines of a stage.
+            Defaults to 1.
+    """
+    def __init__(self, stream=None, interval_s: float = _PRINT_INTERVAL_S):
+        self._stream = stream
+        self._interval_s = interval_s
+        self._printed = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: ProgressEvent) -> None:
+        """Prints an event, unless the stage was printed recently."""
+        key = (event.label, event.stage)
+        now = time.monotonic()
+        finished = event.done >= event.total
+        with self._lock:
+            if (not finished
+                    and now - self._printed.get(key, -self._interval_s)
+                    < self._interval_s):
+                return
+            self._printed[key] = now
+
+        text = f"{event.stage} {100 * event.fraction:5.1f} %"
+        if event.rate:
+            text += f", {_format_rate(event.rate, event.unit)}"
+        if finished:
+            text += f", done in {event.elapsed_s:.1f} s"
+        elif event.eta_s is not None:
+            text += f", {event.eta_s:.0f} s left"
+        if event.label:
+            text = f"{event.label}: {text}"
+        print(text, file=self._stream or sys.stderr, flush=True)
+
+
+@contextmanager
+def tracking(callback=None, token: CancellationToken = None,
+             label: str = None):
+    """Context manager that tracks the progress of the stages run in the
+    with-block by the current thread, see the module description. The
+    callback, token and label that are not given are taken from an
+    enclosing block. Without an enclosing block, a callback or a token,
+    nothing is tracked, so a label can be set in code that may or may not
+    be tracked.
+
+    Args:
+        callback (function, optional): Called with every
+            :class:`ProgressEvent`. Defaults to None.
+        token (CancellationToken, optional): The token checked by the
+            stages. Defaults to None.
+        label (str, optional): The label of the events, e.g. the file.
+            Defaults to None.
+
+    Yields:
+        CancellationToken: The token, made here if there was none. None if
+        nothing is tracked.
+    """
+    parent = getattr(_local, "tracker", None)
+    if parent is None and callback is None and token is None:
+        yield None
+        return
+    if parent is not None:
+        callback = callback or parent.callback
+        token = token or parent.token
+        label = parent.label if label is None else label
+    tracker = _Tracker(callback, token or CancellationToken(), label or "")
+    _local.tracker = tracker
+    try:
+        yield tracker.token
+    finally:
+        _local.tracker = parent
+
+
+def bind(function):
+    """Function that wraps a function to be run in another thread, e.g.
+    by a thread pool, so that it is tracked as the calling thread is.
+
+    Args:
+        function (function): The function to wrap.
+
+    Returns:
+        function: The wrapped function, or the function as is if no
+        progress is tracked.
+    """
+    tracker = getattr(_local, "tracker", None)
+    if tracker is None:
+        return function
+
+    def bound(*args, **kwargs):
+        with tracking(tracker.callback, tracker.token, tracker.label):
+            return function(*args, **kwargs)
+    return bound
+
+
+def active() -> bool:
+    """Function that tells if progress is tracked in the current thread.
+
+    Returns:
+        bool: True within a :func:`tracking` block.
+    """
+    return getattr(_local, "tracker", None) is not None
+
+
+def update(stage: str, done: float, total: float,
+           unit: str = "samples") -> None:
+    """Function that reports the progress of a stage and checks for
+    cancellation. Called by the stages at every chunk. Does nothing
+    outside of a :func:`tracking` block.
+
+    Args:
+        stage (str): The stage, e.g. "filter".
+        done (float): The amount of work done.
+        total (float): The total amount of work.
+        unit (str, optional): The unit of done and total.
+            Defaults to "samples".
+    """
+    tracker = getattr(_local, "tracker", None)
+    if tracker is not None:
+        tracker.update(stage, done, total, unit)
+
+
+def check() -> None:
+    """Function that raises :class:`Cancelled` if the token of the current
+    :func:`tracking` block has been cancelled."""
+    tracker = getattr(_local, "tracker", None)
+    if tracker is not None:
+        tracker.token.check()
+
+
+@contextmanager
+def atomic_output(path: str):
+    """Context manager for writing a file atomically. The with-block writes
+    to the yielded temporary path, which is renamed to the path when the
+    block ends. If the block fails or is cancelled, the temporary file is
+    removed and the path is left as it was.
+
+    Args:
+        path (str): The path of the file.
+
+    Yields:
+        str: The temporary path to write to.
+    """
+    check()
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield temporary
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def reader(stream, total: int, stage: str = "load") -> io.BufferedReader:
+    """Function that wraps a binary stream so that reading it reports the
+    progress in bytes and checks for cancellation. Outside of a
+    :func:`tracking` block, the stream is returned as is.
+
+    Args:
+        stream (file-like): The binary stream.
+        total (int): The number of bytes that will be read.
+        stage (str, optional): The stage of the events.
+            Defaults to "load".
+
+    Returns:
+        io.BufferedReader: The wrapped stream.
+    """
+    if not active():
+        return stream
+    return io.BufferedReader(_ProgressReader(stream, total, stage))
+
+
+class _Tracker:
+    """Helper class with the state of a :func:`tracking` block."""
+    def __init__(self, callback, token: CancellationToken,
+                 label: str) -> None:
+        self.callback = callback
+        self.token = token
+        self.label = label
+        self._started = {}
+
+    def update(self, stage: str, done: float, total: float,
+               unit: str) -> None:
+        self.token.check()
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        # A stage that starts over, e.g. the next filter, is timed anew.
+        started, last_done = self._started.get(stage, (now, 0))
+        if done < last_done:
+            started = now
+        self._started[stage] = (started, done)
+        self.callback(ProgressEvent(self.label, stage, done, total, unit,
+                                    now - started))
+
+
+class _ProgressReader(io.RawIOBase):
+    """Helper class that counts the bytes read from a binary stream, see
+    :func:`reader`."""
+    def __init__(self, stream, total: int, stage: str) -> None:
+        self._stream = stream
+        self._total = total
+        self._stage = stage
+        self._done = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self._stream.readinto(buffer)
+        if count:
+            self._done += count
+            update(self._stage, self._done, self._total, "bytes")
+        return count
+
+
+def _format_rate(rate: float, unit: str) -> str:
+    """Helper function that formats a throughput with an SI prefix."""
+    for prefix, scale in (("G", 1e9), ("M", 1e6), ("k", 1e3)):
+        if rate >= scale:
+            return f"{rate / scale:.3g} {prefix}{unit}/s"
+    return f"{rate:.3g} {unit}/s"
@@ -0,0 +1,288 @@
+"""Module that contains a multi-resolution min/max/mean pyramid of a
+capture. The pyramid is built once in a single pass over the samples and
+can then answer "render the interval [a, b] at width W" by reading at most
+about W values from the best fitting level, i.e. in a time that does not
+depend on the length of the capture.
+
+Level 0 holds the minimum, maximum and mean of every block of base_block
+samples, and every following level combines factor blocks of the level
+below, until a level has fewer blocks than factor.
+
+A pyramid saved next to a capture holds the size and modification time of
+the capture, and is not loaded once the capture has changed.
+"""
+import os
+import numpy as np
+
+
+__all__ = ["Pyramid", "build_pyramid", "save_pyramid", "load_pyramid",
+           "pyramid_path"]
+
+
+_PYRAMID_SUFFIX = ".pyramid.npz"
+
+# Number of samples read at a time while building level 0.
+_CHUNK_SIZE = 2 ** 20
+
+
+class Pyramid:
+    """Class for storing the levels of a min/max/mean pyramid.
+
+    Args:
+        mins (list): The minimum of every block, one array per level.
+        maxs (list): The maximum of every block, one array per level.
+        means (list): The mean of every block, one array per level.
+        base_block (int): Number of samples per block in level 0.
+        factor (int): Number of blocks combined into one on the next level.
+        frequency_hz (float): The sampling frequency of the samples.
+        size (int): The number of samples.
+        start_ms (float, optional): Time of the first sample in ms.
+            Defaults to 0.
+    """
+    def __init__(self, mins, maxs, means, base_block, factor, frequency_hz,
+                 size, start_ms=0.0):
+        self._mins = mins
+        self._maxs = maxs
+        self._means = means
+        self._base_block = base_block
+        self._factor = factor
+        self._frequency_hz = frequency_hz
+        self._size = size
+        self._start_ms = start_ms
+        self._values = None
+
+    def __repr__(self):
+        """For printing out information about the Pyramid object."""
+        return f"pyramid_{len(self._mins)}_levels_{self._size}_samples"
+
+    @property
+    def levels(self) -> int:
+        """The number of levels in the pyramid."""
+        return len(self._mins)
+
+    @property
+    def frequency_hz(self):
+        """The sampling frequency of the samples."""
+        return self._frequency_hz
+
+    @property
+    def size(self) -> int:
+        """The number of samples."""
+        return self._size
+
+    def attach(self, values: np.ndarray) -> None:
+        """Method that attaches the samples the pyramid was built from. With
+        the samples attached, intervals with fewer samples than the width
+        are rendered from the samples themselves.
+
+        Args:
+            values (np.ndarray): The samples.
+        """
+        self._values = values
+
+    def render(self, start_ms: float = None, end_ms: float = None,
+               width: int = 1000) -> tuple:
+        """Method that returns at most about width points covering an
+        interval, taken from the finest level that is coarse enough.
+
+        Args:
+            start_ms (float, optional): Start of the interval in ms. If None,
+                the interval starts at the first sample. Defaults to None.
+            end_ms (float, optional): End of the interval in ms. If None,
+                the interval ends at the last sample. Defaults to None.
+            width (int, optional): The wanted number of points, e.g. the
+                width of the plot in pixels. Defaults to 1000.
+
+        Returns:
+            tuple: Arrays with the time in ms, the minimum, the maximum and
+            the mean of each point.
+        """
+        samples_per_ms = self._frequency_hz / 1000
+        first = 0 if start_ms is None else round(
+            (start_ms - self._start_ms) * samples_per_ms
+        )
+        last = self._size if end_ms is None else round(
+            (end_ms - self._start_ms) * samples_per_ms
+        )
+        first = min(max(first, 0), self._size)
+        last = min(max(last, first), self._size)
+
+        if self._values is not None and last - first <= width:
+            values = np.asarray(self._values[first: last])
+            time = self._start_ms + np.arange(first, last) / samples_per_ms
+            return time, values, values, values
+
+        block = self._base_block
+        level = 0
+        while (level + 1 < self.levels
+               and (last - first) / block > width):
+            block *= self._factor
+            level += 1
+
+        lower = first // block
+        upper = -(-last // block)
+        time = (self._start_ms
+                + (np.arange(lower, upper) + 0.5) * block / samples_per_ms)
+        return (time,
+                self._mins[level][lower: upper],
+                self._maxs[level][lower: upper],
+                self._means[level][lower: upper])
+
+
+def build_pyramid(values: np.ndarray, frequency_hz: float,
+                  start_ms: float = 0.0, base_block: int = 16,
+                  factor: int = 4) -> Pyramid:
+    """Function that builds a pyramid in a single pass over the samples.
+    Level 0 is computed chunk by chunk, so memory-mapped samples are read
+    once and never held in memory as a whole. The following levels are
+    computed from level 0.
+
+    Args:
+        values (np.ndarray): The samples.
+        frequency_hz (float): The sampling frequency of the samples.
+        start_ms (float, optional): Time of the first sample in ms.
+            Defaults to 0.
+        base_block (int, optional): Number of samples per block in
+            level 0. Defaults to 16.
+        factor (int, optional): Number of blocks combined into one on the
+            next level. Defaults to 4.
+
+    Returns:
+        Pyramid: The built pyramid.
+    """
+    size = len(values)
+    blocks = -(-size // base_block)
+    mins = np.empty(blocks)
+    maxs = np.empty(blocks)
+    sums = np.empty(blocks)
+
+    chunk_size = _CHUNK_SIZE - _CHUNK_SIZE % base_block
+    for start in range(0, size, chunk_size):
+        chunk = np.asarray(values[start: start + chunk_size],
+                           dtype=np.float64)
+        first = start // base_block
+        _reduce_blocks(chunk, base_block, first, mins, maxs, sums)
+
+    counts = np.full(blocks, base_block, dtype=np.int64)
+    if blocks:
+        counts[-1] = size - (blocks - 1) * base_block
+
+    level_mins, level_maxs, level_means = [mins], [maxs], [sums / counts]
+    while len(mins) > factor:
+        mins = _combine(mins, factor, np.minimum)
+        maxs = _combine(maxs, factor, np.maximum)
+        sums = _combine(sums, factor, np.add)
+        counts = _combine(counts, factor, np.add)
+        level_mins.append(mins)
+        level_maxs.append(maxs)
+        level_means.append(sums / counts)
+
+    pyramid = Pyramid(level_mins, level_maxs, level_means, base_block,
+                      factor, frequency_hz, size, start_ms)
+    pyramid.attach(values)
+    return pyramid
+
+
+def _reduce_blocks(chunk: np.ndarray, block: int, first: int,
+                   mins: np.ndarray, maxs: np.ndarray,
+                   sums: np.ndarray) -> None:
+    """Helper function that computes the minimum, maximum and sum of every
+    block in a chunk, writing them from position first in the outputs.
+    Only the last chunk can end with a partial block."""
+    full = len(chunk) // block
+    if full:
+        shaped = chunk[: full * block].reshape(full, block)
+        mins[first: first + full] = shaped.min(axis=1)
+        maxs[first: first + full] = shaped.max(axis=1)
+        sums[first: first + full] = shaped.sum(axis=1)
+    rest = chunk[full * block:]
+    if len(rest):
+        mins[first + full] = rest.min()
+        maxs[first + full] = rest.max()
+        sums[first + full] = rest.sum()
+
+
+def _combine(values: np.ndarray, factor: int, ufunc) -> np.ndarray:
+    """Helper function that combines every factor consecutive values with
+    a ufunc. The last group can be partial."""
+    return ufunc.reduceat(values, np.arange(0, len(values), factor))
+
+
+def pyramid_path(filename: str) -> str:
+    """Function that returns the path of the pyramid that belongs
+    to a capture.
+
+    Args:
+        filename (str): The path to the capture.
+
+    Returns:
+        str: The path to the pyramid.
+    """
+    return filename + _PYRAMID_SUFFIX
+
+
+def save_pyramid(pyramid: Pyramid, filename: str) -> None:
+    """Function that saves a pyramid next to a capture, with the size and
+    modification time of the capture.
+
+    Args:
+        pyramid (Pyramid): The pyramid to save.
+        filename (str): The path to the capture.
+    """
+    levels = dict()
+    for level in range(pyramid.levels):
+        levels[f"min_{level}"] = pyramid._mins[level]
+        levels[f"max_{level}"] = pyramid._maxs[level]
+        levels[f"mean_{level}"] = pyramid._means[level]
+    status = os.stat(filename)
+    np.savez(
+        pyramid_path(filename),
+        levels=pyramid.levels,
+        base_block=pyramid._base_block,
+        factor=pyramid._factor,
+        frequency_hz=pyramid.frequency_hz,
+        size=pyramid.size,
+        start_ms=pyramid._start_ms,
+        file_size=status.st_size,
+        mtime_ns=status.st_mtime_ns,
+        **levels
+    )
+
+
+def load_pyramid(filename: str) -> Pyramid:
+    """Function that loads the pyramid saved next to a capture.
+
+    Args:
+        filename (str): The path to the capture.
+
+    Returns:
+        Pyramid: The saved pyramid, None if there is no saved pyramid or
+        if the capture has changed since the pyramid was saved.
+    """
+    try:
+        with np.load(pyramid_path(filename)) as content:
+            if not _is_current(content, filename):
+                return None
+            levels = range(int(content["levels"]))
+            return Pyramid(
+                [content[f"min_{level}"] for level in levels],
+                [content[f"max_{level}"] for level in levels],
+                [content[f"mean_{level}"] for level in levels],
+                int(content["base_block"]),
+                int(content["factor"]),
+                float(content["frequency_hz"]),
+                int(content["size"]),
+                float(content["start_ms"])
+            )
+    except FileNotFoundError:
+        return None
+
+
+def _is_current(content, filename: str) -> bool:
+    """Helper function that checks that a saved pyramid was made from the
+    capture as it is now, by its size and modification time."""
+    if "mtime_ns" not in content:
+        return False
+    status = os.stat(filename)
+    return (int(content["file_size"]) == status.st_size
+            and int(content["mtime_ns"]) == status.st_mtime_ns)
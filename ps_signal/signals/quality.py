@@ -0,0 +1,309 @@
+"""Module that contains a data-quality scanner for captures. The scanner
+finds:
+
+* Non-finite samples - NaN or inf, e.g. from export glitches.
+* Clipping - Runs of identical samples at the minimum or maximum of the
+  capture, i.e. a saturated ADC.
+* Flat segments - Long runs of identical samples elsewhere, e.g. a
+  disconnected sensor.
+* Time gaps - Steps between time stamps that are much longer than the
+  sample interval, or that go backwards.
+
+The samples are scanned in a single pass, chunk by chunk, so memory-mapped
+captures are read once and never held in memory as a whole. Runs that
+cross a chunk border are carried over to the next chunk.
+"""
+import numpy as np
+from . import progress
+
+
+__all__ = ["QualityReport", "scan_quality"]
+
+
+# Number of samples scanned at a time.
+_CHUNK_SIZE = 2 ** 20
+
+
+class QualityReport:
+    """Class for the result of a quality scan. Every kind of problem is
+    stored as an array of runs with one row per run, holding the position
+    of the first sample and the number of samples.
+
+    Args:
+        size (int): The number of scanned samples.
+        non_finite (np.ndarray): Runs of NaN or inf samples.
+        clipping (np.ndarray): Runs of clipped samples.
+        flat (np.ndarray): Flat segments.
+        gaps (np.ndarray): Time gaps, with the position of the sample after
+            the gap and the length of the gap in ms.
+    """
+    def __init__(self, size, non_finite, clipping, flat, gaps):
+        self._size = size
+        self._non_finite = non_finite
+        self._clipping = clipping
+        self._flat = flat
+        self._gaps = gaps
+
+    def __repr__(self):
+        """For printing out information about the QualityReport object."""
+        if self.ok:
+            return f"quality_ok_{self._size}_samples"
+        return (f"quality_{self._size}_samples"
+                f"_{len(self._non_finite)}_non_finite"
+                f"_{len(self._clipping)}_clipping"
+                f"_{len(self._flat)}_flat"
+                f"_{len(self._gaps)}_gaps")
+
+    @property
+    def size(self) -> int:
+        """The number of scanned samples."""
+        return self._size
+
+    @property
+    def non_finite(self) -> np.ndarray:
+        """Runs of NaN or inf samples, as rows of position and length."""
+        return self._non_finite
+
+    @property
+    def clipping(self) -> np.ndarray:
+        """Runs of clipped samples, as rows of position and length."""
+        return self._clipping
+
+    @property
+    def flat(self) -> np.ndarray:
+        """Flat segments, as rows of position and length."""
+        return self._flat
+
+    @property
+    def gaps(self) -> np.ndarray:
+        """Time gaps, as rows of the position of the sample after the gap
+        and the length of the gap in ms."""
+        return self._gaps
+
+    @property
+    def ok(self) -> bool:
+        """True if no problems were found."""
+        return not (len(self._non_finite) or len(self._clipping)
+                    or len(self._flat) or len(self._gaps))
+
+    def bad_fraction(self) -> float:
+        """Method that returns the fraction of the samples that are
+        non-finite, clipped or flat.
+
+        Returns:
+            float: The fraction, between 0 and 1.
+        """
+        bad = sum(int(runs[:, 1].sum())
+                  for runs in (self._non_finite, self._clipping, self._flat))
+        return bad / self._size if self._size else 0.0
+
+    def clean_interval(self) -> tuple:
+        """Method that finds the longest interval without any problems.
+        The interval ends before a time gap.
+
+        Returns:
+            tuple: The position of the first sample and the position after
+            the last sample of the interval.
+        """
+        bad = [np.column_stack((runs[:, 0], runs[:, 0] + runs[:, 1]))
+               for runs in (self._non_finite, self._clipping, self._flat)]
+        positions = self._gaps[:, 0].astype(np.int64)
+        bad.append(np.column_stack((positions, positions)))
+        bad = np.concatenate(bad)
+        bad = bad[np.argsort(bad[:, 0], kind="stable")]
+
+        # A clean interval starts where all earlier problems have ended
+        # and ends where the next problem starts.
+        clean_starts = np.maximum.accumulate(np.append(0, bad[:, 1]))
+        clean_ends = np.append(bad[:, 0], self._size)
+        lengths = clean_ends - clean_starts
+        best = int(np.argmax(lengths))
+        if lengths[best] <= 0:
+            return 0, 0
+        return int(clean_starts[best]), int(clean_ends[best])
+
+    def summary(self) -> str:
+        """Method that describes the problems in a line of text.
+
+        Returns:
+            str: The description.
+        """
+        if self.ok:
+            return "OK"
+        parts = []
+        for name, runs in (("non-finite", self._non_finite),
+                           ("clipped", self._clipping),
+                           ("flat", self._flat)):
+            if len(runs):
+                parts.append(f"{int(runs[:, 1].sum())} {name} samples in "
+                             f"{len(runs)} runs")
+        if len(self._gaps):
+            parts.append(f"{len(self._gaps)} time gaps, longest "
+                         f"{self._gaps[:, 1].max():.6g} ms")
+        return ", ".join(parts)
+
+    def to_dict(self) -> dict:
+        """Method that converts the report to lists, e.g. to save it as
+        JSON.
+
+        Returns:
+            dict: The size and the runs of every kind of problem.
+        """
+        return {
+            "size": self._size,
+            "non_finite": self._non_finite.tolist(),
+            "clipping": self._clipping.tolist(),
+            "flat": self._flat.tolist(),
+            "gaps": self._gaps.tolist(),
+        }
+
+
+def scan_quality(values: np.ndarray, frequency_hz: float,
+                 time: np.ndarray = None, clip_run: int = 3,
+                 flat_ms: float = 10.0, gap_factor: float = 1.5,
+                 chunk_size: int = _CHUNK_SIZE) -> QualityReport:
+    """Function that scans samples for problems in a single pass, see the
+    module description.
+
+    Args:
+        values (np.ndarray): The samples.
+        frequency_hz (float): The sampling frequency.
+        time (np.ndarray, optional): The time stamps in ms. If None, the
+            time gaps are not checked. Defaults to None.
+        clip_run (int, optional): Shortest run of identical samples at the
+            minimum or maximum that counts as clipping. Defaults to 3.
+        flat_ms (float, optional): Shortest run of identical samples, in ms,
+            that counts as a flat segment. Defaults to 10.
+        gap_factor (float, optional): A step between time stamps longer
+            than this times the sample interval counts as a gap.
+            Defaults to 1.5.
+        chunk_size (int, optional): Number of samples scanned at a time.
+            Defaults to 1048576.
+
+    Returns:
+        QualityReport: The found problems.
+    """
+    size = len(values)
+    flat_run = max(round(flat_ms / 1000 * frequency_hz), clip_run, 2)
+    period_ms = 1000 / frequency_hz
+
+    runs = _RunTracker(2)
+    non_finite = _RunTracker(1)
+    low, high = np.inf, -np.inf
+    clipping = []
+    flat = []
+    non_finite_runs = []
+    gaps = []
+    last_time = None
+
+    def classify(ended):
+        # Runs at the extremes so far are kept as clipping candidates.
+        for position, length, value in ended:
+            if length >= clip_run and (value == low or value == high):
+                clipping.append((position, length, value))
+            elif length >= flat_run:
+                flat.append((position, length))
+
+    for start in range(0, size, chunk_size):
+        chunk = np.asarray(values[start: start + chunk_size],
+                           dtype=np.float64)
+        finite = np.isfinite(chunk)
+        non_finite_runs.extend(
+            (position, length) for position, length, value
+            in non_finite.add(~finite, start) if value
+        )
+
+        if finite.any():
+            low = min(low, chunk[finite].min())
+            high = max(high, chunk[finite].max())
+
+        # Non-finite samples never equal each other, so they end runs.
+        classify(runs.add(chunk, start))
+        classify([run for run in clipping if run[2] not in (low, high)])
+        clipping = [run for run in clipping if run[2] in (low, high)]
+
+        if time is not None:
+            stamps = np.asarray(time[start: start + chunk_size],
+                                dtype=np.float64)
+            if last_time is not None:
+                stamps = np.concatenate(([last_time], stamps))
+                first = start
+            else:
+                first = start + 1
+            steps = np.diff(stamps)
+            bad = np.flatnonzero((steps > gap_factor * period_ms)
+                                 | (steps <= 0))
+            gaps.extend(zip(bad + first, steps[bad]))
+            last_time = stamps[-1]
+        progress.update("quality", min(start + chunk_size, size), size)
+
+    classify(runs.finish())
+    non_finite_runs.extend(
+        (position, length) for position, length, value
+        in non_finite.finish() if value
+    )
+
+    return QualityReport(
+        size,
+        _as_runs(non_finite_runs),
+        _as_runs([(p, n) for p, n, v in clipping if v in (low, high)]),
+        _as_runs(flat),
+        np.array(gaps, dtype=np.float64).reshape(-1, 2)
+    )
+
+
+class _RunTracker:
+    """Helper class that finds runs of identical values chunk by chunk.
+    The last run of a chunk is kept open, as it may continue in the
+    next chunk.
+
+    Args:
+        min_length (int): Shortest run that is returned.
+    """
+    def __init__(self, min_length: int) -> None:
+        self._min_length = min_length
+        self._start = None
+        self._length = 0
+        self._value = None
+
+    def add(self, chunk: np.ndarray, offset: int) -> list:
+        """Method that adds a chunk of values, starting at position offset,
+        and returns the runs that ended in it as tuples of position, length
+        and value."""
+        if not len(chunk):
+            return []
+        starts = np.concatenate(
+            ([0], np.flatnonzero(chunk[1:] != chunk[:-1]) + 1)
+        )
+        lengths = np.diff(np.append(starts, len(chunk)))
+        positions = starts + offset
+
+        ended = []
+        if self._start is not None:
+            if chunk[0] == self._value:
+                positions[0] = self._start
+                lengths[0] += self._length
+            elif self._length >= self._min_length:
+                ended.append((self._start, self._length, self._value))
+
+        keep = np.flatnonzero(lengths[:-1] >= self._min_length)
+        ended.extend(zip(positions[keep].tolist(), lengths[keep].tolist(),
+                         chunk[starts[keep]].tolist()))
+
+        self._start = int(positions[-1])
+        self._length = int(lengths[-1])
+        self._value = chunk[-1]
+        return ended
+
+    def finish(self) -> list:
+        """Method that closes the last run and returns it, if it is long
+        enough."""
+        if self._start is None or self._length < self._min_length:
+            return []
+        return [(self._start, self._length, self._value)]
+
+
+def _as_runs(runs: list) -> np.ndarray:
+    """Helper function that converts runs to an array with one row per
+    run, sorted by position."""
+    return np.array(sorted(runs), dtype=np.int64).reshape(-1, 2)
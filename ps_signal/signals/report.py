@@ -0,0 +1,378 @@
+"""Module that contains a lightweight report output, as an alternative to
+the PNG files written by :mod:`.plot`. Every signal is written as a small
+data file, and a single static HTML page draws all of them in the browser.
+No figures are rendered when the report is written, so a report of
+hundreds of signals is written in seconds, and it is much smaller than the
+PNG files.
+
+A report is a directory with:
+
+* index.html - The page, which lists and draws the signals. It can be
+  opened directly from disk, no web server is needed.
+* data/<output filename>.js - One file per signal, holding the signal as
+  JSON wrapped in a call to ``psReport.add(...)``, so that the page can
+  load it from disk with a script tag.
+
+The JSON holds the id, sampling frequency, size, applied filters and FFT
+mode of the signal, the time series decimated to min/max/mean points with
+:mod:`.pyramid`, and the spectrum decimated with max-hold. The arrays are
+stored as base64 encoded little-endian float32.
+
+Signals are added one at a time with :func:`add_to_report`, which also
+rewrites the page. When signals are added by several processes at the same
+time, call :func:`write_index` once they are done, so that the page lists
+all of them.
+"""
+import base64
+import glob
+import html
+import json
+import os
+import string
+import threading
+from urllib.parse import quote
+import numpy as np
+from . import progress
+from . import pyramid as pyr
+
+
+__all__ = ["add_to_report", "write_index", "signal_content"]
+
+
+# Number of points of the time series and of the spectrum of a signal.
+_MAX_POINTS = 2000
+
+_DATA_DIR = "data"
+
+_DEFAULT_TITLE = "ps_signal report"
+
+_INDEX_TEMPLATE = string.Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+body { font-family: sans-serif; margin: 1em 2em; color: #222; }
+.signal { border-top: 1px solid #ccc; padding: 0.5em 0; }
+.signal h2 { font-size: 1.1em; margin: 0.3em 0; }
+.meta { font-size: 0.85em; color: #555; }
+canvas { width: 100%; height: 240px; display: block; margin: 0.3em 0; }
+#search { width: 20em; }
+</style>
+</head>
+<body>
+<h1>$title</h1>
+<p><input id="search" placeholder="Filter by name">
+<span id="count"></span></p>
+<div id="signals"></div>
+<script>
+var psReport = {signals: [], add: function (signal) {
+  this.signals.push(signal);
+}};
+</script>
+$scripts
+<script>
+function decode(text) {
+  var bytes = atob(text);
+  var buffer = new Uint8Array(bytes.length);
+  for (var i = 0; i < bytes.length; i++) {
+    buffer[i] = bytes.charCodeAt(i);
+  }
+  return new Float32Array(buffer.buffer);
+}
+
+function label(value) {
+  return Math.abs(value) >= 1e4 || (value !== 0 && Math.abs(value) < 1e-2)
+    ? value.toExponential(2) : String(Number(value.toPrecision(4)));
+}
+
+function draw(canvas, x, lower, upper, middle, xlabel) {
+  var ratio = window.devicePixelRatio || 1;
+  var width = canvas.clientWidth;
+  var height = canvas.clientHeight;
+  canvas.width = width * ratio;
+  canvas.height = height * ratio;
+  var context = canvas.getContext("2d");
+  context.scale(ratio, ratio);
+
+  var left = 70, right = 10, top = 10, bottom = 34;
+  var x0 = x[0], x1 = x[x.length - 1];
+  var y0 = Infinity, y1 = -Infinity;
+  for (var i = 0; i < x.length; i++) {
+    if (isFinite(lower[i])) { y0 = Math.min(y0, lower[i]); }
+    if (isFinite(upper[i])) { y1 = Math.max(y1, upper[i]); }
+  }
+  if (!(x1 > x0)) { x1 = x0 + 1; }
+  if (!(y1 > y0)) { y0 = (isFinite(y0) ? y0 : 0) - 1; y1 = y0 + 2; }
+  var px = function (v) {
+    return left + (v - x0) / (x1 - x0) * (width - left - right);
+  };
+  var py = function (v) {
+    return top + (y1 - v) / (y1 - y0) * (height - top - bottom);
+  };
+
+  context.strokeStyle = "#999";
+  context.fillStyle = "#555";
+  context.font = "11px sans-serif";
+  context.strokeRect(left, top, width - left - right, height - top - bottom);
+  for (var t = 0; t <= 4; t++) {
+    var vx = x0 + (x1 - x0) * t / 4;
+    var vy = y0 + (y1 - y0) * t / 4;
+    context.fillText(label(vx), px(vx) - 12, height - bottom + 14);
+    context.fillText(label(vy), 4, py(vy) + 4);
+  }
+  context.fillText(xlabel, left + (width - left - right) / 2,
+                   height - 4);
+
+  if (lower !== upper) {
+    context.beginPath();
+    for (var i = 0; i < x.length; i++) {
+      context.lineTo(px(x[i]), py(upper[i]));
+    }
+    for (var i = x.length - 1; i >= 0; i--) {
+      context.lineTo(px(x[i]), py(lower[i]));
+    }
+    context.closePath();
+    context.fillStyle = "rgba(31, 119, 180, 0.35)";
+    context.fill();
+  }
+  context.beginPath();
+  for (var i = 0; i < x.length; i++) {
+    context.lineTo(px(x[i]), py(middle[i]));
+  }
+  context.strokeStyle = "rgb(31, 119, 180)";
+  context.lineWidth = 1;
+  context.stroke();
+}
+
+function render(signal, element) {
+  var series = signal.time_series;
+  var mins = decode(series.min);
+  var maxs = decode(series.max);
+  var means = decode(series.mean);
+  var time = new Float64Array(mins.length);
+  for (var i = 0; i < time.length; i++) {
+    time[i] = series.start_ms + i * series.step_ms;
+  }
+  draw(element.querySelector(".time"), time, mins, maxs, means,
+       "Time (ms)");
+
+  if (signal.spectrum) {
+    var amplitude = decode(signal.spectrum.amplitude);
+    draw(element.querySelector(".spectrum"),
+         decode(signal.spectrum.frequency_khz), amplitude, amplitude,
+         amplitude, "Frequency (kHz)");
+  }
+}
+
+function show() {
+  var container = document.getElementById("signals");
+  var signals = psReport.signals.slice().sort(function (a, b) {
+    return a.output_filename < b.output_filename ? -1 : 1;
+  });
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) {
+        observer.unobserve(entry.target);
+        render(entry.target.signal, entry.target);
+      }
+    });
+  });
+
+  signals.forEach(function (signal) {
+    var element = document.createElement("div");
+    element.className = "signal";
+    element.signal = signal;
+    var title = document.createElement("h2");
+    title.textContent = signal.output_filename;
+    var meta = document.createElement("div");
+    meta.className = "meta";
+    meta.textContent = [
+      signal.frequency_hz + " Hz",
+      signal.size + " samples",
+      signal.duration_s.toPrecision(4) + " s",
+      "filters: " + (signal.filters.join(", ") || "none"),
+      signal.spectrum ? "FFT: " + signal.spectrum.mode : "no FFT"
+    ].join(" | ");
+    element.appendChild(title);
+    element.appendChild(meta);
+    var time = document.createElement("canvas");
+    time.className = "time";
+    element.appendChild(time);
+    if (signal.spectrum) {
+      var spectrum = document.createElement("canvas");
+      spectrum.className = "spectrum";
+      element.appendChild(spectrum);
+    }
+    container.appendChild(element);
+    observer.observe(element);
+  });
+
+  var search = document.getElementById("search");
+  var count = document.getElementById("count");
+  var update = function () {
+    var shown = 0;
+    Array.prototype.forEach.call(container.children, function (element) {
+      var match = element.signal.output_filename.toLowerCase()
+        .indexOf(search.value.toLowerCase()) >= 0;
+      element.style.display = match ? "" : "none";
+      shown += match ? 1 : 0;
+    });
+    count.textContent = shown + " of " + signals.length + " signals";
+  };
+  search.addEventListener("input", update);
+  update();
+}
+
+show();
+</script>
+</body>
+</html>
+""")
+
+# Signals may be added from several threads, e.g. by a pipeline.
+_INDEX_LOCK = threading.Lock()
+
+
+def add_to_report(signal, directory: str = "report", title: str = None,
+                  max_points: int = _MAX_POINTS) -> str:
+    """Function that adds a signal to a report, and rewrites the page of
+    the report. A signal with the same output filename is replaced. If the
+    signal has an FFT, see :meth:`.signal.Signal.calc_fft`, the spectrum is
+    included.
+
+    Args:
+        signal (Signal): The signal to add.
+        directory (str, optional): The directory of the report, created if
+            it does not exist. Defaults to "report".
+        title (str, optional): The title of the page. Defaults to None,
+            i.e. "ps_signal report".
+        max_points (int, optional): Number of points of the time series
+            and of the spectrum. Defaults to 2000.
+
+    Returns:
+        str: The path to the data file of the signal.
+    """
+    content = signal_content(signal, max_points)
+    path = os.path.join(directory, _DATA_DIR,
+                        f"{signal.output_filename}.js")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_atomic(
+        path,
+        f"psReport.add({json.dumps(content, separators=(',', ':'))});\n"
+    )
+    write_index(directory, title)
+    return path
+
+
+def write_index(directory: str = "report", title: str = None) -> str:
+    """Function that writes the page of a report, listing the data files
+    of all signals in the report.
+
+    Args:
+        directory (str, optional): The directory of the report.
+            Defaults to "report".
+        title (str, optional): The title of the page. Defaults to None,
+            i.e. "ps_signal report".
+
+    Returns:
+        str: The path to the page.
+    """
+    with _INDEX_LOCK:
+        names = sorted(
+            os.path.basename(path) for path in
+            glob.glob(os.path.join(glob.escape(directory), _DATA_DIR, "*.js"))
+        )
+        scripts = "\n".join(
+            f'<script src="{_DATA_DIR}/{html.escape(quote(name))}">'
+            "</script>"
+            for name in names
+        )
+        path = os.path.join(directory, "index.html")
+        _write_atomic(path, _INDEX_TEMPLATE.substitute(
+            title=html.escape(title or _DEFAULT_TITLE),
+            scripts=scripts
+        ))
+    return path
+
+
+def signal_content(signal, max_points: int = _MAX_POINTS) -> dict:
+    """Function that returns the content written to the report for a
+    signal, see the module description.
+
+    Args:
+        signal (Signal): The signal.
+        max_points (int, optional): Number of points of the time series
+            and of the spectrum. Defaults to 2000.
+
+    Returns:
+        dict: The content, which can be serialized as JSON.
+    """
+    values = signal.data.acc.to_numpy()
+    start_ms = float(signal.data.time.iloc[0]) if signal.size else 0.0
+    time, mins, maxs, means = pyr.build_pyramid(
+        values, signal.frequency_hz, start_ms=start_ms
+    ).render(width=max_points)
+
+    # The points are evenly spaced, except that the last block of the
+    # pyramid may be shorter.
+    step_ms = float(time[1] - time[0]) if len(time) > 1 else 0.0
+    content = {
+        "id": str(signal.id),
+        "output_filename": signal.output_filename,
+        "frequency_hz": float(signal.frequency_hz),
+        "size": int(signal.size),
+        "duration_s": float(signal.size * signal.period),
+        "filters": [repr(spec) for spec in signal._applied_filters],
+        "time_series": {
+            "start_ms": float(time[0]) if len(time) else start_ms,
+            "step_ms": step_ms,
+            "min": _encode(mins),
+            "max": _encode(maxs),
+            "mean": _encode(means),
+        },
+        "spectrum": None,
+    }
+
+    if signal._fft is not None:
+        frequency, amplitude = _peak_hold(
+            np.asarray(signal._fft.x), np.asarray(signal._fft.y), max_points
+        )
+        content["spectrum"] = {
+            "mode": signal._fft_key[0] if signal._fft_key else "full",
+            "frequency_khz": _encode(frequency),
+            "amplitude": _encode(amplitude),
+        }
+    return content
+
+
+def _peak_hold(x: np.ndarray, y: np.ndarray, points: int) -> tuple:
+    """Helper function that decimates a spectrum to at most about points
+    points, keeping the largest amplitude of every block of bins and its
+    frequency, so that no peak is lost."""
+    block = -(-len(y) // points) if points else 1
+    if block <= 1:
+        return x, y
+    blocks = len(y) // block
+    rows = y[: blocks * block].reshape(blocks, block)
+    peaks = np.argmax(rows, axis=1) + np.arange(blocks) * block
+    if len(y) > blocks * block:
+        rest = blocks * block + int(np.argmax(y[blocks * block:]))
+        peaks = np.append(peaks, rest)
+    return x[peaks], y[peaks]
+
+
+def _encode(values: np.ndarray) -> str:
+    """Helper function that encodes an array as base64 encoded
+    little-endian float32."""
+    array = np.ascontiguousarray(values, dtype="<f4")
+    return base64.b64encode(array.tobytes()).decode("ascii")
+
+
+def _write_atomic(path: str, text: str) -> None:
+    """Helper function that writes a file to a temporary file and then
+    renames it, so the page never reads a partial file, see
+    :func:`.progress.atomic_output`."""
+    with progress.atomic_output(path) as temporary:
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(text)
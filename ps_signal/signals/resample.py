@@ -0,0 +1,102 @@
+"""Module that contains functions for anti-aliased decimation and
+resampling of samples. Used by :meth:`.data.Data.decimate` to lower the
+sampling frequency of a capture before filtering and FFT, so that the
+following stages process fewer samples.
+"""
+from fractions import Fraction
+import numpy as np
+from scipy.signal import resample_poly
+
+
+__all__ = ["decimation_stages", "decimate_values", "resample_values",
+           "resampling_ratio"]
+
+
+# Largest decimation factor used in a single stage. Larger factors are
+# split into several stages, each with a short anti-aliasing filter.
+_MAX_STAGE_FACTOR = 10
+
+# Largest upsampling factor used when finding a ratio for a target
+# frequency. The cost of the polyphase filter grows with this factor.
+_MAX_UPSAMPLING = 1000
+
+
+def decimation_stages(factor: int) -> list:
+    """Function that splits a decimation factor into stages of at most
+    10 each, largest first. A factor that has a prime factor larger than
+    10 gets that prime as a stage of its own.
+
+    Args:
+        factor (int): The total decimation factor.
+
+    Returns:
+        list: The factor of each stage.
+    """
+    stages = []
+    remaining = int(factor)
+    while remaining > 1:
+        stage = next(
+            (q for q in range(_MAX_STAGE_FACTOR, 1, -1) if remaining % q == 0),
+            remaining
+        )
+        stages.append(stage)
+        remaining //= stage
+    return stages
+
+
+def decimate_values(values: np.ndarray, factor: int) -> np.ndarray:
+    """Function that decimates samples by an integer factor. Every stage
+    applies a polyphase FIR anti-aliasing filter, using
+    scipy.signal.resample_poly, so the filtering is only done for the
+    samples that are kept.
+
+    Args:
+        values (np.ndarray): The samples.
+        factor (int): The decimation factor.
+
+    Returns:
+        np.ndarray: The decimated samples.
+    """
+    for stage in decimation_stages(factor):
+        values = resample_poly(values, 1, stage)
+    return values
+
+
+def resample_values(values: np.ndarray, up: int, down: int) -> np.ndarray:
+    """Function that resamples samples by a rational factor up / down using
+    a polyphase FIR filter. Pure decimations are done in stages, see
+    :func:`decimate_values`.
+
+    Args:
+        values (np.ndarray): The samples.
+        up (int): The upsampling factor.
+        down (int): The downsampling factor.
+
+    Returns:
+        np.ndarray: The resampled samples.
+    """
+    if up == 1:
+        return decimate_values(values, down)
+    return resample_poly(values, up, down)
+
+
+def resampling_ratio(frequency_hz: float, target_fs: float) -> tuple:
+    """Function that finds the up- and downsampling factors that take a
+    sampling frequency as close as possible to a target frequency.
+
+    Args:
+        frequency_hz (float): The current sampling frequency.
+        target_fs (float): The wanted sampling frequency.
+
+    Returns:
+        tuple: The upsampling and downsampling factors.
+    """
+    if target_fs <= 0:
+        raise ValueError(f"Invalid target sampling frequency: {target_fs}")
+
+    # down / up is approximated rather than up / down, which limits the
+    # upsampling factor but keeps any large decimation factor exact.
+    ratio = Fraction(frequency_hz / target_fs).limit_denominator(
+        _MAX_UPSAMPLING
+    )
+    return ratio.denominator, ratio.numerator
@@ -0,0 +1,288 @@
+"""Module that contains segmented captures, as recorded with the rapid block
+mode of PicoScope. In rapid block mode the scope records many short
+segments, each started by a trigger, and the export holds one segment per
+file, one member per zip archive, or all segments in one .csv where the
+time restarts at every segment.
+
+The segments are kept as one contiguous array with a row per segment, so
+filtering, FFT, synchronous averaging and statistics run along the sample
+axis in a single vectorized call for all segments, instead of building one
+Signal per segment. A segment or the synchronous average can be made into
+a :class:`.data.Data` object to use the rest of the package on it.
+"""
+import pandas as pd
+import numpy as np
+from scipy.fft import rfft, rfftfreq
+from scipy.signal import sosfiltfilt
+from . import filters
+from . import loaders
+from .data import (Data, detect_codec, _open_decompressed,
+                   _read_zip_members)
+from .fft import FFT
+
+
+__all__ = ["SegmentedData", "load_segments", "split_segments"]
+
+
+# The filter types, as given to scipy.signal.butter.
+_BUTTER_TYPES = {
+    "lowpass": "low",
+    "highpass": "high",
+    "bandpass": "bandpass",
+    "bandstop": "bandstop",
+}
+
+
+class SegmentedData:
+    """Class for a segmented capture, with the samples of every segment in
+    a row of a two-dimensional array. All segments have the same number of
+    samples and start at the same time relative to their trigger.
+
+    Args:
+        values (np.ndarray): The samples, with a row per segment.
+        frequency_hz (float): The sampling frequency.
+        start_ms (float, optional): Time of the first sample of every
+            segment relative to the trigger, given in ms. Defaults to 0.
+        applied_filters (list, optional): The filters applied to the
+            samples, as :class:`.filters.FilterSpec`. Defaults to None.
+    """
+    def __init__(self, values: np.ndarray, frequency_hz: float,
+                 start_ms: float = 0.0, applied_filters: list = None):
+        self._values = np.ascontiguousarray(np.atleast_2d(values),
+                                            dtype=np.float64)
+        self._frequency_hz = frequency_hz
+        self._start_ms = start_ms
+        self._applied_filters = list(applied_filters or ())
+
+    def __repr__(self):
+        """For printing out information about the SegmentedData object."""
+        return f"segments_{self.segments}x{self.samples}"
+
+    @property
+    def values(self) -> np.ndarray:
+        """The samples, with a row per segment."""
+        return self._values
+
+    @property
+    def segments(self) -> int:
+        """The number of segments."""
+        return self._values.shape[0]
+
+    @property
+    def samples(self) -> int:
+        """The number of samples per segment."""
+        return self._values.shape[1]
+
+    @property
+    def frequency_hz(self) -> float:
+        """The sampling frequency."""
+        return self._frequency_hz
+
+    @property
+    def period(self) -> float:
+        """The sampling period, i.e. the inverse of the sampling
+        frequency."""
+        return 1 / self._frequency_hz
+
+    @property
+    def start_ms(self) -> float:
+        """Time of the first sample of every segment relative to the
+        trigger, given in ms."""
+        return self._start_ms
+
+    @property
+    def time(self) -> np.ndarray:
+        """The time of every sample of a segment, given in ms."""
+        return self._start_ms + np.arange(self.samples) * self.period * 1000
+
+    @property
+    def filter_string(self) -> str:
+        """The applied filters joined into a string, as for a Signal."""
+        return "-".join(repr(spec) for spec in self._applied_filters)
+
+    def filter(self, filter_type: str, cutoff: float,
+               cutoff_upper: float = None) -> "SegmentedData":
+        """Method that filters all segments forwards and backwards with the
+        Butterworth filter used by :mod:`.filters`, in one call along the
+        sample axis.
+
+        Args:
+            filter_type (str): "lowpass", "highpass", "bandpass" or
+                "bandstop".
+            cutoff (float): The cutoff frequency in Hz.
+            cutoff_upper (float, optional): The upper cutoff frequency of
+                bandpass and bandstop filters. Defaults to None.
+
+        Returns:
+            SegmentedData: The filtered segments.
+        """
+        if filter_type not in _BUTTER_TYPES:
+            raise ValueError(f"Unknown filter type: {filter_type}")
+        cutoffs = (cutoff,) if cutoff_upper is None else (cutoff,
+                                                          cutoff_upper)
+        sos = filters._design_butter(_BUTTER_TYPES[filter_type], cutoffs,
+                                     self._frequency_hz)
+        spec = filters.FilterSpec(filter_type, cutoff, cutoff_upper)
+        return SegmentedData(
+            sosfiltfilt(sos, self._values, axis=1),
+            self._frequency_hz,
+            self._start_ms,
+            self._applied_filters + [spec]
+        )
+
+    def fft(self) -> FFT:
+        """Method that computes the spectrum of every segment in one call,
+        scaled as :func:`.fft.perform_fft_on_signal`.
+
+        Returns:
+            FFT: The spectra, with the frequencies in kHz as x and a row
+            of amplitudes per segment as y.
+        """
+        half = self.samples // 2
+        amplitude = np.abs(rfft(self._values, axis=1)[:, :half])
+        frequency = rfftfreq(self.samples, self.period)[:half]
+        return FFT(frequency / 1000, amplitude)
+
+    def average(self) -> Data:
+        """Method that computes the synchronous average, i.e. the mean of
+        the segments sample by sample. Components locked to the trigger
+        are kept, while noise is reduced by the square root of the number
+        of segments.
+
+        Returns:
+            Data: The average as a Data object.
+        """
+        return self._to_data(self._values.mean(axis=0))
+
+    def segment(self, index: int) -> Data:
+        """Method that returns one segment as a Data object.
+
+        Args:
+            index (int): The index of the segment, starting at 0.
+
+        Returns:
+            Data: The segment.
+        """
+        return self._to_data(self._values[index])
+
+    def statistics(self) -> pd.DataFrame:
+        """Method that computes statistics of every segment in one call
+        per statistic.
+
+        Returns:
+            pd.DataFrame: A row per segment with the columns "mean", "std",
+            "rms", "min", "max", "peak_to_peak" and "crest_factor".
+        """
+        values = self._values
+        rms = np.sqrt(np.mean(values ** 2, axis=1))
+        peak = np.max(np.abs(values), axis=1)
+        minimum = values.min(axis=1)
+        maximum = values.max(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crest_factor = np.where(rms > 0, peak / rms, np.nan)
+        return pd.DataFrame({
+            "mean": values.mean(axis=1),
+            "std": values.std(axis=1),
+            "rms": rms,
+            "min": minimum,
+            "max": maximum,
+            "peak_to_peak": maximum - minimum,
+            "crest_factor": crest_factor,
+        })
+
+    def _to_data(self, values: np.ndarray) -> Data:
+        """Helper method that makes a Data object of the samples of one
+        segment."""
+        frame = pd.DataFrame({"time": self.time, "acc": values})
+        frame.attrs["period"] = self.period
+        data = Data(loader=lambda _: frame)
+        data.load("", remove_offset=False)
+        data._trigger_offset = self._start_ms
+        return data
+
+
+def load_segments(source, loader: str = "auto") -> SegmentedData:
+    """Function that loads a segmented capture. The source is either:
+
+    * A list of paths, one capture per segment, loaded with the loader.
+    * A zip archive with one .csv per segment, in name order.
+    * A .csv, possibly compressed, where the time restarts at every
+      segment. Header rows between the segments are skipped.
+
+    Segments of different lengths are cut to the shortest one.
+
+    Args:
+        source (str or list): The path to the capture, or a list of paths.
+        loader (str, optional): Name of the loader used for a list of
+            paths, see :func:`.loaders.get_loader`. Defaults to "auto".
+
+    Returns:
+        SegmentedData: The segments.
+    """
+    if isinstance(source, (list, tuple)):
+        parts = []
+        frequencies = set()
+        for path in source:
+            data = Data(loader=loaders.get_loader(loader))
+            data.load(path, remove_offset=False)
+            frequencies.add(round(data.frequency_hz, 6))
+            parts.append((data.data.time.to_numpy(),
+                          data.data.acc.to_numpy()))
+        if len(frequencies) > 1:
+            raise ValueError("The segments have different sampling "
+                             f"frequencies: {sorted(frequencies)}")
+    elif detect_codec(source) == "zip":
+        parts = [(frame.time.to_numpy(), frame.acc.to_numpy())
+                 for frame in _read_zip_members(source)]
+    else:
+        frame = _read_segmented_csv(source)
+        parts = split_segments(frame.time.to_numpy(), frame.acc.to_numpy())
+
+    if not parts:
+        raise ValueError(f"No segments found in {source}")
+    samples = min(len(values) for _, values in parts)
+    if samples < 2:
+        raise ValueError(f"The segments of {source} are too short")
+
+    time = parts[0][0]
+    period_ms = np.median(np.diff(time[:samples]))
+    values = np.empty((len(parts), samples))
+    for row, (_, part) in enumerate(parts):
+        values[row] = part[:samples]
+    return SegmentedData(values, 1000 / period_ms, float(time[0]))
+
+
+def split_segments(time: np.ndarray, values: np.ndarray) -> list:
+    """Function that splits samples into segments where the time restarts,
+    i.e. where a time stamp is not later than the one before it.
+
+    Args:
+        time (np.ndarray): The time stamps.
+        values (np.ndarray): The samples.
+
+    Returns:
+        list: Tuples of the time stamps and the samples of every segment.
+    """
+    starts = np.flatnonzero(np.diff(time) <= 0) + 1
+    return list(zip(np.split(time, starts), np.split(values, starts)))
+
+
+def _read_segmented_csv(filename: str) -> pd.DataFrame:
+    """Helper function that parses a PicoScope .csv that may repeat its
+    header rows before every segment. Rows that are not numbers are
+    dropped."""
+    codec = detect_codec(filename)
+    if codec:
+        with _open_decompressed(filename, codec) as stream:
+            frame = pd.read_csv(stream, sep=";", header=None, dtype=str,
+                                skip_blank_lines=True)
+    else:
+        frame = pd.read_csv(filename, sep=";", header=None, dtype=str,
+                            skip_blank_lines=True)
+
+    frame = frame.iloc[:, :2].apply(
+        lambda column: pd.to_numeric(column.str.replace(",", "."),
+                                     errors="coerce")
+    )
+    frame.columns = ["time", "acc"]
+    return frame.dropna().reset_index(drop=True)
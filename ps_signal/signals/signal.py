@@ -1,7 +1,9 @@
 """Module for the Signal class.
 """
+from . import envelope
 from . import fft
 from . import plot
+from . import trend
 
 
 __all__ = ["Signal"]
@@ -28,10 +30,12 @@ class Signal:
         self._frequency_hz = input_data.frequency_hz
         self._period = input_data.period
         self._total_time = self._sample_size * self._period
+        self._strategy = getattr(input_data, "strategy", "memory")
 
         self._applied_filters = []
         self._output_filename = str(self._id)
         self._fft = None
+        self._fft_key = None
 
     def __repr__(self) -> str:
         """Used to print out information about the signal.
@@ -49,14 +53,49 @@ class Signal:
             f"Total time: {self._total_time}s"
         )
 
-    def calc_fft(self):
+    def calc_fft(self, mode: str = "full", f_start: float = None,
+                 f_stop: float = None, bins: int = 1024,
+                 frequencies: list = None):
         """Method to perform a FFT analysis on a signal.
-        Memoized so it only performs it if it is not already done.
-        The FFT result is stored in an internal variable, can be plotted
-        using :func:`plot_fft`.
+        Memoized so it only performs it if it is not already done with the
+        same arguments. The FFT result is stored in an internal variable,
+        can be plotted using :func:`plot_fft`.
+
+        * full - FFT of the whole signal up to the Nyquist frequency.
+        * zoom - Spectrum between f_start and f_stop with the given number
+          of bins, see :func:`.fft.perform_zoom_fft_on_signal`.
+        * goertzel - Amplitude at the given frequencies only, see
+          :func:`.fft.perform_goertzel_on_signal`.
+        * envelope - Spectrum of the envelope of the band between f_start
+          and f_stop, see :func:`.envelope.perform_envelope_on_signal`.
+
+        Args:
+            mode (str, optional): "full", "zoom", "goertzel" or "envelope".
+                Defaults to "full".
+            f_start (float, optional): Lowest frequency in Hz for the zoom
+                and envelope modes. Defaults to None.
+            f_stop (float, optional): Highest frequency in Hz for the zoom
+                and envelope modes. Defaults to None.
+            bins (int, optional): Number of bins for the zoom mode.
+                Defaults to 1024.
+            frequencies (list, optional): Target frequencies in Hz for the
+                goertzel mode. Defaults to None.
         """
-        if not self._fft:
-            self._fft = fft.perform_fft_on_signal(self)
+        key = (mode, f_start, f_stop, bins, tuple(frequencies or ()))
+        if not self._fft or self._fft_key != key:
+            if mode == "zoom":
+                self._fft = fft.perform_zoom_fft_on_signal(
+                    self, f_start, f_stop, bins
+                )
+            elif mode == "goertzel":
+                self._fft = fft.perform_goertzel_on_signal(self, frequencies)
+            elif mode == "envelope":
+                self._fft = envelope.perform_envelope_on_signal(
+                    self, f_start, f_stop
+                )
+            else:
+                self._fft = fft.perform_fft_on_signal(self)
+            self._fft_key = key
 
     def plot_signal(self):
         """Method that plots the signal as is. Can be used to find
@@ -81,10 +120,15 @@ class Signal:
         Appends "-fft" to the output file to distinguish from the time
         series output.
         """
+        # The band-limited modes have a plotting style of their own.
+        style = self._fft_key[0] if self._fft_key else 'fft'
+        if style == 'full':
+            style = 'fft'
+
         try:
             plot.plot_data(
                 signal=self,
-                style='fft'
+                style=style
             )
         except AttributeError as error:
             print(error)
@@ -92,13 +136,35 @@ class Signal:
         except Exception as error:
             print(error)
 
+    def calc_trend(self, window_ms: float,
+                   hop_ms: float = None) -> trend.Trend:
+        """Method that computes the RMS, peak, peak-to-peak, crest factor
+        and kurtosis of sliding windows over the signal in a single pass,
+        see :func:`.trend.build_trend`.
+
+        Args:
+            window_ms (float): The length of a window in ms.
+            hop_ms (float, optional): The time between the starts of two
+                windows in ms. Defaults to None, i.e. no overlap.
+
+        Returns:
+            Trend: The statistics of the windows.
+        """
+        return trend.build_trend(
+            self._data.acc.to_numpy(),
+            self._frequency_hz,
+            window_ms,
+            hop_ms,
+            start_ms=self._data.time.iloc[0]
+        )
+
     def _add_filter(self, filter):
         """Method to add a filter to the internal filter list.
         This is used to keep track of what filters are applied to the signal.
         The different applied filters will be added to the output filename.
 
         Args:
-            filter (Filter): An object of Filter class to add.
+            filter (FilterSpec): The record of the applied filter to add.
         """
         self._applied_filters.append(filter)
 
@@ -130,6 +196,16 @@ class Signal:
         """The row count of the imported data."""
         return self._sample_size
 
+    @property
+    def strategy(self) -> str:
+        """How the filters use memory, "memory", "chunked" or "mmap", see
+        :mod:`.planner`."""
+        return self._strategy
+
+    @strategy.setter
+    def strategy(self, strategy: str) -> None:
+        self._strategy = strategy
+
     @property
     def memory_usage_mb(self) -> int:
         """The memory used by the imported data.
@@ -0,0 +1,265 @@
+"""Module that contains trends of statistics over sliding windows, e.g. how
+the RMS and the kurtosis of a vibration evolve over a long capture. A window
+of window samples starts every hop samples, and the RMS, peak, peak-to-peak,
+crest factor and kurtosis are computed for every window.
+
+The trend is computed in one pass over the samples, chunk by chunk, without
+copying the windows. A window is made of blocks of g samples, where g is the
+greatest common divisor of the window and the hop. The sums of the powers
+of the samples are taken per block and added up per window, and the
+extremes of the windows are running maxima and minima of the extremes of
+the blocks. Every sample is
+thus handled a constant number of times, however much the windows overlap.
+"""
+from math import gcd
+import numpy as np
+import pandas as pd
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+from . import progress
+
+
+__all__ = ["Trend", "build_trend", "save_trend", "load_trend"]
+
+
+# Number of samples read at a time, at least one window.
+_CHUNK_SIZE = 2 ** 20
+
+_STATISTICS = ("rms", "peak", "peak_to_peak", "crest_factor", "kurtosis")
+
+
+class Trend:
+    """Class for the statistics of sliding windows, see :func:`build_trend`.
+
+    Args:
+        time_ms (np.ndarray): The center of every window in ms.
+        statistics (dict): An array with a value per window for each of
+            "rms", "peak", "peak_to_peak", "crest_factor" and "kurtosis".
+        window (int): Number of samples per window.
+        hop (int): Number of samples between the starts of two windows.
+        frequency_hz (float): The sampling frequency of the samples.
+    """
+    def __init__(self, time_ms, statistics, window, hop, frequency_hz):
+        self._time_ms = time_ms
+        self._statistics = statistics
+        self._window = window
+        self._hop = hop
+        self._frequency_hz = frequency_hz
+
+    def __repr__(self):
+        """For printing out information about the Trend object."""
+        return f"trend_{len(self._time_ms)}_windows_of_{self._window}"
+
+    def __len__(self):
+        return len(self._time_ms)
+
+    @property
+    def time(self) -> np.ndarray:
+        """The center of every window in ms."""
+        return self._time_ms
+
+    @property
+    def window(self) -> int:
+        """Number of samples per window."""
+        return self._window
+
+    @property
+    def hop(self) -> int:
+        """Number of samples between the starts of two windows."""
+        return self._hop
+
+    @property
+    def frequency_hz(self) -> float:
+        """The sampling frequency of the samples."""
+        return self._frequency_hz
+
+    @property
+    def rms(self) -> np.ndarray:
+        """The RMS value of every window."""
+        return self._statistics["rms"]
+
+    @property
+    def peak(self) -> np.ndarray:
+        """The largest absolute value of every window."""
+        return self._statistics["peak"]
+
+    @property
+    def peak_to_peak(self) -> np.ndarray:
+        """The difference between the largest and the smallest value of
+        every window."""
+        return self._statistics["peak_to_peak"]
+
+    @property
+    def crest_factor(self) -> np.ndarray:
+        """The peak divided by the RMS value of every window."""
+        return self._statistics["crest_factor"]
+
+    @property
+    def kurtosis(self) -> np.ndarray:
+        """The kurtosis of every window, 3 for normally distributed
+        samples."""
+        return self._statistics["kurtosis"]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Method that returns the trend as a DataFrame.
+
+        Returns:
+            pd.DataFrame: The columns "time" and one per statistic.
+        """
+        return pd.DataFrame({"time": self._time_ms, **self._statistics})
+
+
+def build_trend(values: np.ndarray, frequency_hz: float, window_ms: float,
+                hop_ms: float = None, start_ms: float = 0.0,
+                chunk_size: int = _CHUNK_SIZE) -> Trend:
+    """Function that computes the statistics of sliding windows in a single
+    pass over the samples, see the module description. Only whole windows
+    are used, so the last samples may not be covered.
+
+    Args:
+        values (np.ndarray): The samples.
+        frequency_hz (float): The sampling frequency of the samples.
+        window_ms (float): The length of a window in ms, rounded to whole
+            samples.
+        hop_ms (float, optional): The time between the starts of two
+            windows in ms, rounded to whole samples. Defaults to None, i.e.
+            windows that follow each other without overlap.
+        start_ms (float, optional): Time of the first sample in ms.
+            Defaults to 0.
+        chunk_size (int, optional): Number of samples read at a time.
+            Defaults to 1048576.
+
+    Returns:
+        Trend: The statistics of the windows.
+    """
+    window = max(int(round(window_ms / 1000 * frequency_hz)), 1)
+    hop = window if hop_ms is None else max(
+        int(round(hop_ms / 1000 * frequency_hz)), 1
+    )
+    size = len(values)
+    if size < window:
+        raise ValueError(f"The window of {window} samples is longer than "
+                         f"the {size} samples")
+
+    count = (size - window) // hop + 1
+    statistics = {name: np.empty(count) for name in _STATISTICS}
+
+    # Sums of powers are taken around a shift, the mean of the first
+    # window, which keeps the higher powers of an offset signal accurate.
+    shift = float(np.mean(values[:window]))
+
+    # Every chunk holds whole windows, at least as many samples as a
+    # window, so that the overlap read twice is at most half of a chunk.
+    per_chunk = max(max(chunk_size, window) // hop, 1)
+    for first in range(0, count, per_chunk):
+        last = min(first + per_chunk, count)
+        start = first * hop
+        end = (last - 1) * hop + window
+        chunk = np.asarray(values[start: end], dtype=np.float64)
+        _window_statistics(chunk - shift, shift, window, hop,
+                           statistics, first, last)
+        progress.update("trend", end, size)
+
+    time_ms = start_ms + (np.arange(count) * hop
+                          + (window - 1) / 2) / frequency_hz * 1000
+    return Trend(time_ms, statistics, window, hop, frequency_hz)
+
+
+def save_trend(trend: Trend, path: str) -> None:
+    """Function that saves a trend to a .npz file. The file is written
+    atomically, see :func:`.progress.atomic_output`.
+
+    Args:
+        trend (Trend): The trend to save.
+        path (str): The path to the file.
+    """
+    with progress.atomic_output(path) as temporary:
+        with open(temporary, "wb") as file:
+            np.savez(
+                file,
+                time=trend.time,
+                window=trend.window,
+                hop=trend.hop,
+                frequency_hz=trend.frequency_hz,
+                **trend._statistics
+            )
+
+
+def load_trend(path: str) -> Trend:
+    """Function that loads a trend saved by :func:`save_trend`.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        Trend: The saved trend.
+    """
+    with np.load(path) as content:
+        return Trend(
+            content["time"],
+            {name: content[name] for name in _STATISTICS},
+            int(content["window"]),
+            int(content["hop"]),
+            float(content["frequency_hz"])
+        )
+
+
+def _window_statistics(chunk: np.ndarray, shift: float, window: int,
+                       hop: int, statistics: dict, first: int,
+                       last: int) -> None:
+    """Helper function that computes the statistics of the windows first to
+    last - 1, whose samples, minus the shift, are the chunk. The chunk
+    starts at the first window."""
+    block = gcd(window, hop)
+    blocks = chunk.reshape(-1, block)
+    per_window = window // block
+    step = hop // block
+    starts = np.arange(last - first) * step
+
+    squares = blocks * blocks
+    sums = []
+    for power in (blocks, squares, squares * blocks, squares * squares):
+        sums.append(_window_sums(power.sum(axis=1), starts, per_window)
+                    / window)
+    mean, second, third, fourth = sums
+
+    # Running extremes over the blocks, centered on the middle block of
+    # every window.
+    middle = starts + per_window // 2
+    maximum = maximum_filter1d(blocks.max(axis=1), per_window)[middle]
+    minimum = minimum_filter1d(blocks.min(axis=1), per_window)[middle]
+
+    variance = second - mean * mean
+    fourth_central = (fourth - 4 * mean * third + 6 * mean * mean * second
+                      - 3 * mean ** 4)
+    rms = np.sqrt(np.maximum(second + 2 * shift * mean + shift * shift, 0))
+    peak = np.maximum(np.abs(maximum + shift), np.abs(minimum + shift))
+
+    output = slice(first, last)
+    statistics["rms"][output] = rms
+    statistics["peak"][output] = peak
+    statistics["peak_to_peak"][output] = maximum - minimum
+    with np.errstate(invalid="ignore", divide="ignore"):
+        statistics["crest_factor"][output] = np.where(rms > 0, peak / rms,
+                                                      np.nan)
+        statistics["kurtosis"][output] = np.where(
+            variance > 0, fourth_central / (variance * variance), np.nan
+        )
+
+
+def _window_sums(sums: np.ndarray, starts: np.ndarray,
+                 per_window: int) -> np.ndarray:
+    """Helper function that adds up per_window block sums from every start.
+    The blocks are split in segments of a window, and the sum of a window
+    is the end of one segment plus the beginning of the next. The running
+    sums thus restart at every segment, so that a loud part does not drown
+    the sums of the quiet parts after it, as a cumulative sum over the
+    whole chunk would."""
+    segments = -(-len(sums) // per_window) + 1
+    padded = np.zeros(segments * per_window)
+    padded[: len(sums)] = sums
+    padded = padded.reshape(segments, per_window)
+    heads = np.zeros((segments, per_window + 1))
+    heads[:, 1:] = np.cumsum(padded, axis=1)
+    tails = np.cumsum(padded[:, ::-1], axis=1)[:, ::-1]
+    segment, offset = np.divmod(starts, per_window)
+    return tails[segment, offset] + heads[segment + 1, offset]
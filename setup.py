@@ -40,10 +40,16 @@ setup(
         'seaborn>=0.10.0',
         'pandas>=1.0.1'
     ],
-    # extras_require={},
+    extras_require={
+        'zstd': ['zstandard>=0.15'],
+        'mat73': ['h5py>=2.10'],
+        'yaml': ['PyYAML>=5.1'],
+        'toml': ['toml>=0.10']
+    },
     # package_data={},
     # data_files=[],
     entry_points={
-        'console_scripts': ['ps-signal = ps_signal.__main__:main']
+        'console_scripts': ['ps-signal = ps_signal.__main__:main'],
+        'gui_scripts': ['ps-signal-gui = ps_signal.interfaces.gui:run_gui']
     },
 )
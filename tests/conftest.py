@@ -0,0 +1,18 @@
+"""Fixtures shared by the tests. The captures are generated in the
+temporary directory of every test."""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def write_capture():
+    """Returns a function that writes samples as a PicoScope .csv export,
+    with the time in ms and ';' and ',' as delimiter and decimal point."""
+    def write(path, values, frequency_hz=10000.0, start_ms=0.0):
+        time_ms = start_ms + np.arange(len(values)) / frequency_hz * 1000
+        lines = ["Tid;Kanal A", "(ms);(mV)", ""]
+        lines += [f"{t:.8f};{v:.8f}".replace(".", ",")
+                  for t, v in zip(time_ms, values)]
+        path.write_text("\n".join(lines) + "\n")
+        return str(path)
+    return write
@@ -0,0 +1,18 @@
+"""Tests of the spectra aggregated over many captures."""
+import numpy as np
+import pytest
+from ps_signal.signals.aggregate import aggregate_spectra
+
+
+def test_default_grid_is_taken_from_the_first_file(tmp_path, write_capture):
+    rng = np.random.default_rng(0)
+    # The first capture is the slowest, so the others finish before it.
+    files = [write_capture(tmp_path / "first.csv",
+                           rng.standard_normal(200000), frequency_hz=10000.0)]
+    files += [write_capture(tmp_path / f"fast_{index}.csv",
+                            rng.standard_normal(2000), frequency_hz=40000.0)
+              for index in range(4)]
+
+    result = aggregate_spectra(files, max_workers=4)
+    assert result.count == 5
+    assert result.x[-1] == pytest.approx(5.0, rel=1e-3)
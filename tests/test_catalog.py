@@ -0,0 +1,120 @@
+"""Tests of the incremental scans and the queries of the catalog."""
+import os
+import sqlite3
+import numpy as np
+import pytest
+from ps_signal.signals import Catalog, catalog
+
+
+@pytest.fixture
+def described(monkeypatch):
+    """Records the paths of the captures that are loaded by a scan."""
+    paths = []
+    describe = catalog._describe
+
+    def recording(path, *args):
+        paths.append(path)
+        return describe(path, *args)
+    monkeypatch.setattr(catalog, "_describe", recording)
+    return paths
+
+
+def tone(frequency_hz, size, sample_rate_hz):
+    return np.sin(2 * np.pi * frequency_hz * np.arange(size)
+                  / sample_rate_hz)
+
+
+@pytest.fixture
+def captures(tmp_path, write_capture):
+    return [
+        write_capture(tmp_path / "slow.csv", tone(100, 20000, 10000.0),
+                      frequency_hz=10000.0),
+        write_capture(tmp_path / "fast.csv", tone(1200, 20000, 100000.0),
+                      frequency_hz=100000.0, start_ms=-20.0),
+        write_capture(tmp_path / "long.csv", tone(1200, 60000, 10000.0),
+                      frequency_hz=10000.0),
+    ]
+
+
+def test_rescan_skips_unchanged_captures(tmp_path, captures, described):
+    database = Catalog(str(tmp_path / "catalog.db"))
+    assert database.scan(captures, max_workers=2) == {
+        "scanned": 3, "unchanged": 0, "failed": 0}
+    assert sorted(described) == sorted(os.path.abspath(path)
+                                       for path in captures)
+    assert len(database) == 3
+
+    described.clear()
+    assert database.scan(captures) == {
+        "scanned": 0, "unchanged": 3, "failed": 0}
+    assert described == []
+
+
+def test_rescan_picks_up_changes(tmp_path, captures, described,
+                                 write_capture):
+    database = Catalog(str(tmp_path / "catalog.db"))
+    database.scan(captures)
+    slow, fast, long = captures
+
+    # The same size with a new modification time is a change as well.
+    status = os.stat(fast)
+    os.utime(fast, ns=(status.st_atime_ns, status.st_mtime_ns + 10 ** 9))
+    write_capture(tmp_path / "slow.csv", tone(100, 5000, 10000.0))
+    os.remove(long)
+
+    described.clear()
+    assert database.scan(captures) == {
+        "scanned": 2, "unchanged": 0, "failed": 1}
+    assert sorted(described) == sorted([os.path.abspath(slow),
+                                        os.path.abspath(fast)])
+    assert database.describe(slow)["size"] == 5000
+    assert database.describe(slow)["duration_s"] == pytest.approx(0.5)
+
+    # The removed capture stays until the catalog is pruned.
+    assert len(database) == 3
+    assert database.prune() == 1
+    assert database.describe(long) is None
+    assert len(database) == 2
+
+
+def test_select_filters_the_captures(tmp_path, captures):
+    database = Catalog(str(tmp_path / "catalog.db"))
+    database.scan(captures, features=True)
+    slow, fast, long = [os.path.abspath(path) for path in captures]
+
+    assert database.select() == sorted([slow, fast, long])
+    assert database.select("frequency_hz = 100000") == [fast]
+    assert database.select("duration_s > 5") == [long]
+    assert database.select("abs(peak_hz - ?) < 50", (1200,)) == sorted(
+        [fast, long])
+    assert database.select("trigger_offset_ms < 0") == [fast]
+    assert database.select("frequency_hz = 1") == []
+
+    row = database.describe(fast)
+    assert row["units"] == "ms,mV"
+    assert row["rms"] == pytest.approx(np.sqrt(0.5), rel=1e-3)
+
+
+def test_select_opens_the_database_read_only(tmp_path, captures,
+                                             monkeypatch):
+    database = Catalog(str(tmp_path / "catalog.db"))
+    database.scan(captures)
+    opened = []
+    connect = sqlite3.connect
+
+    def recording(path, *args, **kwargs):
+        opened.append((path, kwargs))
+        return connect(path, *args, **kwargs)
+    monkeypatch.setattr(catalog.sqlite3, "connect", recording)
+    assert len(database.select("size > 0")) == 3
+    monkeypatch.undo()
+
+    ((uri, kwargs),) = opened
+    assert uri.endswith("?mode=ro") and kwargs == {"uri": True}
+    connection = sqlite3.connect(uri, **kwargs)
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            connection.execute("DELETE FROM captures")
+    finally:
+        connection.close()
+    assert len(database) == 3
@@ -0,0 +1,29 @@
+"""Tests of the comb filter with tracking of the fundamental."""
+import numpy as np
+import pandas as pd
+from ps_signal.signals import Data, Signal, filters
+
+
+def make_signal(fundamental, frequency_hz=5000.0, seconds=4.0):
+    time_s = np.arange(int(frequency_hz * seconds)) / frequency_hz
+    values = sum(np.sin(2 * np.pi * fundamental * harmonic * time_s)
+                 / harmonic for harmonic in range(1, 4))
+    frame = pd.DataFrame({"time": time_s * 1000, "acc": values})
+    frame.attrs["period"] = 1 / frequency_hz
+    data = Data(loader=lambda _: frame)
+    data.load("", remove_offset=False)
+    return Signal("comb", data)
+
+
+def test_tracked_fundamental_is_recorded():
+    signal = make_signal(50.4)
+    filtered = filters.comb()(signal, 50, harmonics=3, track=True)
+    (spec,) = filtered._applied_filters
+    assert abs(spec.cutoff - 50.4) < 0.05
+    assert filtered.output_filename == "comb-comb_50.4"
+
+
+def test_nominal_fundamental_is_recorded_without_tracking():
+    signal = make_signal(50.0)
+    filters.comb()(signal, 50, harmonics=3, inplace=True)
+    assert signal.output_filename == "comb-comb_50"
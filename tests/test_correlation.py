@@ -0,0 +1,45 @@
+"""Tests of the cross-correlation and coherence read block by block."""
+import tracemalloc
+import numpy as np
+import pandas as pd
+from ps_signal.signals import Data, Signal, correlation
+
+
+def make_signal(values, frequency_hz=10000.0):
+    frame = pd.DataFrame({"time": np.arange(len(values)) / frequency_hz
+                          * 1000, "acc": values})
+    frame.attrs["period"] = 1 / frequency_hz
+    data = Data(loader=lambda _: frame)
+    data.load("", remove_offset=False)
+    return Signal("correlation", data)
+
+
+def test_blocks_match_the_direct_correlation():
+    rng = np.random.default_rng(0)
+    a = rng.standard_normal(5000) + 2.0
+    b = np.roll(a, 37) * 0.5 + rng.standard_normal(5000) * 0.3 + 1.0
+    result = correlation.cross_correlate(make_signal(a), make_signal(b),
+                                         max_lag_ms=10, block_size=512)
+
+    a, b = a - a.mean(), b - b.mean()
+    full = np.correlate(b, a, mode="full")[len(a) - 101: len(a) + 100]
+    expected = full / np.sqrt(np.sum(a ** 2) * np.sum(b ** 2))
+    np.testing.assert_allclose(result.y, expected, atol=1e-12)
+    assert result.delay_ms == 3.7
+
+
+def test_memory_does_not_grow_with_the_length():
+    rng = np.random.default_rng(1)
+    size = 4 * 10 ** 6
+    pair = (make_signal(rng.standard_normal(size)),
+            make_signal(rng.standard_normal(size)))
+
+    tracemalloc.start()
+    try:
+        correlation.cross_correlate_batch([pair], max_lag_ms=2)
+        correlation.coherence_batch([pair])
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # A copy of one signal alone would be 32 MB.
+    assert peak < 8 * size / 2
@@ -0,0 +1,39 @@
+"""Tests of the validation of Data.decimate."""
+import numpy as np
+import pandas as pd
+import pytest
+from ps_signal.signals import Data
+
+
+def make_data(samples=1000, frequency_hz=1000.0):
+    frame = pd.DataFrame({"time": np.arange(samples) / frequency_hz * 1000,
+                          "acc": np.sin(np.arange(samples) / 10)})
+    frame.attrs["period"] = 1 / frequency_hz
+    data = Data(loader=lambda _: frame)
+    data.load("", remove_offset=False)
+    return data
+
+
+@pytest.mark.parametrize("factor", [-2, 0, 0.5, 2.5])
+def test_invalid_factor_raises(factor):
+    data = make_data()
+    with pytest.raises(ValueError):
+        data.decimate(factor=factor)
+    assert data.frequency_hz == 1000.0
+
+
+@pytest.mark.parametrize("target_fs", [-100.0, 0.0, 2000.0])
+def test_invalid_target_fs_raises(target_fs):
+    data = make_data()
+    with pytest.raises(ValueError):
+        data.decimate(target_fs=target_fs)
+    assert data.frequency_hz == 1000.0
+
+
+def test_valid_decimation():
+    data = make_data()
+    data.decimate(factor=4)
+    assert data.frequency_hz == 250.0
+    assert data.size == 250
+    data.decimate(target_fs=125.0)
+    assert data.frequency_hz == 125.0
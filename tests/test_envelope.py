@@ -0,0 +1,46 @@
+"""Tests of the envelope computed block by block."""
+import tracemalloc
+import numpy as np
+import pytest
+from ps_signal.signals.envelope import envelope_values
+
+
+@pytest.mark.parametrize("f_low, f_high", [(5000, 6000), (20000, 20500)])
+def test_blocks_match_one_block_for_narrow_band(f_low, f_high):
+    frequency_hz = 1e6
+    size = 10 ** 6
+    time_s = np.arange(size) / frequency_hz
+    carrier = (f_low + f_high) / 2
+    values = (np.random.default_rng(0).standard_normal(size)
+              + (1 + 0.5 * np.sin(2 * np.pi * 37 * time_s))
+              * np.sin(2 * np.pi * carrier * time_s))
+
+    blocks, blocks_hz = envelope_values(values, frequency_hz, f_low, f_high)
+    single, single_hz = envelope_values(values, frequency_hz, f_low, f_high,
+                                        block_size=4 * size)
+    assert blocks_hz == single_hz
+    assert len(blocks) == len(single)
+
+    # The ends differ by the reflection at the edges of the signal.
+    inner = slice(len(single) // 20, -len(single) // 20)
+    error = np.max(np.abs(blocks[inner] - single[inner]))
+    assert error < 1e-3 * np.max(single[inner])
+
+
+def test_memory_mapped_samples_are_not_copied(tmp_path):
+    size = 2 ** 23
+    path = str(tmp_path / "samples.bin")
+    samples = np.memmap(path, dtype=np.float32, mode="w+", shape=(size,))
+    samples[:] = np.random.default_rng(0).standard_normal(size)
+    samples.flush()
+    samples = np.memmap(path, dtype=np.float32, mode="r", shape=(size,))
+
+    tracemalloc.start()
+    try:
+        envelope, _ = envelope_values(samples, 1e6, 50000, 60000)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # Less than one float64 copy of the samples, whatever their length.
+    assert peak < 8 * size
+    assert len(envelope) == -(-size // 40)
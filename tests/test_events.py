@@ -0,0 +1,43 @@
+"""Tests of the event index saved next to a capture."""
+import os
+import numpy as np
+from ps_signal.signals import events
+
+
+def save_index(path):
+    index = events.EventIndex(np.array([10, 250]), 10000.0, "threshold",
+                              {"holdoff_ms": 5.0})
+    events.save_events(index, str(path))
+
+
+def test_saved_index_is_loaded(tmp_path, write_capture):
+    path = tmp_path / "capture.csv"
+    write_capture(path, np.zeros(1000))
+    save_index(path)
+    loaded = events.load_events(str(path))
+    assert loaded is not None
+    assert list(loaded.positions) == [10, 250]
+    assert loaded.params == {"holdoff_ms": 5.0}
+
+
+def test_index_of_overwritten_capture_is_not_loaded(tmp_path, write_capture):
+    path = tmp_path / "capture.csv"
+    write_capture(path, np.zeros(1000))
+    save_index(path)
+    write_capture(path, np.ones(2000))
+    assert events.load_events(str(path)) is None
+
+
+def test_index_of_touched_capture_is_not_loaded(tmp_path, write_capture):
+    path = tmp_path / "capture.csv"
+    write_capture(path, np.zeros(1000))
+    save_index(path)
+    status = os.stat(path)
+    os.utime(path, ns=(status.st_atime_ns, status.st_mtime_ns + 10 ** 9))
+    assert events.load_events(str(path)) is None
+
+
+def test_missing_index_is_not_loaded(tmp_path, write_capture):
+    path = tmp_path / "capture.csv"
+    write_capture(path, np.zeros(1000))
+    assert events.load_events(str(path)) is None
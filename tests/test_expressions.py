@@ -0,0 +1,101 @@
+"""Tests of the lazy expressions of signals, evaluated chunk by chunk."""
+import numpy as np
+import pandas as pd
+import pytest
+from ps_signal.signals import Data, Signal, lazy
+from ps_signal.signals.fft import integrate_in_frequency_domain
+try:
+    from scipy.integrate import cumulative_trapezoid
+except ImportError:
+    from scipy.integrate import cumtrapz as cumulative_trapezoid
+
+
+FREQUENCY_HZ = 1000.0
+
+
+def make_signal(id, values, frequency_hz=FREQUENCY_HZ):
+    time_s = np.arange(len(values)) / frequency_hz
+    frame = pd.DataFrame({"time": time_s * 1000, "acc": values})
+    frame.attrs["period"] = 1 / frequency_hz
+    frame.attrs["units"] = ["ms", "mV"]
+    data = Data(loader=lambda _: frame)
+    data.load("", remove_offset=False)
+    return Signal(id, data)
+
+
+@pytest.fixture
+def signals():
+    rng = np.random.default_rng(0)
+    return (make_signal("a", rng.standard_normal(10000)),
+            make_signal("b", rng.standard_normal(10000)))
+
+
+def test_integral_of_a_difference_matches_scipy(signals):
+    a, b = signals
+    # The chunk size does not divide the length, so the state is carried
+    # over between uneven chunks.
+    result = ((lazy(a) - lazy(b)).integrate() * 1000).evaluate(
+        chunk_size=777
+    )
+    difference = a.data.acc.to_numpy() - b.data.acc.to_numpy()
+    expected = 1000 * cumulative_trapezoid(difference, dx=1 / FREQUENCY_HZ,
+                                           initial=0)
+    np.testing.assert_allclose(result.data.acc.to_numpy(), expected,
+                               rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(result.data.time, a.data.time)
+
+
+def test_derivative_matches_numpy(signals):
+    a, _ = signals
+    values = a.data.acc.to_numpy()
+    result = lazy(a).differentiate().evaluate(chunk_size=777)
+    derivative = result.data.acc.to_numpy()
+    expected = np.diff(values) * FREQUENCY_HZ
+    np.testing.assert_allclose(derivative[1:], expected, rtol=1e-12)
+    # The first sample gets the forward difference.
+    assert derivative[0] == pytest.approx(expected[0])
+
+
+def test_frequency_integrations_are_folded(signals):
+    a, _ = signals
+    expression = (lazy(a).integrate("frequency", f_min=5)
+                  .integrate("frequency", f_min=5))
+    assert repr(expression) == "integrate_frequency(a,f_min=5,order=2)"
+
+    result = expression.evaluate(chunk_size=777)
+    expected = integrate_in_frequency_domain(a.data.acc.to_numpy(),
+                                             FREQUENCY_HZ, 2, 5)
+    np.testing.assert_allclose(result.data.acc.to_numpy(), expected,
+                               rtol=1e-12, atol=1e-15)
+
+    # A different f_min is not folded.
+    unfolded = (lazy(a).integrate("frequency", f_min=5)
+                .integrate("frequency"))
+    assert repr(unfolded).count("order=1") == 2
+
+
+def test_mismatched_signals_raise(signals):
+    a, _ = signals
+    shorter = make_signal("short", np.zeros(5000))
+    faster = make_signal("fast", np.zeros(10000), 2 * FREQUENCY_HZ)
+    with pytest.raises(ValueError, match="different lengths"):
+        lazy(a) + lazy(shorter)
+    with pytest.raises(ValueError, match="different sampling frequencies"):
+        lazy(a) - lazy(faster)
+    with pytest.raises(ValueError, match="Unknown integration method"):
+        lazy(a).integrate("space")
+
+
+def test_units_follow_the_operations(signals):
+    a, b = signals
+    cases = [
+        (lazy(a) - lazy(b), "mV"),
+        ((lazy(a) - lazy(b)).integrate() * 1000, "mV*s"),
+        (lazy(a).integrate().integrate(), "mV*s*s"),
+        (lazy(a).integrate("frequency").integrate("frequency"), "mV*s^2"),
+        (lazy(a).differentiate(), "mV/s"),
+        (abs(lazy(a).integrate("frequency")), "mV*s"),
+    ]
+    for expression, unit in cases:
+        result = expression.evaluate()
+        assert result.data.attrs["units"] == ["ms", unit], repr(expression)
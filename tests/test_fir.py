@@ -0,0 +1,44 @@
+"""Tests of the FIR filters on signals shorter than the estimated filter."""
+import numpy as np
+import pandas as pd
+import pytest
+from ps_signal.signals import Data, Signal, filters, planner
+
+
+def make_signal(size, frequency_hz=10000.0):
+    time_s = np.arange(size) / frequency_hz
+    values = 1.0 + np.sin(2 * np.pi * 1000 * time_s)
+    frame = pd.DataFrame({"time": time_s * 1000, "acc": values})
+    frame.attrs["period"] = 1 / frequency_hz
+    data = Data(loader=lambda _: frame)
+    data.load("", remove_offset=False)
+    return Signal("fir", data)
+
+
+def test_estimated_taps_are_capped_at_the_signal_length():
+    # A transition band of 0.5 Hz needs about 100000 taps.
+    assert filters._fir_numtaps((5.0,), 10000.0) > 20000
+    signal = make_signal(20000)
+    filters.fir_highpass()(signal, 5, inplace=True)
+    values = signal.data.acc.to_numpy()
+    assert len(values) == 20000
+    assert np.all(np.isfinite(values))
+    # The offset is removed in the middle, away from the ends.
+    assert abs(np.mean(values[5000:15000])) < 0.05
+
+
+def test_given_taps_longer_than_the_signal_raise():
+    signal = make_signal(2000)
+    with pytest.raises(ValueError):
+        filters.fir_lowpass()(signal, 1000, numtaps=10001, inplace=True)
+
+
+def test_planned_peak_grows_with_the_taps():
+    samples = 10 ** 6
+    short = planner.estimate_peak(samples, [{"type": "fir_lowpass",
+                                             "numtaps": 101}])
+    long = planner.estimate_peak(samples, [{"type": "fir_lowpass",
+                                            "numtaps": 200001}])
+    estimated = planner.estimate_peak(samples, [{"type": "fir_lowpass"}])
+    assert long - short >= 8 * 8 * 200001
+    assert estimated >= long
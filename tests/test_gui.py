@@ -0,0 +1,206 @@
+"""Headless tests of the jobs and the background worker of the GUI, and of
+the viewer window where a display is available."""
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from ps_signal.interfaces.gui import gui
+from ps_signal.interfaces.gui.worker import BackgroundWorker
+from ps_signal.signals import Data
+
+
+def collect(worker, kind, until, timeout=30.0):
+    """Polls the worker until a result of the kind satisfies until, and
+    returns all results of the kind."""
+    results = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        results += [result for done, result in worker.poll()
+                    if done == kind]
+        if results and until(results[-1]):
+            return results
+        time.sleep(0.01)
+    raise AssertionError(f"No final {kind} result, got {results}")
+
+
+def make_data(size=500000, frequency_hz=100000.0):
+    time_s = np.arange(size) / frequency_hz
+    values = (np.sin(2 * np.pi * 50 * time_s)
+              + np.sin(2 * np.pi * 5000 * time_s))
+    frame = pd.DataFrame({"time": time_s * 1000, "acc": values})
+    frame.attrs["period"] = 1 / frequency_hz
+    data = Data(loader=lambda _: frame)
+    data.load("", remove_offset=False)
+    return data
+
+
+def counting(values, *, cancelled):
+    for value in values:
+        yield value
+
+
+def test_worker_delivers_results_in_order():
+    worker = BackgroundWorker()
+    try:
+        worker.submit("count", counting, [1, 2, 3])
+        assert collect(worker, "count", lambda last: last == 3) == [1, 2, 3]
+    finally:
+        worker.shutdown()
+
+
+def test_worker_delivers_errors():
+    def failing(*, cancelled):
+        raise RuntimeError("broken")
+        yield
+
+    worker = BackgroundWorker()
+    try:
+        worker.submit("fail", failing)
+        (error,) = collect(worker, "fail", lambda last: True)
+        assert isinstance(error, RuntimeError)
+    finally:
+        worker.shutdown()
+
+
+def test_superseded_job_results_are_dropped():
+    gate = threading.Event()
+
+    def gated(value, *, cancelled):
+        gate.wait(10)
+        yield value
+
+    worker = BackgroundWorker()
+    try:
+        worker.submit("job", gated, "stale")
+        worker.submit("job", counting, ["current"])
+        assert collect(worker, "job", lambda last: True) == ["current"]
+        gate.set()
+        time.sleep(0.2)
+        assert worker.poll() == []
+    finally:
+        gate.set()
+        worker.shutdown()
+
+
+def test_cancelled_job_results_are_dropped():
+    gate = threading.Event()
+    seen = []
+
+    def gated(*, cancelled):
+        gate.wait(10)
+        seen.append(cancelled())
+        yield "cancelled"
+
+    worker = BackgroundWorker()
+    try:
+        worker.submit("job", gated)
+        worker.cancel("job")
+        gate.set()
+        deadline = time.monotonic() + 10
+        while not seen and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        assert seen == [True]
+        assert worker.poll() == []
+    finally:
+        gate.set()
+        worker.shutdown()
+
+
+def test_load_job_builds_the_pyramid(tmp_path, write_capture):
+    path = write_capture(tmp_path / "capture.csv", np.arange(3000.0))
+    (loaded,) = gui.load_job(path, cancelled=lambda: False)
+    assert loaded.size == 3000
+    assert loaded.pyramid.size == 3000
+    assert list(gui.load_job(path, cancelled=lambda: True)) == []
+
+
+def test_load_job_reports_errors(tmp_path):
+    with pytest.raises(RuntimeError):
+        list(gui.load_job(str(tmp_path / "missing.csv"),
+                          cancelled=lambda: False))
+
+
+def test_process_job_refines_a_preview():
+    data = make_data()
+    results = list(gui.process_job(data, {"lowpass": 1000},
+                                   cancelled=lambda: False))
+    assert [result["final"] for result in results] == [False, True]
+    assert all(result["filters"] == "lowpass_1e+03" for result in results)
+    assert results[-1]["pyramid"].size == data.size
+    assert results[0]["pyramid"].size < data.size
+    # The input is not changed by the decimated preview.
+    assert data.size == 500000
+
+
+def test_process_job_stops_when_cancelled():
+    results = []
+    for result in gui.process_job(make_data(), {"lowpass": 1000},
+                                  cancelled=lambda: bool(results)):
+        results.append(result)
+    assert [result["final"] for result in results] == [False]
+
+
+def test_superseded_processing_is_dropped():
+    gate = threading.Event()
+    data = make_data()
+
+    def gated(input_data, settings, *, cancelled):
+        gate.wait(10)
+        yield from gui.process_job(input_data, settings, cancelled=cancelled)
+
+    worker = BackgroundWorker()
+    try:
+        worker.submit("process", gated, data, {"lowpass": 1000})
+        worker.submit("process", gui.process_job, data, {"highpass": 100})
+        results = collect(worker, "process", lambda last: last["final"])
+        gate.set()
+        time.sleep(0.5)
+        results += [result for _, result in worker.poll()]
+        assert {result["filters"] for result in results} == {"highpass_100"}
+    finally:
+        gate.set()
+        worker.shutdown()
+
+
+@pytest.fixture
+def root():
+    tk = pytest.importorskip("tkinter")
+    try:
+        window = tk.Tk()
+    except tk.TclError as error:
+        pytest.skip(f"No display: {error}")
+    window.withdraw()
+    yield window
+
+
+def test_viewer_loads_and_filters(root, tmp_path, write_capture):
+    from ps_signal.interfaces.gui import viewer
+
+    path = write_capture(tmp_path / "capture.csv",
+                         np.sin(np.arange(5000.0) / 10))
+    window = viewer.Viewer(BackgroundWorker(), root)
+
+    def wait_for(text):
+        deadline = time.monotonic() + 30
+        while not window._status.get().startswith(text):
+            assert time.monotonic() < deadline, window._status.get()
+            root.update()
+            time.sleep(0.01)
+
+    try:
+        window.open_file(path)
+        wait_for("Done.")
+        assert window._data.size == 5000
+
+        window._cutoffs["lowpass"].set("1000")
+        window.apply_settings()
+        wait_for("Done.")
+        assert window._status.get().endswith("lowpass_1e+03")
+
+        window._cutoffs["highpass"].set("abc")
+        window.apply_settings()
+        assert window._status.get() == "Cutoffs must be numbers."
+    finally:
+        window.close()
@@ -0,0 +1,43 @@
+"""Tests of the job queue with several worker processes."""
+import multiprocessing
+import sqlite3
+import numpy as np
+from ps_signal.signals import jobs
+
+
+def test_workers_complete_every_job_once(tmp_path, monkeypatch,
+                                         write_capture):
+    rng = np.random.default_rng(0)
+    files = [write_capture(tmp_path / f"capture_{index}.csv",
+                           rng.normal(size=2000))
+             for index in range(8)]
+    config = {
+        "stages": [{"type": "lowpass", "cutoff": 1000}],
+        "outputs": [{"type": "npz"}]
+    }
+    queue = jobs.JobQueue(str(tmp_path / "jobs.db"))
+    queue.submit(files, config)
+
+    # The workers write their outputs to the current directory.
+    monkeypatch.chdir(tmp_path)
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=jobs.run_worker, args=(queue, f"worker-{n}"))
+        for n in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+        assert worker.exitcode == 0
+
+    assert queue.progress()["done"] == len(files)
+    with sqlite3.connect(queue.path) as connection:
+        rows = connection.execute(
+            "SELECT state, attempts, result FROM jobs"
+        ).fetchall()
+    assert [row[0] for row in rows] == ["done"] * len(files)
+    assert [row[1] for row in rows] == [1] * len(files)
+    assert len({row[2] for row in rows}) == len(files)
+    for index in range(len(files)):
+        assert (tmp_path / f"capture_{index}-lowpass_1e+03.npz").exists()
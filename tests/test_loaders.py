@@ -0,0 +1,103 @@
+"""Tests of the binary loaders, on MATLAB v5, MATLAB v7.3 and raw captures
+written in the temporary directory of every test."""
+import json
+import numpy as np
+import pytest
+import scipy.io
+from ps_signal.signals import Data, loaders, planner
+from ps_signal.signals import data as data_module
+
+INTERVAL = 1e-5
+START = -0.2
+
+
+@pytest.fixture
+def samples():
+    return np.random.default_rng(0).standard_normal(5000).astype(np.float32)
+
+
+def write_mat5(path, samples):
+    scipy.io.savemat(str(path), {"A": samples, "Tstart": START,
+                                 "Tinterval": INTERVAL,
+                                 "Length": len(samples)})
+    return str(path)
+
+
+def write_mat73(path, samples):
+    h5py = pytest.importorskip("h5py")
+    with h5py.File(path, "w", userblock_size=512) as file:
+        file["A"] = samples
+        file["Tstart"] = np.array([[START]])
+        file["Tinterval"] = np.array([[INTERVAL]])
+    with open(path, "r+b") as file:
+        file.write(b"MATLAB 7.3 MAT-file, Platform: GLNXA64")
+    return str(path)
+
+
+def write_raw(path, samples):
+    samples.astype("<f4").tofile(path)
+    with open(str(path) + ".json", "w") as file:
+        json.dump({"interval": INTERVAL, "dtype": "<f4", "start": START},
+                  file)
+    return str(path)
+
+
+@pytest.mark.parametrize("write, name, extension", [
+    (write_mat5, "matlab", ".mat"),
+    (write_mat73, "matlab", ".mat"),
+    (write_raw, "raw", ".bin"),
+])
+def test_captures_round_trip(tmp_path, samples, write, name, extension):
+    path = write(tmp_path / f"capture{extension}", samples)
+    assert loaders.detect_loader(path).name == name
+
+    frame = loaders.get_loader(name)(path)
+    assert frame.attrs["period"] == INTERVAL
+    np.testing.assert_array_equal(frame.acc.to_numpy(), samples)
+    np.testing.assert_allclose(frame.time.to_numpy()[[0, -1]],
+                               [START * 1000, (START + 4999 * INTERVAL)
+                                * 1000])
+
+    data = Data(loader=loaders.auto_data_loader)
+    data.load(path, remove_offset=False)
+    assert data.frequency_hz == pytest.approx(1 / INTERVAL)
+    assert data.size == len(samples)
+    np.testing.assert_array_equal(data.data.acc.to_numpy(), samples)
+
+
+def test_missing_channel_exits(tmp_path, samples):
+    path = write_mat5(tmp_path / "capture.mat", samples)
+    with pytest.raises(SystemExit):
+        loaders.matlab_data_loader(path, channel="B")
+
+
+def test_slices_of_mapped_captures_are_views(tmp_path, samples,
+                                             write_capture):
+    raw = Data(loader=loaders.auto_data_loader)
+    raw.load(write_raw(tmp_path / "capture.bin", samples),
+             remove_offset=False)
+    csv = Data(loader=loaders.auto_data_loader)
+    csv.load(write_capture(tmp_path / "capture.csv", samples,
+                           frequency_hz=1 / INTERVAL),
+             remove_offset=False)
+    assert loaders.MMAP in raw.capabilities
+    assert loaders.MMAP not in csv.capabilities
+
+    for data, shared in ((raw, True), (csv, False)):
+        sliced = data_module.slice_data(data, start_ms=5, end_ms=10)
+        assert sliced.size == 500
+        assert np.shares_memory(sliced.data.acc.to_numpy(),
+                                data.data.acc.to_numpy()) == shared
+
+
+def test_planned_layout_follows_the_capabilities(tmp_path, samples):
+    path = write_raw(tmp_path / "capture.bin", samples)
+    assert planner.estimate_samples(path) == (5000, 4, "mapped")
+    path = write_mat5(tmp_path / "capture.mat", samples)
+    assert planner.estimate_samples(path) == (5000, 4, "binary")
+
+    sliced = [{"type": "slice"}]
+    assert (planner.estimate_peak(5000, sliced, layout="mapped")
+            == planner.estimate_peak(5000, layout="mapped"))
+    assert (planner.estimate_peak(5000, sliced, itemsize=4, layout="binary")
+            > planner.estimate_peak(5000, itemsize=4, layout="binary"))
@@ -0,0 +1,25 @@
+"""Tests of the fractional-octave band analysis."""
+import numpy as np
+import pytest
+from ps_signal.signals.octave import octave_values
+
+
+@pytest.mark.parametrize("frame_ms, f_min", [(125.0, None), (40.0, 60)])
+def test_frames_have_the_given_length(frame_ms, f_min):
+    frequency_hz = 48000.0
+    time_s = np.arange(int(frequency_hz * 4)) / frequency_hz
+    values = (np.sin(2 * np.pi * 1000 * time_s)
+              + np.sin(2 * np.pi * 125 * time_s))
+
+    bands = octave_values(values, frequency_hz, fraction=1,
+                          frame_ms=frame_ms, f_min=f_min)
+    frames = int(np.ceil(4000 / frame_ms))
+    assert bands.levels.shape == (len(bands.centers_hz), frames)
+    np.testing.assert_allclose(np.diff(bands.time), frame_ms)
+
+    # Every band of a tone holds its RMS value in every whole frame after
+    # the filters settled.
+    for center in (125, 1000):
+        row = np.argmin(np.abs(bands.centers_hz - center))
+        levels = bands.levels[row, 5: 4000 // int(frame_ms)]
+        np.testing.assert_allclose(levels, 1 / np.sqrt(2), rtol=0.05)
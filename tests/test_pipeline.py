@@ -0,0 +1,151 @@
+"""Tests of the stage cache and the parallel runs of the pipelines."""
+import os
+import numpy as np
+import pytest
+from ps_signal.signals import Pipeline, Signal, pipeline
+
+
+STAGES = [
+    {"type": "decimate", "factor": 2},
+    {"type": "lowpass", "cutoff": 1000},
+    {"type": "fft"},
+]
+
+
+@pytest.fixture
+def ran_stages(monkeypatch):
+    """Records the type of every stage that is run rather than read from
+    the cache."""
+    ran = []
+    run_stage = pipeline._run_stage
+
+    def recording(state, stage, signal_id):
+        ran.append(stage["type"])
+        return run_stage(state, stage, signal_id)
+    monkeypatch.setattr(pipeline, "_run_stage", recording)
+    return ran
+
+
+def capture_values(size=20000, frequency_hz=10000.0):
+    time_s = np.arange(size) / frequency_hz
+    return (np.sin(2 * np.pi * 200 * time_s)
+            + 0.5 * np.sin(2 * np.pi * 3000 * time_s))
+
+
+def cache_files(cache_dir):
+    return sorted(name for _, _, names in os.walk(cache_dir)
+                  for name in names)
+
+
+def test_second_run_reads_the_cache(tmp_path, write_capture, ran_stages):
+    filename = write_capture(tmp_path / "capture.csv", capture_values())
+    cache_dir = str(tmp_path / "cache")
+    first = Pipeline(STAGES, cache_dir=cache_dir).run(filename)
+    assert ran_stages == ["decimate", "lowpass", "fft"]
+    # One entry for the loaded file and one per stage.
+    assert len(cache_files(cache_dir)) == 4
+
+    ran_stages.clear()
+    second = Pipeline(STAGES, cache_dir=cache_dir).run(filename)
+    assert ran_stages == []
+    assert isinstance(second, Signal)
+    np.testing.assert_array_equal(second.data.acc, first.data.acc)
+    np.testing.assert_array_equal(second._fft.y, first._fft.y)
+    assert second.frequency_hz == first.frequency_hz
+
+
+def test_changed_stage_reruns_it_and_the_following(tmp_path, write_capture,
+                                                   ran_stages):
+    filename = write_capture(tmp_path / "capture.csv", capture_values())
+    cache_dir = str(tmp_path / "cache")
+    Pipeline(STAGES, cache_dir=cache_dir).run(filename)
+
+    ran_stages.clear()
+    changed = [dict(stage) for stage in STAGES]
+    changed[1]["cutoff"] = 500
+    result = Pipeline(changed, cache_dir=cache_dir).run(filename)
+    assert ran_stages == ["lowpass", "fft"]
+
+    uncached = Pipeline(changed).run(filename)
+    np.testing.assert_allclose(result.data.acc, uncached.data.acc)
+
+    ran_stages.clear()
+    Pipeline(changed[:2] + [{"type": "fft", "mode": "peak"}],
+             cache_dir=cache_dir).run(filename)
+    assert ran_stages == ["fft"]
+
+
+def test_changed_file_is_recomputed(tmp_path, write_capture, ran_stages):
+    path = tmp_path / "capture.csv"
+    filename = write_capture(path, capture_values())
+    cache_dir = str(tmp_path / "cache")
+    Pipeline(STAGES, cache_dir=cache_dir).run(filename)
+    status = os.stat(filename)
+
+    # The same size with a new modification time.
+    os.utime(filename, ns=(status.st_atime_ns,
+                           status.st_mtime_ns + 10 ** 9))
+    ran_stages.clear()
+    Pipeline(STAGES, cache_dir=cache_dir).run(filename)
+    assert ran_stages == ["decimate", "lowpass", "fft"]
+
+    # A new size, with the modification time put back.
+    write_capture(path, 2 * capture_values(30000))
+    os.utime(filename, ns=(status.st_atime_ns, status.st_mtime_ns))
+    ran_stages.clear()
+    result = Pipeline(STAGES, cache_dir=cache_dir).run(filename)
+    assert ran_stages == ["decimate", "lowpass", "fft"]
+    assert result.size == 15000
+
+
+def test_failed_cache_write_leaves_no_entry(tmp_path, write_capture,
+                                            monkeypatch, capsys):
+    filename = write_capture(tmp_path / "capture.csv", capture_values())
+    cache_dir = str(tmp_path / "cache")
+
+    def failing_savez(file, **arrays):
+        file.write(b"partial")
+        raise OSError("disk full")
+    monkeypatch.setattr(np, "savez", failing_savez)
+    signal = Pipeline(STAGES, cache_dir=cache_dir).run(filename)
+    monkeypatch.undo()
+
+    assert signal._fft is not None
+    assert "Could not write to the pipeline cache" in capsys.readouterr().out
+    assert cache_files(cache_dir) == []
+
+
+def test_unreadable_cache_entry_is_recomputed(tmp_path, write_capture,
+                                              ran_stages):
+    filename = write_capture(tmp_path / "capture.csv", capture_values())
+    cache_dir = str(tmp_path / "cache")
+    runner = Pipeline(STAGES, cache_dir=cache_dir)
+    runner.run(filename)
+    last = runner._cache_path(runner.stage_keys(filename)[-1])
+    with open(last, "wb") as file:
+        file.write(b"not an npz file")
+
+    ran_stages.clear()
+    runner.run(filename)
+    assert ran_stages == ["fft"]
+    assert not [name for name in cache_files(cache_dir)
+                if name.endswith(".tmp")]
+
+
+def test_run_many(tmp_path, write_capture):
+    files = [write_capture(tmp_path / f"capture{index}.csv",
+                           (index + 1) * capture_values())
+             for index in range(3)]
+    missing = str(tmp_path / "missing.csv")
+    cache_dir = str(tmp_path / "cache")
+    runner = Pipeline(STAGES, cache_dir=cache_dir)
+    results = runner.run_many(files + [missing], max_workers=2)
+
+    assert list(results) == files + [missing]
+    assert isinstance(results[missing], Exception)
+    for index, filename in enumerate(files):
+        expected = Pipeline(STAGES).run(filename)
+        np.testing.assert_allclose(results[filename].data.acc,
+                                   expected.data.acc)
+        assert results[filename].id == f"capture{index}"
+    assert len(cache_files(cache_dir)) == 12
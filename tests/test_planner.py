@@ -0,0 +1,54 @@
+"""Tests of the execution planner and of the measured peak memory."""
+import sys
+import tracemalloc
+import numpy as np
+from ps_signal.interfaces.cli import cli
+from ps_signal.signals import planner
+
+
+def test_track_peak_measures_the_block():
+    with planner.track_peak() as peak:
+        values = np.ones(10 ** 6)
+        del values
+    assert 8 * 10 ** 6 <= peak.bytes < 2 * 8 * 10 ** 6
+    assert not tracemalloc.is_tracing()
+
+
+def test_track_peak_inside_active_tracing():
+    tracemalloc.start()
+    try:
+        kept = np.ones(10 ** 5)
+        with planner.track_peak() as peak:
+            values = np.ones(10 ** 6)
+            del values
+        assert 8 * 10 ** 6 <= peak.bytes < 2 * 8 * 10 ** 6
+        assert tracemalloc.is_tracing()
+        del kept
+    finally:
+        tracemalloc.stop()
+
+
+def test_plan_picks_a_strategy_within_the_budget(tmp_path, write_capture):
+    path = write_capture(tmp_path / "capture.csv", np.zeros(20000))
+    stages = [{"type": "lowpass"}, {"type": "fft"}]
+
+    plan = planner.plan_execution(path, stages, budget_mb=1000)
+    assert plan.strategy == "memory"
+    assert plan.fits
+    assert 15000 < plan.samples < 25000
+
+    plan = planner.plan_execution(path, stages, budget_mb=0.001)
+    assert plan.strategy == min(planner.STRATEGIES, key=plan.predicted.get)
+    assert not plan.fits
+    assert "no strategy fits the budget" in plan.report()
+
+
+def test_budget_run_reports_the_measured_peak(tmp_path, write_capture,
+                                              monkeypatch, capsys):
+    path = write_capture(tmp_path / "capture.csv", np.zeros(20000))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["ps_signal", path, "-lp", "1000",
+                                      "-budget", "1000"])
+    cli.run_cli()
+    lines = capsys.readouterr().out.splitlines()
+    assert any("actual peak" in line for line in lines)
@@ -0,0 +1,116 @@
+"""Tests of the progress reporting and cancellation of the stages."""
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from ps_signal.signals import Data, progress
+
+
+def test_cancel_from_another_thread_stops_loading(tmp_path, write_capture):
+    filename = write_capture(tmp_path / "capture.csv",
+                             np.sin(np.arange(200000) / 10))
+    token = progress.CancellationToken()
+    events = []
+
+    def cancel_once_started(event):
+        events.append(event)
+        if len(events) == 1:
+            canceller = threading.Thread(target=token.cancel,
+                                         args=("stopped",))
+            canceller.start()
+            canceller.join()
+
+    data = Data()
+    with pytest.raises(progress.Cancelled):
+        with progress.tracking(cancel_once_started, token):
+            data.load(filename)
+    # The load stopped at the chunk after the cancellation.
+    assert len(events) == 1
+    assert events[0].stage == "load" and events[0].unit == "bytes"
+    assert events[0].done < events[0].total
+    assert token.reason == "stopped"
+
+
+def test_atomic_output_keeps_the_previous_file_on_failure(tmp_path):
+    path = tmp_path / "result.txt"
+    path.write_text("previous")
+    with pytest.raises(RuntimeError):
+        with progress.atomic_output(str(path)) as temporary:
+            with open(temporary, "w") as file:
+                file.write("partial")
+            raise RuntimeError("failed")
+    assert path.read_text() == "previous"
+    assert [entry.name for entry in tmp_path.iterdir()] == ["result.txt"]
+
+
+def test_atomic_output_keeps_the_previous_file_on_cancel(tmp_path):
+    path = tmp_path / "result.txt"
+    path.write_text("previous")
+    token = progress.CancellationToken()
+    with pytest.raises(progress.Cancelled):
+        with progress.tracking(token=token):
+            with progress.atomic_output(str(path)) as temporary:
+                with open(temporary, "w") as file:
+                    file.write("partial")
+                token.cancel()
+                progress.check()
+    assert path.read_text() == "previous"
+    assert [entry.name for entry in tmp_path.iterdir()] == ["result.txt"]
+
+
+def test_atomic_output_replaces_the_file(tmp_path):
+    path = tmp_path / "result.txt"
+    path.write_text("previous")
+    with progress.atomic_output(str(path)) as temporary:
+        with open(temporary, "w") as file:
+            file.write("new")
+    assert path.read_text() == "new"
+    assert [entry.name for entry in tmp_path.iterdir()] == ["result.txt"]
+
+
+def test_bind_tracks_a_thread_pool_worker():
+    events = []
+    token = progress.CancellationToken()
+
+    def work(index):
+        progress.update("work", index + 1, 4)
+        return progress.active()
+
+    with progress.tracking(events.append, token, label="pool"):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert all(executor.map(progress.bind(work), range(4)))
+            # Without bind, the worker thread is not tracked.
+            assert not executor.submit(work, 0).result()
+
+    assert len(events) == 4
+    assert {event.label for event in events} == {"pool"}
+    assert {event.stage for event in events} == {"work"}
+
+    token.cancel()
+    with progress.tracking(events.append, token):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with pytest.raises(progress.Cancelled):
+                executor.submit(progress.bind(work), 0).result()
+
+
+def test_printer_throttles_and_prints_done():
+    stream = io.StringIO()
+    printer = progress.ProgressPrinter(stream, interval_s=3600)
+    for done in range(1, 101):
+        printer(progress.ProgressEvent("capture", "filter", done, 100,
+                                       "samples", done / 1000))
+    lines = stream.getvalue().splitlines()
+    # The first event, then nothing until the stage is done.
+    assert len(lines) == 2
+    assert lines[0].startswith("capture: filter   1.0 %")
+    assert lines[1].startswith("capture: filter 100.0 %")
+    assert lines[1].endswith("done in 0.1 s")
+
+
+def test_printer_prints_every_interval():
+    stream = io.StringIO()
+    printer = progress.ProgressPrinter(stream, interval_s=0)
+    for done in range(1, 4):
+        printer(progress.ProgressEvent("", "load", done, 10, "bytes", 1.0))
+    assert len(stream.getvalue().splitlines()) == 3
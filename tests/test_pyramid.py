@@ -0,0 +1,85 @@
+"""Tests of the pyramid saved next to a capture and of the previews made
+from it."""
+import os
+import sys
+import numpy as np
+from ps_signal.interfaces.cli import cli
+from ps_signal.signals import pyramid
+
+
+def save_capture_pyramid(path, write_capture, values):
+    write_capture(path, values)
+    pyramid.save_pyramid(pyramid.build_pyramid(values, 10000.0), str(path))
+
+
+def test_saved_pyramid_is_loaded(tmp_path, write_capture):
+    path = tmp_path / "capture.csv"
+    save_capture_pyramid(path, write_capture, np.arange(5000.0))
+    loaded = pyramid.load_pyramid(str(path))
+    assert loaded is not None
+    assert loaded.size == 5000
+    _, mins, maxs, _ = loaded.render(width=100)
+    assert mins[0] == 0 and maxs[-1] == 4999
+
+
+def test_pyramid_of_rewritten_capture_is_not_loaded(tmp_path,
+                                                    write_capture):
+    path = tmp_path / "capture.csv"
+    save_capture_pyramid(path, write_capture, np.arange(5000.0))
+    write_capture(path, np.zeros(5000))
+    assert pyramid.load_pyramid(str(path)) is None
+
+
+def test_pyramid_of_touched_capture_is_not_loaded(tmp_path, write_capture):
+    path = tmp_path / "capture.csv"
+    save_capture_pyramid(path, write_capture, np.arange(5000.0))
+    status = os.stat(path)
+    os.utime(path, ns=(status.st_atime_ns, status.st_mtime_ns + 10 ** 9))
+    assert pyramid.load_pyramid(str(path)) is None
+
+
+def run_preview(monkeypatch, path, *options):
+    """Runs the CLI with -preview and returns the number of loaded files
+    and the pyramids that were plotted."""
+    loaded, plotted = [], []
+    load = cli._load
+
+    def counting_load(*args, **kwargs):
+        loaded.append(args[0])
+        return load(*args, **kwargs)
+
+    monkeypatch.setattr(cli, "_load", counting_load)
+    monkeypatch.setattr(cli.plot, "plot_data",
+                        lambda **kwargs: plotted.append(kwargs["pyramid"]))
+    monkeypatch.setattr(sys, "argv",
+                        ["ps_signal", str(path), "-preview", "100", *options])
+    cli.run_cli()
+    return len(loaded), plotted
+
+
+def test_preview_of_unchanged_capture_does_not_load(tmp_path, write_capture,
+                                                    monkeypatch):
+    path = tmp_path / "capture.csv"
+    write_capture(path, np.arange(5000.0))
+    monkeypatch.chdir(tmp_path)
+    assert run_preview(monkeypatch, path)[0] == 1
+    loads, (plotted,) = run_preview(monkeypatch, path)
+    assert loads == 0
+    assert plotted.size == 5000
+
+    # A rewritten capture is loaded and its pyramid rebuilt.
+    write_capture(path, np.arange(3000.0))
+    loads, (plotted,) = run_preview(monkeypatch, path)
+    assert loads == 1
+    assert plotted.size == 3000
+
+
+def test_preview_of_decimated_capture_is_not_saved(tmp_path, write_capture,
+                                                   monkeypatch):
+    path = tmp_path / "capture.csv"
+    write_capture(path, np.arange(5000.0))
+    monkeypatch.chdir(tmp_path)
+    loads, (plotted,) = run_preview(monkeypatch, path, "-decimate", "2")
+    assert loads == 1
+    assert plotted.size == 2500
+    assert pyramid.load_pyramid(str(path)) is None
@@ -0,0 +1,92 @@
+"""Tests of the quality scanner, with every problem placed across a chunk
+border so that the runs are carried over between the chunks."""
+import numpy as np
+import pytest
+from ps_signal.signals import scan_quality
+
+
+FREQUENCY_HZ = 10000.0
+CHUNK_SIZE = 100
+# 1 ms at 10 kHz, i.e. flat segments of at least 10 samples.
+FLAT_MS = 1.0
+
+
+def noise(size=1000):
+    return np.random.default_rng(size).uniform(-1, 1, size)
+
+
+def scan(values, time=None):
+    report = scan_quality(values, FREQUENCY_HZ, time, flat_ms=FLAT_MS,
+                          chunk_size=CHUNK_SIZE)
+    # Scanning in one chunk finds the same problems.
+    whole = scan_quality(values, FREQUENCY_HZ, time, flat_ms=FLAT_MS,
+                         chunk_size=len(values))
+    assert report.to_dict() == whole.to_dict()
+    return report
+
+
+def test_clipping_across_a_border():
+    values = noise()
+    values[95:108] = 5.0
+    values[590:603] = -5.0
+    report = scan(values)
+    np.testing.assert_array_equal(report.clipping, [[95, 13], [590, 13]])
+    assert len(report.flat) == 0 and len(report.non_finite) == 0
+    assert report.bad_fraction() == pytest.approx(26 / 1000)
+
+
+def test_flat_segment_across_a_border():
+    values = noise()
+    values[290:320] = 0.25
+    # Too short to be flat.
+    values[497:503] = 0.5
+    report = scan(values)
+    np.testing.assert_array_equal(report.flat, [[290, 30]])
+    assert len(report.clipping) == 0
+    assert report.clean_interval() == (320, 1000)
+
+
+def test_non_finite_run_across_a_border():
+    values = noise()
+    values[395:410] = np.nan
+    values[410] = np.inf
+    values[799] = np.nan
+    report = scan(values)
+    np.testing.assert_array_equal(report.non_finite, [[395, 16], [799, 1]])
+    assert len(report.flat) == 0 and len(report.clipping) == 0
+    assert "17 non-finite samples in 2 runs" in report.summary()
+
+
+def test_time_gap_across_a_border():
+    values = noise()
+    time = np.arange(1000) / FREQUENCY_HZ * 1000
+    # A gap between the last sample of a chunk and the first of the next.
+    time[500:] += 1.0
+    # And a step backwards within a chunk.
+    time[750:] -= 0.5
+    report = scan(values, time)
+    np.testing.assert_allclose(report.gaps, [[500, 1.1], [750, -0.4]])
+    assert report.clean_interval() == (0, 500)
+    assert len(scan(values).gaps) == 0
+
+
+def test_run_at_an_early_maximum_is_demoted_to_flat():
+    values = noise()
+    # The maximum so far when its chunks are scanned.
+    values[195:207] = 2.0
+    values[440:444] = 1.5
+    # A higher value later on makes them ordinary runs.
+    values[650] = 3.0
+    report = scan(values)
+    assert len(report.clipping) == 0
+    # The shorter run is neither clipping nor flat.
+    np.testing.assert_array_equal(report.flat, [[195, 12]])
+
+
+def test_run_at_the_final_maximum_stays_clipping():
+    values = noise()
+    values[195:207] = 2.0
+    values[650] = 1.5
+    report = scan(values)
+    np.testing.assert_array_equal(report.clipping, [[195, 12]])
+    assert len(report.flat) == 0
@@ -0,0 +1,114 @@
+"""Tests of the HTML report, its data files and their decimation."""
+import base64
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from ps_signal.signals import Data, Signal, add_to_report, report
+from ps_signal.signals import pyramid as pyr
+
+
+FREQUENCY_HZ = 10000.0
+
+
+def make_signal(id, values, start_ms=-5.0):
+    time_ms = start_ms + np.arange(len(values)) / FREQUENCY_HZ * 1000
+    frame = pd.DataFrame({"time": time_ms, "acc": values})
+    frame.attrs["period"] = 1 / FREQUENCY_HZ
+    data = Data(loader=lambda _: frame)
+    data.load("", remove_offset=False)
+    return Signal(id, data)
+
+
+def read_content(path):
+    text = open(path, encoding="utf-8").read()
+    assert text.startswith("psReport.add(") and text.endswith(");\n")
+    return json.loads(text[len("psReport.add("): -len(");\n")])
+
+
+def decode(text):
+    return np.frombuffer(base64.b64decode(text), dtype="<f4")
+
+
+def test_signals_are_listed_in_the_index(tmp_path):
+    directory = str(tmp_path / "report")
+    rng = np.random.default_rng(0)
+    paths = [add_to_report(make_signal(id, rng.standard_normal(5000)),
+                           directory, title="Run <1>")
+             for id in ("second", "first")]
+
+    data_dir = os.path.join(directory, "data")
+    assert paths == [os.path.join(data_dir, "second.js"),
+                     os.path.join(data_dir, "first.js")]
+    assert sorted(os.listdir(data_dir)) == ["first.js", "second.js"]
+    page = open(os.path.join(directory, "index.html")).read()
+    assert page.index('<script src="data/first.js">') < page.index(
+        '<script src="data/second.js">')
+    assert "<title>Run &lt;1&gt;</title>" in page
+    assert read_content(paths[1])["output_filename"] == "first"
+
+
+def test_readding_a_signal_replaces_it(tmp_path):
+    directory = str(tmp_path / "report")
+    add_to_report(make_signal("first", np.zeros(1000)), directory)
+    add_to_report(make_signal("second", np.zeros(1000)), directory)
+    path = add_to_report(make_signal("first", np.ones(3000)), directory)
+
+    assert sorted(os.listdir(os.path.join(directory, "data"))) == [
+        "first.js", "second.js"]
+    content = read_content(path)
+    assert content["size"] == 3000
+    np.testing.assert_array_equal(decode(content["time_series"]["max"]), 1)
+    page = open(os.path.join(directory, "index.html")).read()
+    assert page.count('<script src="data/first.js">') == 1
+
+
+def test_payload_decodes_to_the_pyramid(tmp_path):
+    values = np.sin(np.arange(100000) / 50) * np.linspace(0, 3, 100000)
+    signal = make_signal("signal", values)
+    signal.calc_fft()
+    content = read_content(add_to_report(signal, str(tmp_path),
+                                         max_points=500))
+
+    time, mins, maxs, means = pyr.build_pyramid(
+        values, FREQUENCY_HZ, start_ms=-5.0).render(width=500)
+    series = content["time_series"]
+    np.testing.assert_array_equal(decode(series["min"]),
+                                  mins.astype(np.float32))
+    np.testing.assert_array_equal(decode(series["max"]),
+                                  maxs.astype(np.float32))
+    np.testing.assert_array_equal(decode(series["mean"]),
+                                  means.astype(np.float32))
+    # The envelope covers every sample.
+    assert decode(series["min"]).min() == np.float32(values.min())
+    assert decode(series["max"]).max() == np.float32(values.max())
+    assert series["start_ms"] == pytest.approx(time[0])
+    assert series["step_ms"] == pytest.approx(time[1] - time[0])
+    assert content["frequency_hz"] == FREQUENCY_HZ
+    assert content["duration_s"] == pytest.approx(10.0)
+
+    spectrum = content["spectrum"]
+    frequency, amplitude = report._peak_hold(
+        np.asarray(signal._fft.x), np.asarray(signal._fft.y), 500)
+    np.testing.assert_array_equal(decode(spectrum["amplitude"]),
+                                  amplitude.astype(np.float32))
+    np.testing.assert_array_equal(decode(spectrum["frequency_khz"]),
+                                  frequency.astype(np.float32))
+    assert len(amplitude) <= 501
+
+
+@pytest.mark.parametrize("size", [1000, 1003, 10])
+def test_peak_hold_keeps_the_largest_peak_of_every_block(size):
+    rng = np.random.default_rng(size)
+    x = np.arange(size) * 0.5
+    y = rng.random(size)
+    frequency, amplitude = report._peak_hold(x, y, 100)
+
+    block = -(-size // 100)
+    expected = [np.argmax(y[start: start + block]) + start
+                for start in range(0, size, block)]
+    np.testing.assert_array_equal(amplitude, y[expected])
+    np.testing.assert_array_equal(frequency, x[expected])
+    # The global peak is never lost.
+    assert amplitude.max() == y.max()
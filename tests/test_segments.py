@@ -0,0 +1,113 @@
+"""Tests of the loading and the vectorized processing of segmented
+captures."""
+import zipfile
+import numpy as np
+import pandas as pd
+import pytest
+from ps_signal.signals import SegmentedData, load_segments, split_segments
+
+
+FREQUENCY_HZ = 10000.0
+START_MS = -1.0
+
+
+def make_segments(count=4, samples=500):
+    rng = np.random.default_rng(0)
+    time_s = np.arange(samples) / FREQUENCY_HZ
+    return (np.sin(2 * np.pi * 500 * time_s)
+            + 0.1 * rng.standard_normal((count, samples)))
+
+
+def csv_lines(values, frequency_hz=FREQUENCY_HZ, start_ms=START_MS):
+    time_ms = start_ms + np.arange(len(values)) / frequency_hz * 1000
+    return ["Tid;Kanal A", "(ms);(mV)", ""] + [
+        f"{t:.8f};{v:.8f}".replace(".", ",")
+        for t, v in zip(time_ms, values)
+    ]
+
+
+def test_restarting_csv_with_repeated_headers(tmp_path):
+    segments = make_segments()
+    path = tmp_path / "segments.csv"
+    path.write_text("\n".join(line for row in segments
+                              for line in csv_lines(row)) + "\n")
+
+    result = load_segments(str(path))
+    assert result.segments == 4 and result.samples == 500
+    assert result.frequency_hz == pytest.approx(FREQUENCY_HZ)
+    assert result.start_ms == pytest.approx(START_MS)
+    np.testing.assert_allclose(result.values, segments, atol=1e-8)
+
+
+def test_split_segments_where_the_time_restarts():
+    time = np.concatenate([np.arange(5.0), np.arange(3.0), np.arange(4.0)])
+    parts = split_segments(time, np.arange(12.0))
+    assert [len(values) for _, values in parts] == [5, 3, 4]
+    np.testing.assert_array_equal(parts[1][1], [5, 6, 7])
+
+
+def test_zip_with_a_member_per_segment(tmp_path):
+    segments = make_segments()
+    path = tmp_path / "segments.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        # Written out of order, as the members are read in name order.
+        for index in reversed(range(len(segments))):
+            archive.writestr(f"segment_{index:02d}.csv",
+                             "\n".join(csv_lines(segments[index])) + "\n")
+
+    result = load_segments(str(path))
+    assert result.segments == 4 and result.samples == 500
+    np.testing.assert_allclose(result.values, segments, atol=1e-8)
+
+
+def test_segments_are_cut_to_the_shortest(tmp_path, write_capture):
+    segments = make_segments()
+    files = [write_capture(tmp_path / f"segment{index}.csv",
+                           row[:500 - 50 * index], start_ms=START_MS)
+             for index, row in enumerate(segments)]
+
+    result = load_segments(files)
+    assert result.segments == 4 and result.samples == 350
+    np.testing.assert_allclose(result.values, segments[:, :350], atol=1e-8)
+    assert result.start_ms == pytest.approx(START_MS)
+
+
+def test_different_sampling_frequencies_raise(tmp_path, write_capture):
+    segments = make_segments(count=2)
+    files = [
+        write_capture(tmp_path / "slow.csv", segments[0]),
+        write_capture(tmp_path / "fast.csv", segments[1],
+                      frequency_hz=2 * FREQUENCY_HZ),
+    ]
+    with pytest.raises(ValueError, match="different sampling frequencies"):
+        load_segments(files)
+
+
+def test_average_and_statistics_match_numpy():
+    segments = make_segments(count=6)
+    segments[2] = 0.0
+    data = SegmentedData(segments, FREQUENCY_HZ, START_MS)
+
+    average = data.average()
+    np.testing.assert_allclose(average.data.acc, segments.mean(axis=0))
+    np.testing.assert_allclose(average.data.time, data.time)
+    assert average.frequency_hz == pytest.approx(FREQUENCY_HZ)
+
+    statistics = data.statistics()
+    assert isinstance(statistics, pd.DataFrame)
+    assert len(statistics) == 6
+    for index, row in enumerate(segments):
+        rms = np.sqrt(np.mean(row ** 2))
+        expected = {
+            "mean": np.mean(row),
+            "std": np.std(row),
+            "rms": rms,
+            "min": np.min(row),
+            "max": np.max(row),
+            "peak_to_peak": np.ptp(row),
+            "crest_factor": np.max(np.abs(row)) / rms if rms else np.nan,
+        }
+        for column, value in expected.items():
+            np.testing.assert_allclose(statistics[column][index], value,
+                                       rtol=1e-12, atol=1e-15,
+                                       err_msg=f"{column} of row {index}")
@@ -0,0 +1,34 @@
+"""Tests of the trend of statistics over sliding windows."""
+import numpy as np
+from scipy.stats import kurtosis
+from ps_signal.signals.trend import build_trend
+
+
+def window_values(values, trend):
+    starts = np.arange(len(trend)) * trend.hop
+    return values[starts[:, None] + np.arange(trend.window)]
+
+
+def test_quiet_windows_after_a_loud_part():
+    frequency_hz = 100000.0
+    values = np.random.default_rng(1).standard_normal(2 * 10 ** 6)
+    values[: len(values) // 4] *= 1000
+
+    trend = build_trend(values, frequency_hz, window_ms=10, hop_ms=5)
+    windows = window_values(values, trend)
+    assert (trend.window, trend.hop) == (1000, 500)
+    np.testing.assert_allclose(trend.kurtosis,
+                               kurtosis(windows, axis=1, fisher=False),
+                               atol=1e-5)
+    np.testing.assert_allclose(trend.rms,
+                               np.sqrt(np.mean(windows ** 2, axis=1)),
+                               rtol=1e-9)
+
+
+def test_extremes_of_overlapping_windows():
+    values = np.random.default_rng(2).standard_normal(50000) + 3.0
+    trend = build_trend(values, 10000.0, window_ms=30, hop_ms=20)
+    windows = window_values(values, trend)
+    np.testing.assert_allclose(trend.peak, np.abs(windows).max(axis=1))
+    np.testing.assert_allclose(trend.peak_to_peak,
+                               np.ptp(windows, axis=1))